@@ -0,0 +1,193 @@
+import asyncio
+import functools
+import itertools
+import json
+import re
+from db_connection import DB_PARAMS
+from batch import DEFAULT_CONCURRENCY
+from queries import ENROLLMENT_INSERT, USER_SELECT_EXISTING, COURSE_SELECT_EXISTING
+
+# IDs checked per `= ANY(...)` lookup when validating references
+REFERENCE_CHUNK_SIZE = 1000
+
+ASYNCPG_MISSING = "requires asyncpg (pip install asyncpg)"
+
+_PLACEHOLDER = re.compile(r'%%|%s')
+
+
+@functools.lru_cache(maxsize=None)
+def to_asyncpg(query):
+    """Rewrites a `queries.py` statement from psycopg2 `%s` placeholders to asyncpg's `$1, $2, ...`."""
+    numbers = itertools.count(1)
+    return _PLACEHOLDER.sub(lambda m: '%' if m.group() == '%%' else f"${next(numbers)}", query)
+
+
+# libpq connection settings passed to asyncpg unchanged, and those it names differently
+_ASYNCPG_SAME = ('host', 'port', 'user', 'password', 'passfile')
+_ASYNCPG_RENAMED = {'dbname': 'database', 'sslmode': 'ssl', 'connect_timeout': 'timeout'}
+
+
+def _server_settings(options):
+    """Turns libpq `options` (`-c name=value ...`) into asyncpg's server_settings."""
+    import shlex
+    words, settings = shlex.split(options), {}
+    while words:
+        word = words.pop(0)
+        if word == '-c' and words:
+            word = '-c' + words.pop(0)
+        name, sep, value = word[2:].partition('=')
+        if not word.startswith('-c') or not sep:
+            raise ValueError(f"unsupported connection option {word!r} for asyncpg; only -c name=value is")
+        settings[name.replace('-', '_')] = value
+    return settings
+
+
+def _connect_kwargs(params):
+    """Maps psycopg2/libpq connect() arguments (e.g. from params_from_dsn) to asyncpg's.
+
+    sslmode becomes `ssl`, connect_timeout `timeout`, and application_name
+    and `options` become server settings. Other libpq settings have no
+    asyncpg equivalent and raise ValueError instead of being dropped.
+    """
+    kwargs, settings = {}, {}
+    unsupported = []
+    for key, value in params.items():
+        if value is None:
+            continue
+        if key in _ASYNCPG_SAME:
+            kwargs[key] = value
+        elif key in _ASYNCPG_RENAMED:
+            kwargs[_ASYNCPG_RENAMED[key]] = value
+        elif key == 'application_name':
+            settings['application_name'] = value
+        elif key == 'options':
+            settings.update(_server_settings(value))
+        else:
+            unsupported.append(key)
+    if unsupported:
+        raise ValueError(f"connection setting(s) not supported with asyncpg: {', '.join(sorted(unsupported))}")
+    if 'port' in kwargs:
+        kwargs['port'] = int(kwargs['port'])
+    if 'timeout' in kwargs:
+        kwargs['timeout'] = float(kwargs['timeout'])
+    if settings:
+        kwargs['server_settings'] = settings
+    return kwargs
+
+
+async def _init_connection(conn):
+    # Decode JSON columns to Python objects, as psycopg2 does
+    for type_name in ('json', 'jsonb'):
+        await conn.set_type_codec(type_name, encoder=json.dumps, decoder=json.loads, schema='pg_catalog')
+
+
+class AsyncEngine:
+    """Runs the `queries.py` statements concurrently over an asyncpg pool.
+
+    Use as `async with AsyncEngine(concurrency=...) as engine:`. The pool
+    holds at most `concurrency` connections, which bounds the statements in
+    flight. Statements run in autocommit mode, so one failing statement does
+    not affect the others. Rows are asyncpg Records, which index like tuples.
+    asyncpg is imported when the engine starts, so it stays optional.
+    """
+
+    def __init__(self, params=None, concurrency=DEFAULT_CONCURRENCY):
+        self.params = params or DB_PARAMS
+        self.concurrency = concurrency
+        self._pool = None
+
+    async def __aenter__(self):
+        import asyncpg
+        self._pool = await asyncpg.create_pool(min_size=1, max_size=self.concurrency,
+                                               init=_init_connection, **_connect_kwargs(self.params))
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._pool.close()
+
+    async def fetchrow(self, query, params=()):
+        return await self._pool.fetchrow(to_asyncpg(query), *params)
+
+    async def fetch(self, query, params=()):
+        return await self._pool.fetch(to_asyncpg(query), *params)
+
+    async def fetchrow_many(self, query, param_sets):
+        """Runs `query` once per parameter tuple, concurrently.
+
+        Up to `concurrency` workers each hold one pooled connection and take
+        the next parameter tuple as soon as their previous statement returns,
+        so no time is spent acquiring a connection per statement.
+        Returns one result per tuple, in order: the first row (or None), or
+        the exception the statement raised.
+        """
+        query = to_asyncpg(query)
+        param_sets = list(param_sets)
+        results = [None] * len(param_sets)
+        pending = iter(range(len(param_sets)))
+
+        async def worker():
+            async with self._pool.acquire() as conn:
+                for i in pending:
+                    try:
+                        results[i] = await conn.fetchrow(query, *param_sets[i])
+                    except Exception as e:
+                        results[i] = e
+
+        await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(param_sets)))))
+        return results
+
+
+def run(coroutine):
+    """Runs a coroutine from synchronous (click) code."""
+    return asyncio.run(coroutine)
+
+
+async def fetch_by_ids(engine, select_by_id_query, ids):
+    """Fetches rows with a `*_SELECT_BY_ID` query, one concurrent lookup per ID.
+
+    Returns `{id: row or None}` in the order the IDs were given; a failed
+    lookup raises its error.
+    """
+    ids = list(dict.fromkeys(ids))
+    results = await engine.fetchrow_many(select_by_id_query, [(i,) for i in ids])
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
+    return dict(zip(ids, results))
+
+
+async def enroll_cohort(engine, course_id, user_ids):
+    """Enrolls every user in `course_id` with concurrent single-row inserts.
+
+    Each insert commits on its own, so a user who is already enrolled (or
+    does not exist) is reported without holding back the rest of the cohort.
+    Returns `(enrolled, failed)`: `{user_id: enrollment_id}` and
+    `{user_id: error message}`.
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    results = await engine.fetchrow_many(ENROLLMENT_INSERT, [(u, course_id) for u in user_ids])
+    enrolled, failed = {}, {}
+    for user_id, result in zip(user_ids, results):
+        if isinstance(result, Exception):
+            failed[user_id] = getattr(result, 'message', None) or str(result)
+        else:
+            enrolled[user_id] = result[0]
+    return enrolled, failed
+
+
+async def _existing(engine, select_existing_query, ids, chunk_size):
+    chunks = [ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size)]
+    found = await asyncio.gather(*(engine.fetch(select_existing_query, (chunk,)) for chunk in chunks))
+    return {row[0] for rows in found for row in rows}
+
+
+async def missing_references(engine, user_ids, course_ids, chunk_size=REFERENCE_CHUNK_SIZE):
+    """Checks which user and course IDs do not exist, with the lookups running concurrently.
+
+    Returns `(missing_user_ids, missing_course_ids)` as sorted lists.
+    """
+    user_ids, course_ids = sorted(set(user_ids)), sorted(set(course_ids))
+    users, courses = await asyncio.gather(
+        _existing(engine, USER_SELECT_EXISTING, user_ids, chunk_size),
+        _existing(engine, COURSE_SELECT_EXISTING, course_ids, chunk_size))
+    return [u for u in user_ids if u not in users], [c for c in course_ids if c not in courses]
@@ -0,0 +1,143 @@
+import itertools
+import click
+from bulk import detect_format, read_records, convert_record
+
+# Rows sent per INSERT/DELETE statement and committed together
+DEFAULT_PAGE_SIZE = 1000
+# Statements in flight at once for the async fan-out commands (see async_engine)
+DEFAULT_CONCURRENCY = 16
+
+page_size_option = click.option(
+    '--page-size', type=click.IntRange(min=1), default=DEFAULT_PAGE_SIZE, show_default=True,
+    help="Rows sent per statement and committed together")
+
+concurrency_option = click.option(
+    '--concurrency', type=click.IntRange(min=1), default=DEFAULT_CONCURRENCY, show_default=True,
+    help="Maximum number of statements in flight at once (needs asyncpg)")
+
+
+def from_file_option(help):
+    return click.option('--from-file', type=click.Path(exists=True, dir_okay=False), help=help)
+
+
+def pages(rows, page_size):
+    """Splits an iterable into lists of at most `page_size` items."""
+    rows = iter(rows)
+    while True:
+        page = list(itertools.islice(rows, page_size))
+        if not page:
+            return
+        yield page
+
+
+def collect_rows(table, names, values, from_file=None):
+    """Builds the rows for a batch create from repeated options or a CSV/JSONL file.
+
+    `values` holds one tuple per column in `names`, as given by repeated
+    options; a column given once is used for every row, so
+    `--course-id 5 --user-id 1 --user-id 2` makes two rows. Rows read from
+    `from_file` are validated against the table's column types up front.
+    """
+    if from_file:
+        if any(values):
+            raise click.UsageError("Use either --from-file or the column options, not both.")
+        columns = [c for c in table.columns if c.name in names]
+        columns.sort(key=lambda c: names.index(c.name))
+        fmt = detect_format(from_file)
+        rows = []
+        for line_number, record, error in read_records(from_file, fmt):
+            try:
+                if error is None:
+                    rows.append(tuple(convert_record(record, columns, fmt == 'csv')))
+            except ValueError as e:
+                error = str(e)
+            if error is not None:
+                raise click.UsageError(f"{from_file} line {line_number}: {error}")
+        return rows
+
+    count = max(len(v) for v in values)
+    if count == 0:
+        raise click.UsageError("Give the row values as options or use --from-file.")
+    required = {c.name for c in table.columns if c.required}
+    columns = []
+    for name, given in zip(names, values):
+        if not given:
+            if name in required:
+                raise click.UsageError(f"Missing option for {name}.")
+            given = (None,)
+        if len(given) not in (1, count):
+            raise click.UsageError(f"Got {len(given)} value(s) for {name} but {count} rows; "
+                                   f"repeat each option once per row or give it once for all rows.")
+        columns.append(given * count if len(given) == 1 else given)
+    return list(zip(*columns))
+
+
+def apply_settings(cur, settings):
+    """Sets transaction-local configuration parameters, e.g. the audit author read by triggers."""
+    for name, value in (settings or {}).items():
+        cur.execute("SELECT set_config(%s, %s, true)", (name, str(value)))
+
+
+def insert_many(conn, insert_many_query, rows, page_size=DEFAULT_PAGE_SIZE, settings=None):
+    """Inserts rows with execute_values, one statement and one commit per page.
+
+    `insert_many_query` is a `*_INSERT_MANY` constant ending in
+    `VALUES %s RETURNING <id>`. Yields the generated IDs of each page once it
+    is committed, so callers know what was created if a later page fails.
+    `settings` are applied to each page's transaction (see apply_settings).
+    """
+    from psycopg2.extras import execute_values
+    for page in pages(rows, page_size):
+        with conn.cursor() as cur:
+            apply_settings(cur, settings)
+            ids = [row[0] for row in execute_values(cur, insert_many_query, page, page_size=len(page), fetch=True)]
+        conn.commit()
+        yield ids
+
+
+def read_ids(path):
+    """Reads one integer ID per line from a file, ignoring blank lines."""
+    with open(path, encoding='utf-8') as f:
+        try:
+            return [int(line) for line in f if line.strip()]
+        except ValueError as e:
+            raise click.UsageError(f"{path}: {e}")
+
+
+def collect_target_ids(id, ids, from_file, action='delete'):
+    """Merges repeated --id values, an --ids list and an --from-file list."""
+    targets = list(id) + list(ids or [])
+    if from_file:
+        targets += read_ids(from_file)
+    if not targets:
+        raise click.UsageError(f"Give the IDs to {action} with --id, --ids or --from-file.")
+    return targets
+
+
+def delete_many(conn, delete_many_query, ids, page_size=DEFAULT_PAGE_SIZE, settings=None):
+    """Deletes rows by primary key, one `= ANY(%s)` statement and one commit per page.
+
+    Yields the IDs actually deleted in each page.
+    """
+    for page in pages(ids, page_size):
+        with conn.cursor() as cur:
+            apply_settings(cur, settings)
+            cur.execute(delete_many_query, (page,))
+            deleted = [row[0] for row in cur.fetchall()]
+        conn.commit()
+        yield deleted
+
+
+def echo_created(noun, ids):
+    if len(ids) == 1:
+        click.echo(click.style(f"Created {noun} with ID: {ids[0]}", fg='green'))
+    elif ids:
+        click.echo(click.style(f"Created {len(ids)} {noun} rows with IDs: {', '.join(map(str, ids))}", fg='green'))
+
+
+def echo_deleted(noun, label, requested, deleted):
+    found = set(deleted)
+    if deleted:
+        click.echo(f"Deleted {noun} ID(s): {', '.join(map(str, deleted))}")
+    for missing in dict.fromkeys(i for i in requested if i not in found):
+        click.echo(f"{label} with ID {missing} not found.")
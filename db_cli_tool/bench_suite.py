@@ -0,0 +1,342 @@
+import math
+import os
+import platform
+import random
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from db_connection import DB_PARAMS, REPLICA_PARAMS, close_pool, connection
+from migrate import migrate_up
+from seed import INSTRUCTOR_SHARE, enrollment_pair
+
+LMS_SQL = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lms.sql')
+
+_CREATED_ID = re.compile(r'ID: (\d+)')
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted, non-empty list."""
+    rank = max(math.ceil(pct * len(sorted_values) / 100), 1)
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class ThrowawayPostgres:
+    """A temporary PostgreSQL cluster, created with initdb and removed on exit.
+
+    The server listens only on a Unix socket inside its own temporary
+    directory, so it can't clash with another server. `bindir` is where
+    initdb and pg_ctl live (default: found on PATH). PostgreSQL refuses to
+    run as root.
+    """
+
+    def __init__(self, bindir=None):
+        self.bindir = bindir
+        self.directory = None
+        self.params = None
+
+    def _tool(self, name):
+        path = os.path.join(self.bindir, name) if self.bindir else shutil.which(name)
+        if not path or not os.path.exists(path):
+            raise RuntimeError(f"{name} not found; put the PostgreSQL binaries on PATH, "
+                               f"pass --pg-bin or set DB_TOOL_BENCH_DSN")
+        return path
+
+    def __enter__(self):
+        self.directory = tempfile.mkdtemp(prefix='db_tool_bench_')
+        data = os.path.join(self.directory, 'data')
+        try:
+            subprocess.run([self._tool('initdb'), '-D', data, '-U', 'postgres', '-A', 'trust', '-E', 'UTF8',
+                            '--no-sync'], check=True, capture_output=True, text=True)
+            subprocess.run([self._tool('pg_ctl'), '-D', data, '-w', '-l', os.path.join(self.directory, 'server.log'),
+                            '-o', f"-k {self.directory} -c listen_addresses='' -p 5432", 'start'],
+                           check=True, capture_output=True, text=True)
+        except subprocess.CalledProcessError as e:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            raise RuntimeError(f"could not start a throwaway PostgreSQL: {(e.stderr or e.stdout).strip()}")
+        except Exception:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            raise
+        self.params = {'dbname': 'postgres', 'user': 'postgres', 'host': self.directory, 'port': '5432'}
+        return self
+
+    def __exit__(self, *exc_info):
+        subprocess.run([self._tool('pg_ctl'), '-D', os.path.join(self.directory, 'data'), '-m', 'fast', '-w', 'stop'],
+                       capture_output=True)
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class BenchmarkDatabase:
+    """A freshly created database loaded with lms.sql and every migration.
+
+    Created on the server reached through `server_params` and dropped on
+    exit unless `keep` is set. While it is active the CLI's DB_PARAMS point
+    at it and no read replicas are configured, so in-process commands and
+    the connection pool use it.
+    """
+
+    def __init__(self, server_params, keep=False):
+        self.server_params = server_params
+        self.keep = keep
+        self.name = f"db_tool_bench_{uuid.uuid4().hex[:8]}"
+        self.params = dict(server_params, dbname=self.name)
+        self._saved = None
+        self._saved_replicas = None
+
+    def _admin(self, statement):
+        import psycopg2
+        conn = psycopg2.connect(**self.server_params)
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(statement)
+        finally:
+            conn.close()
+
+    def __enter__(self):
+        import psycopg2
+        self._admin(f'CREATE DATABASE "{self.name}"')
+        try:
+            conn = psycopg2.connect(**self.params)
+            try:
+                with open(LMS_SQL, encoding='utf-8') as f, conn.cursor() as cur:
+                    cur.execute(f.read())
+                conn.commit()
+                for _ in migrate_up(conn):
+                    pass
+            finally:
+                conn.close()
+        except Exception:
+            self._admin(f'DROP DATABASE IF EXISTS "{self.name}"')
+            raise
+        self._saved = dict(DB_PARAMS)
+        self._saved_replicas = list(REPLICA_PARAMS)
+        close_pool()
+        DB_PARAMS.clear()
+        DB_PARAMS.update(self.params)
+        REPLICA_PARAMS.clear()
+        return self
+
+    def __exit__(self, *exc_info):
+        close_pool()
+        DB_PARAMS.clear()
+        DB_PARAMS.update(self._saved)
+        REPLICA_PARAMS[:] = self._saved_replicas
+        if not self.keep:
+            self._admin(f'DROP DATABASE IF EXISTS "{self.name}"')
+
+
+def suite_state(layout):
+    """The IDs the suite picks from, derived from a seeded data set's Layout."""
+    def ids(table):
+        return list(range(layout.starts[table], layout.starts[table] + layout.counts[table]))
+    state = {'users': ids('User'), 'courses': ids('Course'), 'chapters': ids('Chapter'),
+             'enrollments': ids('Enrollment'), 'transactions': ids('Transaction'), 'features': ids('Feature_Store')}
+    state['instructors'] = state['users'][:max(layout.counts['User'] // INSTRUCTOR_SHARE, 1)]
+    state['enrollment_pairs'] = {e: enrollment_pair(layout, i) for i, e in enumerate(state['enrollments'])}
+    state['enrolled'] = set(state['enrollment_pairs'].values())
+    return state
+
+
+class Suite:
+    """Runs CLI commands in-process against the benchmark database and times them."""
+
+    def __init__(self, cli, state, iterations=200, warmup=10, bulk_rows=10000, seed=0):
+        from click.testing import CliRunner
+        self.cli = cli
+        self.state = state
+        self.iterations = iterations
+        self.warmup = warmup
+        self.bulk_rows = bulk_rows
+        self.rng = random.Random(seed)
+        self.runner = CliRunner()
+        self.created = {}
+        self.results = []
+        self._serial = 0
+
+    def invoke(self, argv):
+        """Runs one command line; returns `(seconds, output, ok)`."""
+        start = time.perf_counter()
+        result = self.runner.invoke(self.cli, argv, catch_exceptions=True)
+        elapsed = time.perf_counter() - start
+        ok = result.exit_code == 0 and result.exception is None and not any(
+            line.startswith('Error') for line in result.output.splitlines())
+        return elapsed, result.output, ok
+
+    def unique(self):
+        self._serial += 1
+        return f"{self._serial}-{uuid.uuid4().hex[:6]}"
+
+    def command(self, name, make_argv, created=None):
+        """Times `make_argv()`'s command line `iterations` times after `warmup` untimed runs.
+
+        With `created`, the IDs printed by a create command are kept under
+        that key for the matching delete.
+        """
+        timings, errors = [], 0
+        for i in range(self.warmup + self.iterations):
+            elapsed, output, ok = self.invoke(make_argv())
+            if created is not None and ok:
+                self.created.setdefault(created, []).extend(int(m) for m in _CREATED_ID.findall(output))
+            if i >= self.warmup:
+                timings.append(elapsed)
+                errors += not ok
+        self._record(name, timings, len(timings), errors)
+
+    def bulk(self, name, argv, rows):
+        """Times one bulk command line processing `rows` rows."""
+        elapsed, _, ok = self.invoke(argv)
+        self._record(name, [elapsed], rows, 0 if ok else 1)
+
+    def _record(self, name, timings, rows, errors):
+        timings.sort()
+        total = sum(timings)
+        self.results.append({
+            'name': name,
+            'calls': len(timings),
+            'rows': rows,
+            'errors': errors,
+            'seconds': total,
+            'throughput_per_s': rows / total if total > 0 else 0,
+            'mean_ms': total / len(timings) * 1000,
+            'p50_ms': percentile(timings, 50) * 1000,
+            'p99_ms': percentile(timings, 99) * 1000,
+        })
+
+    def pop_created(self, key):
+        ids = self.created.get(key, [])
+        return ids.pop() if ids else 0
+
+    def run(self, workdir):
+        s = self.state
+        pick = self.rng.choice
+
+        self.command('user create', lambda: ['user', 'create', '--name', 'bench', '--email',
+                                             f"bench-{self.unique()}@bench.invalid", '--role', 'student'], 'user')
+        self.command('user get', lambda: ['user', 'get', '--id', str(pick(s['users']))])
+        self.command('user list', lambda: ['user', 'list', '--limit', '100', '--after-id', str(pick(s['users']))])
+        self.command('user update', lambda: ['user', 'update', '--id', str(pick(s['users'])), '--name', f"renamed {self.unique()}"])
+
+        self.command('course create', lambda: ['course', 'create', '--title', 'bench', '--instructor-id',
+                                               str(pick(s['users'])), '--price', '9.99'], 'course')
+        self.command('course get', lambda: ['course', 'get', '--id', str(pick(s['courses']))])
+        self.command('course list', lambda: ['course', 'list', '--instructor-id', str(pick(s['instructors'])), '--limit', '100'])
+        self.command('course update', lambda: ['course', 'update', '--id', str(pick(s['courses'])), '--price', '19.99'])
+
+        self.command('chapter create', lambda: ['chapter', 'create', '--course-id', str(pick(s['courses'])),
+                                                '--title', 'bench', '--content', 'bench ' * 100], 'chapter')
+        self.command('chapter get', lambda: ['chapter', 'get', '--id', str(pick(s['chapters']))])
+        self.command('chapter get --with-content', lambda: ['chapter', 'get', '--id', str(pick(s['chapters'])),
+                                                            '--with-content', '--output', os.devnull])
+        self.command('chapter list', lambda: ['chapter', 'list', '--course-id', str(pick(s['courses'])), '--limit', '100'])
+        self.command('chapter update', lambda: ['chapter', 'update', '--id', str(pick(s['chapters'])), '--title', f"renamed {self.unique()}"])
+
+        def new_enrollment():
+            while True:
+                pair = (pick(s['users']), pick(s['courses']))
+                if pair not in s['enrolled']:
+                    s['enrolled'].add(pair)
+                    return ['enrollment', 'create', '--user-id', str(pair[0]), '--course-id', str(pair[1])]
+        self.command('enrollment create', new_enrollment, 'enrollment')
+        self.command('enrollment get', lambda: ['enrollment', 'get', '--id', str(pick(s['enrollments']))])
+        self.command('enrollment list', lambda: ['enrollment', 'list', '--course-id', str(pick(s['courses'])), '--limit', '100'])
+
+        def enrollment_update():
+            enrollment_id = pick(s['enrollments'])
+            return ['enrollment', 'update', '--id', str(enrollment_id), '--course-id', str(s['enrollment_pairs'][enrollment_id][1])]
+        self.command('enrollment update', enrollment_update)
+
+        self.command('transaction create', lambda: ['transaction', 'create', '--user-id', str(pick(s['users'])),
+                                                    '--course-id', str(pick(s['courses'])), '--amount', '42.5'], 'transaction')
+        self.command('transaction get', lambda: ['transaction', 'get', '--id', str(pick(s['transactions']))])
+        self.command('transaction list', lambda: ['transaction', 'list', '--user-id', str(pick(s['users'])), '--limit', '100'])
+        self.command('transaction update', lambda: ['transaction', 'update', '--id', str(pick(s['transactions'])),
+                                                    '--amount', '12.5'])
+
+        self.command('feature_store create', lambda: ['feature-store', 'create', '--course-id', str(pick(s['courses'])),
+                                                      '--metadata', '{"lang": "en"}', '--version', '99'], 'feature_store')
+        self.command('feature_store get', lambda: ['feature-store', 'get', '--id', str(pick(s['features']))])
+        self.command('feature_store get-latest', lambda: ['feature-store', 'get-latest', '--course-ids',
+                                                          ','.join(str(pick(s['courses'])) for _ in range(20))])
+        self.command('feature_store list', lambda: ['feature-store', 'list', '--course-id', str(pick(s['courses'])), '--limit', '100'])
+        self.command('feature_store update', lambda: ['feature-store', 'update', '--id', str(pick(s['features'])),
+                                                      '--metadata', f'{{"lang": "de", "run": "{self.unique()}"}}'])
+
+        # Deletes remove what the create benchmarks made, children first
+        for name, group in (('feature_store', 'feature-store'), ('transaction', 'transaction'),
+                            ('enrollment', 'enrollment'), ('chapter', 'chapter'), ('course', 'course'), ('user', 'user')):
+            self.command(f"{name} delete", lambda key=name, group=group: [group, 'delete', '--id', str(self.pop_created(key)), '--yes'])
+
+        # Bulk paths
+        path = os.path.join(workdir, 'users.csv')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('name,email,role\n')
+            run = uuid.uuid4().hex[:6]
+            f.writelines(f"bulk {i},bulk-{run}-{i}@bench.invalid,student\n" for i in range(self.bulk_rows))
+        self.bulk('user import (COPY)', ['user', 'import', path], self.bulk_rows)
+        ids = path + '.ids'
+        with connection() as conn, conn.cursor() as cur:
+            cur.execute('SELECT user_id FROM "User" WHERE email LIKE %s', (f"bulk-{run}-%",))
+            with open(ids, 'w', encoding='utf-8') as f:
+                f.writelines(f"{row[0]}\n" for row in cur.fetchall())
+        self.bulk('user delete --from-file', ['user', 'delete', '--from-file', ids, '--yes'], self.bulk_rows)
+        self.bulk('user create (batched)', ['user', 'create', '--role', 'student']
+                  + [arg for i in range(min(self.bulk_rows, 1000)) for arg in
+                     ('--name', f"batch {i}", '--email', f"batch-{self.unique()}@bench.invalid")], min(self.bulk_rows, 1000))
+        self.bulk('transaction list (stream)', ['transaction', 'list'], len(s['transactions']))
+        self.bulk('transaction list --format jsonl', ['--format', 'jsonl', 'transaction', 'list'],
+                  len(s['transactions']))
+        self.bulk('transaction export (COPY)', ['transaction', 'export', os.path.join(workdir, 'transactions.csv')],
+                  len(s['transactions']))
+        self.bulk('feature_store export --select', ['feature-store', 'export', os.path.join(workdir, 'features.jsonl'),
+                                                   '--select', 'model.name'], len(s['features']))
+        self.bulk('report refresh', ['report', 'refresh'], len(s['transactions']) + len(s['enrollments']))
+        return self.results
+
+
+def environment(conn, scale, iterations, seed):
+    """Describes the run, so results from different machines or releases can be told apart."""
+    from cache import CACHE_SETTING
+    with conn.cursor() as cur:
+        cur.execute("SHOW server_version")
+        server_version = cur.fetchone()[0]
+    conn.rollback()
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'server_version': server_version,
+        'cache': CACHE_SETTING or 'off',
+        'scale': scale,
+        'iterations': iterations,
+        'seed': seed,
+    }
+
+
+def compare(results, baseline):
+    """Pairs each result with the baseline's; returns `(name, baseline_p50, p50, change)` rows.
+
+    `change` is the relative change of p50 latency for single-call
+    benchmarks and of the time per row for bulk ones (positive is slower).
+    """
+    previous = {r['name']: r for r in baseline.get('results', [])}
+    rows = []
+    for result in results:
+        old = previous.get(result['name'])
+        if old is None or not old['p50_ms']:
+            continue
+        if result['calls'] == 1:
+            change = (old['throughput_per_s'] / result['throughput_per_s'] - 1) if result['throughput_per_s'] else float('inf')
+        else:
+            change = result['p50_ms'] / old['p50_ms'] - 1
+        rows.append((result['name'], old['p50_ms'], result['p50_ms'], change))
+    return rows
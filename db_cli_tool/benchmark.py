@@ -0,0 +1,329 @@
+import os
+import shlex
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+import click
+from db_connection import get_connection, execute_prepared, params_from_dsn
+from batch import insert_many, delete_many
+from listing import ID_LIST
+from queries import (USER_INSERT, USER_INSERT_MANY, USER_DELETE_MANY, USER_SELECT_BY_ID, USER_SELECT_BY_ID_VERSIONED,
+                     TRANSACTION_SELECT_BY_ID, TRANSACTION_INSERT)
+
+
+def _synthetic_users(count):
+    run = uuid.uuid4().hex[:8]
+    return [(f"bench-{run}-{i}", f"bench-{run}-{i}@example.invalid", 'student') for i in range(count)]
+
+
+def _timed(fn):
+    """Returns how long `fn()` took, in seconds."""
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def _echo_results(results):
+    """Prints `(label, rows, seconds)` results with throughput relative to the first one."""
+    baseline = results[0][1] / results[0][2] if results[0][2] > 0 else 0
+    click.echo(f"{'path':<20}{'rows':>8}{'seconds':>10}{'rows/s':>12}{'speedup':>10}")
+    for label, rows, seconds in results:
+        rate = rows / seconds if seconds > 0 else 0
+        speedup = rate / baseline if baseline else 0
+        click.echo(f"{label:<20}{rows:>8}{seconds:>10.3f}{rate:>12.0f}{speedup:>9.1f}x")
+
+
+CLI_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'db_tool.py')
+
+
+def _import_times(stderr):
+    """Parses `python -X importtime` output into `(module, self_us, cumulative_us, depth)` rows."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def add_commands(cli):
+    """Adds benchmark commands to the CLI."""
+    @cli.group()
+    def benchmark():
+        """Benchmarks for sizing batches and catching performance regressions."""
+        pass
+
+    @benchmark.command('batch-insert')
+    @click.option('--rows', type=click.IntRange(min=1), default=2000, show_default=True,
+                  help="Rows inserted by each path")
+    @click.option('--page-sizes', type=ID_LIST, default='100,1000,5000', show_default=True,
+                  help="Comma-separated page sizes to try for the batched path")
+    def batch_insert(rows, page_sizes):
+        """Compare per-row INSERTs with execute_values pages.
+
+        Inserts synthetic users, committing the way the create command does,
+        and deletes them again afterwards.
+        """
+        conn = get_connection()
+        if conn is None:
+            return
+        created = []
+        try:
+            def per_row(users):
+                with conn.cursor() as cur:
+                    for user in users:
+                        cur.execute(USER_INSERT, user)
+                        created.append(cur.fetchone()[0])
+                        conn.commit()
+
+            def batched(users, page_size):
+                for ids in insert_many(conn, USER_INSERT_MANY, users, page_size):
+                    created.extend(ids)
+
+            users = _synthetic_users(rows)
+            results = [('per-row', rows, _timed(lambda: per_row(users)))]
+            for page_size in page_sizes:
+                users = _synthetic_users(rows)
+                results.append((f"page_size={page_size}", rows, _timed(lambda: batched(users, page_size))))
+            _echo_results(results)
+        except Exception as e:
+            conn.rollback()
+            click.echo(f"Error running benchmark: {e}")
+        finally:
+            if created and not conn.closed:
+                for _ in delete_many(conn, USER_DELETE_MANY, created):
+                    pass
+            conn.close()
+
+    @benchmark.command('fan-out')
+    @click.option('--rows', type=click.IntRange(min=1), default=2000, show_default=True,
+                  help="Users fetched by ID by each path")
+    @click.option('--concurrency', 'levels', type=ID_LIST, default='1,8,32', show_default=True,
+                  help="Comma-separated concurrency levels to try for the async path")
+    def fan_out(rows, levels):
+        """Compare sequential psycopg2 lookups with the async engine.
+
+        Fetches the same users with USER_SELECT_BY_ID one at a time on a
+        pooled connection, then concurrently through async_engine at each
+        concurrency level.
+        """
+        import async_engine
+        conn = get_connection()
+        if conn is None:
+            return
+        try:
+            with conn.cursor() as cur:
+                cur.execute('SELECT user_id FROM "User" ORDER BY user_id LIMIT %s', (rows,))
+                ids = [row[0] for row in cur.fetchall()]
+            conn.commit()
+
+            def sequential():
+                with conn.cursor() as cur:
+                    for user_id in ids:
+                        cur.execute(USER_SELECT_BY_ID, (user_id,))
+                        cur.fetchone()
+                conn.commit()
+
+            async def concurrent(level):
+                async with async_engine.AsyncEngine(concurrency=level) as engine:
+                    # Open the pool before timing, as the sync path reuses a warm connection
+                    await async_engine.fetch_by_ids(engine, USER_SELECT_BY_ID, ids[:level])
+                    start = time.perf_counter()
+                    await async_engine.fetch_by_ids(engine, USER_SELECT_BY_ID, ids)
+                    return time.perf_counter() - start
+
+            results = [('sync', len(ids), _timed(sequential))]
+            for level in levels:
+                results.append((f"async x{level}", len(ids), async_engine.run(concurrent(level))))
+            _echo_results(results)
+        except ImportError:
+            click.echo(f"Error running benchmark: {async_engine.ASYNCPG_MISSING}")
+        except Exception as e:
+            conn.rollback()
+            click.echo(f"Error running benchmark: {e}")
+        finally:
+            conn.close()
+
+    @benchmark.command()
+    @click.option('--rows', type=click.IntRange(min=1), default=2000, show_default=True,
+                  help="Times each statement is executed by each path")
+    def prepared(rows):
+        """Compare plain execution of the hot statements with prepared statements.
+
+        Runs the statements behind `get`, single-row `create` and
+        `update --id` on one pooled connection, first as plain SQL that the
+        server parses and plans on every call, then through
+        execute_prepared(). Writes are rolled back.
+        """
+        import repository
+        from tables import TRANSACTION
+        conn = get_connection()
+        if conn is None:
+            return
+        try:
+            with conn.cursor() as cur:
+                cur.execute('SELECT user_id FROM "User" ORDER BY user_id LIMIT %s', (rows,))
+                users = [row[0] for row in cur.fetchall()]
+                cur.execute('SELECT transaction_id, user_id, course_id FROM "Transaction" ORDER BY transaction_id LIMIT %s',
+                            (rows,))
+                transactions = cur.fetchall()
+            conn.commit()
+            if not (users and transactions):
+                click.echo("Error running benchmark: needs users and transactions (see `seed`).")
+                return
+            update_query, _ = repository.update_statement(TRANSACTION, (None,), [0])
+            cases = [
+                ('user get', USER_SELECT_BY_ID_VERSIONED, lambda i: (users[i % len(users)],)),
+                ('transaction get', TRANSACTION_SELECT_BY_ID, lambda i: (transactions[i % len(transactions)][0],)),
+                ('transaction create', TRANSACTION_INSERT, lambda i: transactions[i % len(transactions)][1:] + (9.99,)),
+                ('transaction update', update_query, lambda i: (None, transactions[i % len(transactions)][0])),
+            ]
+
+            def run(query, make_params, execute):
+                with conn.cursor() as cur:
+                    for i in range(rows):
+                        execute(cur, query, make_params(i))
+                        cur.fetchall()
+                conn.rollback()
+
+            click.echo(f"{'statement':<20}{'plain us':>10}{'prepared us':>13}{'speedup':>10}")
+            for label, query, make_params in cases:
+                plain = _timed(lambda: run(query, make_params, lambda cur, q, p: cur.execute(q, p)))
+                prepared = _timed(lambda: run(query, make_params, execute_prepared))
+                click.echo(f"{label:<20}{plain / rows * 1e6:>10.1f}{prepared / rows * 1e6:>13.1f}"
+                           f"{plain / prepared:>9.2f}x")
+        except Exception as e:
+            conn.rollback()
+            click.echo(f"Error running benchmark: {e}")
+        finally:
+            conn.close()
+
+    @benchmark.command()
+    @click.option('--args', 'cli_args', default='--help', show_default=True,
+                  help="Arguments passed to db_tool.py for each run")
+    @click.option('--runs', type=click.IntRange(min=1), default=10, show_default=True,
+                  help="Number of timed runs")
+    @click.option('--top', type=click.IntRange(min=0), default=10, show_default=True,
+                  help="Slowest top-level imports to list")
+    @click.option('--max-ms', type=float, help="Exit with status 1 if the median run takes longer than this")
+    @click.pass_context
+    def startup(ctx, cli_args, runs, top, max_ms):
+        """Measure CLI start-up time and the imports behind it.
+
+        Runs db_tool.py in fresh interpreters, reports the wall-clock time and
+        lists the slowest imports from one `python -X importtime` run.
+        """
+        command = [sys.executable, CLI_SCRIPT] + shlex.split(cli_args)
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            timings.append((time.perf_counter() - start) * 1000)
+        traced = subprocess.run([sys.executable, '-X', 'importtime'] + command[1:],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        imports = _import_times(traced.stderr)
+        median = statistics.median(timings)
+
+        click.echo(f"db_tool.py {cli_args}: median {median:.1f} ms, min {min(timings):.1f} ms, "
+                   f"max {max(timings):.1f} ms over {runs} run(s)")
+        click.echo(f"modules imported: {len(imports)}, "
+                   f"import time: {sum(r[1] for r in imports) / 1000:.1f} ms, "
+                   f"psycopg2 loaded: {'yes' if any(r[0] == 'psycopg2' for r in imports) else 'no'}")
+        if top:
+            click.echo(f"{'module':<40}{'cumulative ms':>15}")
+            for name, _, cumulative_us, _ in sorted((r for r in imports if r[3] == 0),
+                                                    key=lambda r: r[2], reverse=True)[:top]:
+                click.echo(f"{name:<40}{cumulative_us / 1000:>15.1f}")
+        if max_ms is not None and median > max_ms:
+            click.echo(click.style(f"Start-up regression: median {median:.1f} ms exceeds {max_ms:.1f} ms", fg='red'))
+            ctx.exit(1)
+
+    @benchmark.command()
+    @click.option('--dsn', envvar='DB_TOOL_BENCH_DSN',
+                  help="PostgreSQL server to create the benchmark database on, as a libpq DSN or URI "
+                       "[env: DB_TOOL_BENCH_DSN]; default: start a throwaway server with initdb")
+    @click.option('--pg-bin', envvar='DB_TOOL_BENCH_PGBIN', type=click.Path(file_okay=False, exists=True),
+                  help="Directory with initdb and pg_ctl for the throwaway server (default: PATH)")
+    @click.option('--scale', type=click.FloatRange(min=0, min_open=True), default=1, show_default=True,
+                  help="Synthetic data size, as for `seed`; 1 is 1000 users and 10000 transactions")
+    @click.option('--iterations', type=click.IntRange(min=1), default=200, show_default=True,
+                  help="Timed runs of each single-row command")
+    @click.option('--warmup', type=click.IntRange(min=0), default=10, show_default=True,
+                  help="Untimed runs of each command before timing it")
+    @click.option('--bulk-rows', type=click.IntRange(min=1), default=10000, show_default=True,
+                  help="Rows imported and deleted by the bulk benchmarks")
+    @click.option('--seed', type=click.IntRange(min=0), default=0, show_default=True,
+                  help="Random seed for data and parameters")
+    @click.option('--workers', type=click.IntRange(min=1), default=1, show_default=True,
+                  help="Processes loading the synthetic data (see `seed`)")
+    @click.option('--output', type=click.Path(dir_okay=False), help="Write the results as JSON to this file")
+    @click.option('--compare', 'baseline', type=click.File(), help="JSON results of an earlier run to compare with")
+    @click.option('--max-regression', type=click.FloatRange(min=0),
+                  help="With --compare, exit with status 1 if a benchmark got slower by more than this percentage")
+    @click.option('--keep', is_flag=True, help="Keep the benchmark database instead of dropping it")
+    @click.pass_context
+    def suite(ctx, dsn, pg_bin, scale, iterations, warmup, bulk_rows, seed, workers, output, baseline, max_regression, keep):
+        """Benchmark every CRUD command and the bulk paths on synthetic data.
+
+        Creates a fresh database (on a throwaway server unless --dsn is
+        given), loads lms.sql, the migrations and synthetic LMS data, then
+        runs each command in-process and reports p50/p99 latency and
+        throughput. The database is dropped afterwards.
+        """
+        import contextlib
+        import json
+        import tempfile
+        import bench_suite
+        from seed import seed_database
+        previous = json.load(baseline) if baseline else None
+        try:
+            with contextlib.ExitStack() as stack:
+                if dsn:
+                    server_params = params_from_dsn(dsn)
+                else:
+                    click.echo("Starting a throwaway PostgreSQL server...", err=True)
+                    server_params = stack.enter_context(bench_suite.ThrowawayPostgres(pg_bin)).params
+                database = stack.enter_context(bench_suite.BenchmarkDatabase(server_params, keep))
+                workdir = stack.enter_context(tempfile.TemporaryDirectory(prefix='db_tool_bench_'))
+                click.echo(f"Loading synthetic data (scale {scale:g}) into {database.name}...", err=True)
+                conn = get_connection()
+                if conn is None:
+                    return
+                try:
+                    state = bench_suite.suite_state(seed_database(conn, scale, seed, workers, params=database.params))
+                    info = bench_suite.environment(conn, scale, iterations, seed)
+                finally:
+                    conn.close()
+                results = bench_suite.Suite(ctx.find_root().command, state, iterations, warmup, bulk_rows, seed).run(workdir)
+                if keep:
+                    click.echo(f"Kept database {database.name}", err=True)
+        except Exception as e:
+            click.echo(f"Error running benchmark suite: {e}")
+            ctx.exit(1)
+
+        click.echo(f"{'benchmark':<32}{'calls':>7}{'errors':>7}{'p50 ms':>10}{'p99 ms':>10}{'per s':>12}")
+        for r in results:
+            click.echo(f"{r['name']:<32}{r['calls']:>7}{r['errors']:>7}{r['p50_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+                       f"{r['throughput_per_s']:>12.0f}")
+        if output:
+            with open(output, 'w', encoding='utf-8') as f:
+                json.dump(dict(info, results=results), f, indent=2)
+            click.echo(f"Results written to {output}")
+        if previous:
+            regressed = 0
+            click.echo(f"\n{'benchmark':<32}{'baseline':>10}{'now':>10}{'change':>9}")
+            for name, old_p50, new_p50, change in bench_suite.compare(results, previous):
+                slower = max_regression is not None and change * 100 > max_regression
+                regressed += slower
+                line = f"{name:<32}{old_p50:>10.2f}{new_p50:>10.2f}{change:>+9.0%}"
+                click.echo(click.style(line, fg='red') if slower else line)
+            if regressed:
+                click.echo(click.style(f"{regressed} benchmark(s) regressed by more than {max_regression:g}%", fg='red'))
+                ctx.exit(1)
+        if any(r['errors'] for r in results):
+            click.echo(click.style("Some commands failed; their timings are not meaningful.", fg='red'))
+            ctx.exit(1)
@@ -0,0 +1,317 @@
+import csv
+import io
+import json
+import os
+import time
+from decimal import Decimal, InvalidOperation
+import click
+from db_connection import get_connection
+from cache import invalidate_table
+
+# Rows sent per COPY and committed together
+DEFAULT_BATCH_SIZE = 10000
+STAGE_TABLE = 'import_stage'
+
+
+def _to_int(value):
+    """Converts an int column's value, refusing booleans and fractional numbers instead of truncating them."""
+    if isinstance(value, bool):
+        raise TypeError("booleans are not integers")
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError("not an integral number")
+    return str(int(value))
+
+
+_CONVERTERS = {
+    'int': _to_int,
+    'decimal': lambda v: str(Decimal(str(v))),
+    'text': str,
+    'json': lambda v: json.dumps(json.loads(v) if isinstance(v, str) else v),
+}
+# PostgreSQL type of each column type, for casting MERGE source values
+_SQL_TYPES = {'int': 'int', 'decimal': 'numeric', 'text': 'text', 'json': 'jsonb'}
+
+
+class BulkImportError(Exception):
+    """Raised when a file cannot be imported at all (as opposed to single rejected rows)."""
+
+
+def detect_format(path, fmt=None):
+    """Returns 'csv' or 'jsonl', guessing from the file extension when `fmt` is not given."""
+    if fmt:
+        return fmt
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.jsonl', '.ndjson', '.json'):
+        return 'jsonl'
+    return 'csv'
+
+
+def read_records(path, fmt):
+    """Yields `(line_number, record, error)` for each record of a CSV or JSONL file.
+
+    The file is read incrementally, so it may be larger than memory.
+    `error` is set instead of `record` when a line cannot be parsed.
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            reader = csv.DictReader(f)
+            for record in reader:
+                if None in record:
+                    yield reader.line_num, record, "more fields than header columns"
+                else:
+                    yield reader.line_num, record, None
+        else:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    yield line_number, line.rstrip('\n'), f"invalid JSON: {e}"
+                    continue
+                if isinstance(record, dict):
+                    yield line_number, record, None
+                else:
+                    yield line_number, record, "record is not a JSON object"
+
+
+def resolve_columns(table, names):
+    """Maps input field names onto the table's writable columns, in input order."""
+    by_name = {c.name: c for c in table.columns}
+    unknown = [n for n in names if n not in by_name]
+    if unknown:
+        raise BulkImportError(f"unknown column(s) for {table.name}: {', '.join(unknown)}")
+    columns = [by_name[n] for n in names]
+    missing = [c.name for c in table.columns if c.required and c.name not in names]
+    if missing:
+        raise BulkImportError(f"missing required column(s): {', '.join(missing)}")
+    return columns
+
+
+def convert_record(record, columns, empty_is_null):
+    """Validates a record and returns its values as text (None for NULL) in column order."""
+    extra = set(record) - {c.name for c in columns}
+    if extra:
+        raise ValueError(f"unexpected field(s): {', '.join(sorted(map(str, extra)))}")
+    values = []
+    for column in columns:
+        value = record.get(column.name)
+        if empty_is_null and value == '':
+            value = None
+        if value is None:
+            if column.required:
+                raise ValueError(f"{column.name} is required")
+            values.append(None)
+            continue
+        try:
+            values.append(_CONVERTERS[column.type](value))
+        except (ValueError, TypeError, InvalidOperation) as e:
+            raise ValueError(f"invalid {column.type} for {column.name}: {value!r}") from e
+    return values
+
+
+def _copy_text(value):
+    """Encodes one value for COPY's text format."""
+    if value is None:
+        return '\\N'
+    return value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+class _Rejects:
+    """Appends rejected rows to a JSONL report, opening it on the first reject."""
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._file = None
+
+    def add(self, line_number, record, error):
+        if self._file is None:
+            self._file = open(self.path, 'w', encoding='utf-8')
+        self._file.write(json.dumps({'line': line_number, 'error': error, 'record': record}, default=str) + '\n')
+        self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def _upsert_sql(table, names, source):
+    if table.partition_key is not None and table.partition_key not in table.conflict:
+        return _merge_sql(table, names, source)
+    key = ', '.join(table.conflict)
+    cols = ', '.join(names)
+    updates = [n for n in names if n not in table.conflict]
+    if updates:
+        action = "DO UPDATE SET " + ", ".join(f"{n} = EXCLUDED.{n}" for n in updates)
+    else:
+        action = "DO NOTHING"
+    return f"INSERT INTO {table.name} ({cols}) {source} ON CONFLICT ({key}) {action}"
+
+
+def _merge_sql(table, names, source):
+    """Upserts with MERGE (PostgreSQL 15+) into a partitioned table.
+
+    Its unique indexes have to include the partition key, so none matches
+    the conflict key alone and ON CONFLICT can't be used. The source values
+    are cast to the column types, as VALUES placeholders would be text.
+    """
+    types = {c.name: c.type for c in table.columns}
+    cols = ', '.join(names)
+    typed = ', '.join(f"v.{n}::{_SQL_TYPES[types[n]]}" for n in names)
+    match = ' AND '.join(f"t.{k} = s.{k}" for k in table.conflict)
+    updates = [n for n in names if n not in table.conflict]
+    if updates:
+        action = "UPDATE SET " + ", ".join(f"{n} = s.{n}" for n in updates)
+    else:
+        action = "DO NOTHING"
+    return (f"MERGE INTO {table.name} t USING (SELECT {typed} FROM ({source}) AS v ({cols})) AS s ({cols}) "
+            f"ON {match} WHEN MATCHED THEN {action} "
+            f"WHEN NOT MATCHED THEN INSERT ({cols}) VALUES ({', '.join(f's.{n}' for n in names)})")
+
+
+def _describe(error):
+    diag = error.diag
+    message = ' '.join(filter(None, [diag.message_primary, diag.message_detail]))
+    return message or str(error).strip()
+
+
+def _load_batch(conn, table, names, batch, upsert, rejects):
+    """COPYs one batch and commits it; returns the number of rows loaded.
+
+    If the database refuses the batch (e.g. a foreign key violation), the
+    batch is retried row by row so only the offending rows are rejected.
+    """
+    import psycopg2
+    cols = ', '.join(names)
+    data = io.StringIO(''.join('\t'.join(map(_copy_text, values)) + '\n' for _, _, values in batch))
+    try:
+        with conn.cursor() as cur:
+            if upsert:
+                cur.copy_expert(f"COPY {STAGE_TABLE} ({cols}) FROM STDIN", data)
+                key = ', '.join(table.conflict)
+                cur.execute(_upsert_sql(
+                    table, names,
+                    f"SELECT DISTINCT ON ({key}) {cols} FROM {STAGE_TABLE} ORDER BY {key}, import_seq DESC"))
+            else:
+                cur.copy_expert(f"COPY {table.name} ({cols}) FROM STDIN", data)
+        conn.commit()
+        return len(batch)
+    except psycopg2.Error:
+        conn.rollback()
+        if conn.closed:
+            raise
+
+    placeholders = ', '.join(['%s'] * len(names))
+    row_sql = f"INSERT INTO {table.name} ({cols}) VALUES ({placeholders})"
+    if upsert:
+        row_sql = _upsert_sql(table, names, f"VALUES ({placeholders})")
+    loaded = 0
+    with conn.cursor() as cur:
+        for line_number, record, values in batch:
+            cur.execute("SAVEPOINT import_row")
+            try:
+                cur.execute(row_sql, values)
+                cur.execute("RELEASE SAVEPOINT import_row")
+                loaded += 1
+            except psycopg2.Error as e:
+                cur.execute("ROLLBACK TO SAVEPOINT import_row")
+                rejects.add(line_number, record, _describe(e))
+    conn.commit()
+    return loaded
+
+
+def import_file(conn, table, path, fmt=None, batch_size=DEFAULT_BATCH_SIZE, upsert=False, rejects_path=None):
+    """Streams a CSV/JSONL file into `table` with COPY, committing every `batch_size` rows.
+
+    With `upsert`, batches go through a temporary staging table and are
+    merged with INSERT ... ON CONFLICT on the table's conflict key.
+    Rows that fail validation or are refused by the database are written to
+    `rejects_path` as JSONL. Returns `(loaded, rejected)`.
+    """
+    fmt = detect_format(path, fmt)
+    rejects = _Rejects(rejects_path or path + '.rejects.jsonl')
+    records = read_records(path, fmt)
+    columns = names = None
+    loaded = 0
+    batch = []
+    try:
+        for line_number, record, error in records:
+            if columns is None and error is None:
+                names = list(record)
+                columns = resolve_columns(table, names)
+                if upsert:
+                    missing = [k for k in table.conflict if k not in names]
+                    if missing:
+                        raise BulkImportError(f"--upsert needs the conflict key column(s): {', '.join(missing)}")
+                    _create_stage(conn, table, names)
+            if error is None:
+                try:
+                    batch.append((line_number, record, convert_record(record, columns, fmt == 'csv')))
+                except ValueError as e:
+                    error = str(e)
+            if error is not None:
+                rejects.add(line_number, record, error)
+            if len(batch) >= batch_size:
+                loaded += _load_batch(conn, table, names, batch, upsert, rejects)
+                batch = []
+        if batch:
+            loaded += _load_batch(conn, table, names, batch, upsert, rejects)
+        if names and table.pk in names:
+            _sync_sequence(conn, table)
+    finally:
+        rejects.close()
+    return loaded, rejects.count
+
+
+def _create_stage(conn, table, names):
+    with conn.cursor() as cur:
+        cur.execute(f"DROP TABLE IF EXISTS {STAGE_TABLE}")
+        cur.execute(f"CREATE TEMP TABLE {STAGE_TABLE} ON COMMIT DELETE ROWS AS "
+                    f"SELECT {', '.join(names)} FROM {table.name} WITH NO DATA")
+        cur.execute(f"ALTER TABLE {STAGE_TABLE} ADD COLUMN import_seq BIGSERIAL")
+    conn.commit()
+
+
+def _sync_sequence(conn, table):
+    """Moves the serial sequence past explicitly imported primary keys."""
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT setval(pg_get_serial_sequence(%s, %s), "
+                    f"(SELECT COALESCE(MAX({table.pk}), 0) + 1 FROM {table.name}), false)",
+                    (table.name, table.pk))
+    conn.commit()
+
+
+def add_import_command(group, table):
+    """Adds an `import` command for `table` to a table command group."""
+    label = table.name.strip('"')
+
+    @group.command('import', help=f"Bulk-load {label} rows from a CSV or JSONL file using COPY.")
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']),
+                  help="Input format (default: guessed from the file extension)")
+    @click.option('--batch-size', type=click.IntRange(min=1), default=DEFAULT_BATCH_SIZE, show_default=True,
+                  help="Rows copied and committed per batch")
+    @click.option('--upsert', is_flag=True,
+                  help=f"Update existing rows matching on ({', '.join(table.conflict)}) instead of failing")
+    @click.option('--rejects', type=click.Path(dir_okay=False),
+                  help="Where to write rejected rows as JSONL (default: <path>.rejects.jsonl)")
+    def import_(path, fmt, batch_size, upsert, rejects):
+        conn = get_connection()
+        if conn is None:
+            return
+        rejects = rejects or path + '.rejects.jsonl'
+        try:
+            start = time.perf_counter()
+            loaded, rejected = import_file(conn, table, path, fmt, batch_size, upsert, rejects)
+            invalidate_table(table)
+            elapsed = time.perf_counter() - start
+            rate = loaded / elapsed if elapsed > 0 else 0
+            click.echo(click.style(f"Imported {loaded} {label} rows in {elapsed:.2f}s ({rate:.0f} rows/s)", fg='green'))
+            if rejected:
+                click.echo(f"Rejected {rejected} rows; see {rejects}")
+        except Exception as e:
+            conn.rollback()
+            click.echo(f"Error importing {label}: {e}")
+        finally:
+            conn.close()
@@ -0,0 +1,213 @@
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from db_connection import DB_PARAMS, connection, execute_prepared
+
+# Caching is off unless DB_TOOL_CACHE is set: 'memory' keeps rows in this
+# process only (useful with `serve`), a file path adds an SQLite tier that
+# persists between CLI runs.
+CACHE_SETTING = os.environ.get('DB_TOOL_CACHE', '')
+# Seconds a cached row is served without asking the database; after that it
+# is revalidated against updated_at before being used again
+CACHE_TTL = float(os.environ.get('DB_TOOL_CACHE_TTL', 60))
+CACHE_MAX_ENTRIES = 4096     # rows kept in the in-process LRU
+
+Entry = namedtuple('Entry', ['row', 'version', 'stored_at'])
+
+
+def _namespace(params=DB_PARAMS):
+    """Identifies the database, so one cache file can't mix up rows of two databases."""
+    return f"{params.get('host')}:{params.get('port')}/{params.get('dbname')}"
+
+
+class MemoryCache:
+    """A thread-safe in-process LRU of cache entries."""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def discard_table(self, namespace, table):
+        with self._lock:
+            for key in [k for k in self._entries if k[:2] == (namespace, table)]:
+                del self._entries[key]
+
+
+class DiskCache:
+    """An SQLite file of cache entries, shared by every CLI run of this user."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS cache (
+      namespace TEXT NOT NULL,
+      tbl       TEXT NOT NULL,
+      id        INTEGER NOT NULL,
+      row       BLOB NOT NULL,
+      version   BLOB NOT NULL,
+      stored_at REAL NOT NULL,
+      PRIMARY KEY (namespace, tbl, id)
+    )"""
+
+    def __init__(self, path):
+        import sqlite3
+        new = not os.path.exists(path)
+        self._db = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        if new:
+            os.chmod(path, 0o600)  # rows are pickled: keep the file private
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(self.SCHEMA)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            found = self._db.execute("SELECT row, version, stored_at FROM cache "
+                                     "WHERE namespace = ? AND tbl = ? AND id = ?", key).fetchone()
+        if found is None:
+            return None
+        return Entry(pickle.loads(found[0]), pickle.loads(found[1]), found[2])
+
+    def put(self, key, entry):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?, ?)",
+                             key + (pickle.dumps(entry.row), pickle.dumps(entry.version), entry.stored_at))
+
+    def discard(self, keys):
+        with self._lock:
+            self._db.executemany("DELETE FROM cache WHERE namespace = ? AND tbl = ? AND id = ?", list(keys))
+
+    def discard_table(self, namespace, table):
+        with self._lock:
+            self._db.execute("DELETE FROM cache WHERE namespace = ? AND tbl = ?", (namespace, table))
+
+
+class ReadThroughCache:
+    """Serves `*_SELECT_BY_ID` lookups from an in-process LRU and an optional disk tier.
+
+    A row younger than `ttl` seconds is returned without touching the
+    database. An older one is revalidated with the table's
+    `*_SELECT_VERSION` query, which only reads `updated_at`: if that is
+    unchanged the entry is kept, otherwise the row is fetched again.
+    Writes made through this tool invalidate the affected entries.
+    """
+
+    def __init__(self, tiers, ttl=CACHE_TTL, namespace=None):
+        self.tiers = tiers
+        self.ttl = ttl
+        self.namespace = namespace or _namespace()
+
+    def _lookup(self, key):
+        for i, tier in enumerate(self.tiers):
+            entry = tier.get(key)
+            if entry is not None:
+                for faster in self.tiers[:i]:
+                    faster.put(key, entry)
+                return entry
+        return None
+
+    def _store(self, key, entry):
+        for tier in self.tiers:
+            tier.put(key, entry)
+
+    def get(self, table, select_versioned, select_version, id):
+        """Returns the row for `id` (without `updated_at`), or None if it does not exist.
+
+        `select_versioned` is the table's `*_SELECT_BY_ID_VERSIONED` query,
+        whose last column is `updated_at`.
+        """
+        key = (self.namespace, table.name, id)
+        entry = self._lookup(key)
+        now = time.time()
+        if entry is not None and now - entry.stored_at < self.ttl:
+            return entry.row
+        with connection(readonly=True) as conn:
+            with conn.cursor() as cur:
+                if entry is not None:
+                    execute_prepared(cur, select_version, (id,))
+                    current = cur.fetchone()
+                    if current is not None and current[0] == entry.version:
+                        self._store(key, entry._replace(stored_at=now))
+                        return entry.row
+                execute_prepared(cur, select_versioned, (id,))
+                row = cur.fetchone()
+        if row is None:
+            self.invalidate(table, [id])
+            return None
+        self._store(key, Entry(tuple(row[:-1]), row[-1], now))
+        return tuple(row[:-1])
+
+    def invalidate(self, table, ids):
+        keys = [(self.namespace, table.name, id) for id in ids]
+        for tier in self.tiers:
+            tier.discard(keys)
+
+    def invalidate_table(self, table):
+        for tier in self.tiers:
+            tier.discard_table(self.namespace, table.name)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Returns the process-wide cache configured by DB_TOOL_CACHE, or None when caching is off."""
+    global _cache
+    if CACHE_SETTING in ('', 'off'):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            tiers = [MemoryCache()]
+            if CACHE_SETTING != 'memory':
+                tiers.append(DiskCache(os.path.expanduser(CACHE_SETTING)))
+            _cache = ReadThroughCache(tiers)
+        return _cache
+
+
+def get_by_id(table, select_versioned, select_version, id):
+    """Fetches one row by primary key, through the cache when it is enabled.
+
+    Returns the row without its trailing `updated_at`, or None.
+    """
+    cache = get_cache()
+    if cache is not None:
+        return cache.get(table, select_versioned, select_version, id)
+    with connection(readonly=True) as conn:
+        with conn.cursor() as cur:
+            execute_prepared(cur, select_versioned, (id,))
+            row = cur.fetchone()
+    return None if row is None else tuple(row[:-1])
+
+
+def invalidate(table, ids):
+    """Drops cached rows of `table` after they were updated or deleted."""
+    cache = get_cache()
+    if cache is not None and ids:
+        cache.invalidate(table, ids)
+
+
+def invalidate_table(table):
+    """Drops every cached row of `table`, e.g. after a bulk import."""
+    cache = get_cache()
+    if cache is not None:
+        cache.invalidate_table(table)
@@ -1,6 +1,44 @@
 import click
-from db_connection import get_connection
-from queries import CHAPTER_INSERT
+import repository
+from db_connection import get_connection, execute_prepared
+from bulk import add_import_command
+from export import add_export_command
+from streaming import echo_rows
+from output import echo_notice, echo_row
+from listing import list_options, collect_ids, where_option, ID_LIST
+from batch import collect_rows, collect_target_ids, echo_created, echo_deleted, from_file_option, page_size_option
+from tables import CHAPTER
+from queries import CHAPTER_SELECT_CONTENT_CHUNK
+
+# Characters of content fetched per round trip by `chapter get --with-content`
+CONTENT_CHUNK_CHARS = 256 * 1024
+
+
+def stream_content(conn, chapter_id, out, chunk_size=CONTENT_CHUNK_CHARS):
+    """Writes a chapter's content to `out` in `chunk_size` character ranges; returns the characters written.
+
+    Each range is a separate substr() call, so only the TOAST chunks it
+    covers are read and no more than one range is held in memory. Run it in
+    a REPEATABLE READ transaction so every range sees the same row version.
+    """
+    written = 0
+    with conn.cursor() as cur:
+        while True:
+            execute_prepared(cur, CHAPTER_SELECT_CONTENT_CHUNK, (written + 1, chunk_size, chapter_id))
+            row = cur.fetchone()
+            chunk = row[0] if row else None
+            if not chunk:
+                return written
+            out.write(chunk)
+            written += len(chunk)
+            if len(chunk) < chunk_size:
+                return written
+
+
+def _format_chapter(c):
+    content = 'none' if c[4] is None else f"{c[4]} bytes"
+    return f"ID: {c[0]}, Course ID: {c[1]}, Title: {c[2]}, Video URL: {c[3]}, Content: {content}"
+
 
 def add_commands(cli):
     """Adds Chapter-related commands to the CLI."""
@@ -10,46 +48,167 @@ def add_commands(cli):
         pass
 
     @chapter.command()
-    @click.option('--course-id', required=True, type=int, help="Course ID")
-    @click.option('--title', required=True, help="Chapter title")
-    @click.option('--content', required=True, help="Chapter content")
-    def create(course_id, title, content):
-        """Create a new chapter."""
+    @click.option('--course-id', multiple=True, type=int, help="Course ID")
+    @click.option('--title', multiple=True, help="Chapter title")
+    @click.option('--video-url', multiple=True, help="Chapter video URL")
+    @click.option('--content', multiple=True, help="Chapter content")
+    @click.option('--content-file', type=click.File('r', encoding='utf-8'),
+                  help="Read the content of a single chapter from this file ('-' for stdin)")
+    @from_file_option("CSV or JSONL file with one chapter per row")
+    @page_size_option
+    def create(course_id, title, video_url, content, content_file, from_file, page_size):
+        """Create one or many chapters.
+
+        Repeat the options to create several rows at once; an option given
+        only once applies to every row.
+        """
+        if content_file is not None:
+            if content:
+                raise click.UsageError("Use either --content or --content-file, not both.")
+            content = (content_file.read(),)
+        rows = collect_rows(CHAPTER, ('course_id', 'title', 'video_url', 'content'),
+                            (course_id, title, video_url, content), from_file)
         conn = get_connection()
         if conn is None:
             return
+        created = []
         try:
-            with conn.cursor() as cur:
-                cur.execute(CHAPTER_INSERT, (course_id, title, content))
-                chapter_id = cur.fetchone()[0]
-                conn.commit()
-                click.echo(f"Created chapter with ID: {chapter_id}")
+            for page_ids in repository.create(conn, CHAPTER, rows, page_size):
+                created.extend(page_ids)
+            echo_created('chapter', created)
         except Exception as e:
             conn.rollback()
+            echo_created('chapter', created)
             click.echo(f"Error creating chapter: {e}")
         finally:
             conn.close()
 
-    # Skeleton for other commands
     @chapter.command()
-    def list():
-        """List all chapters (not implemented)."""
-        click.echo("List chapters - implementation pending.")
+    @list_options(CHAPTER)
+    def list(itersize, limit, after_id, order_by, desc, **filters):
+        """List chapters, optionally filtered and paged.
+
+        Only the content's size is shown; use `get --with-content` to read it.
+        """
+        conn = get_connection(readonly=True)
+        if conn is None:
+            return
+        try:
+            rows = repository.list_rows(conn, CHAPTER, filters, after_id, order_by, desc, limit, itersize)
+            if not echo_rows(rows, _format_chapter, repository.statements(CHAPTER).columns):
+                echo_notice("No chapters found.")
+        except click.UsageError:
+            raise
+        except Exception as e:
+            echo_notice(f"Error listing chapters: {e}")
+        finally:
+            conn.close()
 
     @chapter.command()
-    @click.option('--id', required=True, type=int)
-    def get(id):
-        """Get a chapter by ID (not implemented)."""
-        click.echo("Get chapter - implementation pending.")
+    @click.option('--id', required=True, type=int, help="Chapter ID to retrieve")
+    @click.option('--with-content', is_flag=True, help="Also write the chapter's content")
+    @click.option('--output', '-o', type=click.Path(dir_okay=False, allow_dash=True), default='-', show_default=True,
+                  help="File the content is written to ('-' for stdout)")
+    @click.option('--chunk-size', type=click.IntRange(min=1), default=CONTENT_CHUNK_CHARS, show_default=True,
+                  help="Characters of content fetched per round trip")
+    def get(id, with_content, output, chunk_size):
+        """Get a chapter by ID.
+
+        With --with-content the content is streamed in --chunk-size ranges;
+        when it goes to stdout the chapter's details are written to stderr.
+        """
+        if not with_content:
+            try:
+                chapter = repository.get(CHAPTER, id)
+                if chapter:
+                    echo_row(chapter, _format_chapter, repository.statements(CHAPTER).columns)
+                else:
+                    echo_notice(f"Chapter with ID {id} not found.")
+            except Exception as e:
+                echo_notice(f"Error retrieving chapter: {e}")
+            return
+        to_stdout = output == '-'
+        conn = get_connection(readonly=True)
+        if conn is None:
+            return
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY")
+                execute_prepared(cur, repository.statements(CHAPTER).select_by_id, (id,))
+                chapter = cur.fetchone()
+            if not chapter:
+                click.echo(f"Chapter with ID {id} not found.", err=to_stdout)
+                return
+            click.echo(_format_chapter(chapter), err=to_stdout)
+            with click.open_file(output, 'w', encoding='utf-8') as out:
+                written = stream_content(conn, id, out, chunk_size)
+            if not to_stdout:
+                click.echo(f"Wrote {written} characters of content to {output}")
+        except Exception as e:
+            click.echo(f"Error retrieving chapter: {e}", err=to_stdout)
+        finally:
+            conn.rollback()
+            conn.close()
 
     @chapter.command()
-    @click.option('--id', required=True, type=int)
-    def update(id):
-        """Update a chapter (not implemented)."""
-        click.echo("Update chapter - implementation pending.")
+    @click.option('--id', type=int, help="Chapter ID to update")
+    @click.option('--ids', type=ID_LIST, help="Comma-separated Chapter IDs to update")
+    @where_option(CHAPTER)
+    @click.option('--course-id', type=int, help="New course ID")
+    @click.option('--title', help="New title")
+    @click.option('--video-url', help="New video URL")
+    @click.option('--content', help="New content")
+    @click.option('--content-file', type=click.File('r', encoding='utf-8'),
+                  help="Read the new content from this file ('-' for stdin)")
+    def update(id, ids, where, course_id, title, video_url, content, content_file):
+        """Update one or many chapters in a single statement."""
+        if content_file is not None:
+            if content is not None:
+                raise click.UsageError("Use either --content or --content-file, not both.")
+            content = content_file.read()
+        values = (course_id, title, video_url, content)
+        if all(v is None for v in values):
+            click.echo("Nothing to update.")
+            return
+        statement = repository.update_statement(CHAPTER, values, collect_ids(id, ids), where)
+        conn = get_connection()
+        if conn is None:
+            return
+        try:
+            updated = repository.update(conn, CHAPTER, statement)
+            if updated:
+                click.echo(f"Updated chapter ID(s): {', '.join(map(str, updated))}")
+            else:
+                click.echo("No matching chapters found.")
+        except Exception as e:
+            conn.rollback()
+            click.echo(f"Error updating chapter: {e}")
+        finally:
+            conn.close()
 
     @chapter.command()
-    @click.option('--id', required=True, type=int)
-    def delete(id):
-        """Delete a chapter (not implemented)."""
-        click.echo("Delete chapter - implementation pending.")
\ No newline at end of file
+    @click.option('--id', multiple=True, type=int, help="Chapter ID to delete (repeatable)")
+    @click.option('--ids', type=ID_LIST, help="Comma-separated Chapter IDs to delete")
+    @from_file_option("File with one Chapter ID per line")
+    @page_size_option
+    @click.confirmation_option(prompt="Are you sure you want to delete the selected chapters?")
+    def delete(id, ids, from_file, page_size):
+        """Delete one or many chapters by ID."""
+        targets = collect_target_ids(id, ids, from_file)
+        conn = get_connection()
+        if conn is None:
+            return
+        deleted = []
+        try:
+            for page_ids in repository.delete(conn, CHAPTER, targets, page_size):
+                deleted.extend(page_ids)
+            echo_deleted('chapter', 'Chapter', targets, deleted)
+        except Exception as e:
+            conn.rollback()
+            echo_deleted('chapter', 'Chapter', deleted, deleted)
+            click.echo(f"Error deleting chapter: {e}")
+        finally:
+            conn.close()
+
+    add_import_command(chapter, CHAPTER)
+    add_export_command(chapter, CHAPTER)
@@ -1,6 +1,19 @@
 import click
-from db_connection import get_connection
-from queries import COURSE_INSERT, COURSE_SELECT_ALL, COURSE_SELECT_BY_ID, COURSE_UPDATE, COURSE_DELETE
+import repository
+from db_connection import get_connection, read_params
+from bulk import add_import_command
+from export import add_export_command
+from streaming import echo_rows
+from output import echo_notice, echo_row
+from listing import list_options, collect_ids, where_option, ID_LIST
+from batch import collect_rows, collect_target_ids, echo_created, echo_deleted, from_file_option, page_size_option, concurrency_option
+from tables import COURSE, FEATURE_STORE
+from cache import invalidate_table
+
+
+def _format_course(c):
+    return f"ID: {c[0]}, Title: {c[1]}, Instructor ID: {c[2]}, Description: {c[3]}, Price: ${c[4]:.2f}"
+
 
 def add_commands(cli):
     """Adds Course-related commands to the CLI."""
@@ -10,47 +23,49 @@ def add_commands(cli):
         pass
 
     @course.command()
-    @click.option('--title', required=True, help="Course title")
-    @click.option('--instructor-id', required=True, type=int, help="Instructor's user ID")
-    @click.option('--description', required=True, help="Course description")
-    @click.option('--price', required=True, type=float, help="Course price")
-    def create(title, instructor_id, description, price):
-        """Create a new course."""
+    @click.option('--title', multiple=True, help="Course title")
+    @click.option('--instructor-id', multiple=True, type=int, help="Instructor's user ID")
+    @click.option('--description', multiple=True, help="Course description")
+    @click.option('--price', multiple=True, type=float, help="Course price")
+    @from_file_option("CSV or JSONL file with one course per row")
+    @page_size_option
+    def create(title, instructor_id, description, price, from_file, page_size):
+        """Create one or many courses.
+
+        Repeat the options to create several rows at once; an option given
+        only once applies to every row.
+        """
+        rows = collect_rows(COURSE, ('title', 'instructor_id', 'description', 'price'), (title, instructor_id, description, price), from_file)
         conn = get_connection()
         if conn is None:
             return
+        created = []
         try:
-            with conn.cursor() as cur:
-                cur.execute(COURSE_INSERT, (title, instructor_id, description, price))
-                course_id = cur.fetchone()[0]
-                conn.commit()
-                click.echo(click.style(f"Created course with ID: {course_id}", fg='green'))
-        except psycopg2.IntegrityError as e:
-            conn.rollback()
-            click.echo(f"Error: Instructor ID {instructor_id} does not exist.")
+            for page_ids in repository.create(conn, COURSE, rows, page_size):
+                created.extend(page_ids)
+            echo_created('course', created)
         except Exception as e:
             conn.rollback()
+            echo_created('course', created)
             click.echo(f"Error creating course: {e}")
         finally:
             conn.close()
 
     @course.command()
-    def list():
-        """List all courses."""
-        conn = get_connection()
+    @list_options(COURSE)
+    def list(itersize, limit, after_id, order_by, desc, **filters):
+        """List courses, optionally filtered and paged."""
+        conn = get_connection(readonly=True)
         if conn is None:
             return
         try:
-            with conn.cursor() as cur:
-                cur.execute(COURSE_SELECT_ALL)
-                courses = cur.fetchall()
-                if not courses:
-                    click.echo("No courses found.")
-                    return
-                for c in courses:
-                    click.echo(f"ID: {c[0]}, Title: {c[1]}, Instructor ID: {c[2]}, Description: {c[3]}, Price: ${c[4]:.2f}")
+            rows = repository.list_rows(conn, COURSE, filters, after_id, order_by, desc, limit, itersize)
+            if not echo_rows(rows, _format_course, repository.statements(COURSE).columns):
+                echo_notice("No courses found.")
+        except click.UsageError:
+            raise
         except Exception as e:
-            click.echo(f"Error listing courses: {e}")
+            echo_notice(f"Error listing courses: {e}")
         finally:
             conn.close()
 
@@ -58,43 +73,62 @@ def add_commands(cli):
     @click.option('--id', required=True, type=int, help="Course ID to retrieve")
     def get(id):
         """Get a course by ID."""
-        conn = get_connection()
-        if conn is None:
-            return
         try:
-            with conn.cursor() as cur:
-                cur.execute(COURSE_SELECT_BY_ID, (id,))
-                course = cur.fetchone()
-                if course:
-                    click.echo(f"ID: {course[0]}, Title: {course[1]}, Instructor ID: {course[2]}, Description: {course[3]}, Price: ${course[4]:.2f}")
-                else:
-                    click.echo(f"Course with ID {id} not found.")
+            course = repository.get(COURSE, id)
+            if course:
+                echo_row(course, _format_course, repository.statements(COURSE).columns)
+            else:
+                echo_notice(f"Course with ID {id} not found.")
         except Exception as e:
-            click.echo(f"Error retrieving course: {e}")
-        finally:
-            conn.close()
+            echo_notice(f"Error retrieving course: {e}")
+
+    @course.command('get-many')
+    @click.option('--id', multiple=True, type=int, help="Course ID to retrieve (repeatable)")
+    @click.option('--ids', type=ID_LIST, help="Comma-separated Course IDs to retrieve")
+    @from_file_option("File with one Course ID per line")
+    @concurrency_option
+    def get_many(id, ids, from_file, concurrency):
+        """Get many courses by ID with concurrent lookups."""
+        import async_engine
+        targets = collect_target_ids(id, ids, from_file, 'retrieve')
+        try:
+            async def fetch():
+                async with async_engine.AsyncEngine(read_params(), concurrency) as engine:
+                    return await async_engine.fetch_by_ids(engine, repository.statements(COURSE).select_by_id, targets)
+            courses = async_engine.run(fetch())
+            for id, course in courses.items():
+                if not course:
+                    echo_notice(f"Course with ID {id} not found.")
+            echo_rows((course for course in courses.values() if course), _format_course,
+                      repository.statements(COURSE).columns)
+        except ImportError:
+            echo_notice(f"Error retrieving courses: {async_engine.ASYNCPG_MISSING}")
+        except Exception as e:
+            echo_notice(f"Error retrieving courses: {e}")
 
     @course.command()
-    @click.option('--id', required=True, type=int, help="Course ID to update")
+    @click.option('--id', type=int, help="Course ID to update")
+    @click.option('--ids', type=ID_LIST, help="Comma-separated Course IDs to update")
+    @where_option(COURSE)
     @click.option('--title', help="New title")
     @click.option('--description', help="New description")
     @click.option('--price', type=float, help="New price")
-    def update(id, title, description, price):
-        """Update a course's details."""
+    def update(id, ids, where, title, description, price):
+        """Update one or many courses in a single statement."""
+        values = (title, description, price)
+        if all(v is None for v in values):
+            click.echo("Nothing to update.")
+            return
+        statement = repository.update_statement(COURSE, values, collect_ids(id, ids), where)
         conn = get_connection()
         if conn is None:
             return
         try:
-            with conn.cursor() as cur:
-                cur.execute(COURSE_SELECT_BY_ID, (id,))
-                current = cur.fetchone()
-                if not current:
-                    click.echo(f"Course with ID {id} not found.")
-                    return
-                new_title, new_desc, new_price = title or current[1], description or current[3], price if price is not None else current[4]
-                cur.execute(COURSE_UPDATE, (new_title, new_desc, new_price, id))
-                conn.commit()
-                click.echo(f"Updated course ID: {id}")
+            updated = repository.update(conn, COURSE, statement)
+            if updated:
+                click.echo(f"Updated course ID(s): {', '.join(map(str, updated))}")
+            else:
+                click.echo("No matching courses found.")
         except Exception as e:
             conn.rollback()
             click.echo(f"Error updating course: {e}")
@@ -102,23 +136,30 @@ def add_commands(cli):
             conn.close()
 
     @course.command()
-    @click.option('--id', required=True, type=int, help="Course ID to delete")
-    @click.confirmation_option(prompt="Are you sure you want to delete this course?")
-    def delete(id):
-        """Delete a course by ID."""
+    @click.option('--id', multiple=True, type=int, help="Course ID to delete (repeatable)")
+    @click.option('--ids', type=ID_LIST, help="Comma-separated Course IDs to delete")
+    @from_file_option("File with one Course ID per line")
+    @page_size_option
+    @click.confirmation_option(prompt="Are you sure you want to delete the selected courses?")
+    def delete(id, ids, from_file, page_size):
+        """Delete one or many courses by ID."""
+        targets = collect_target_ids(id, ids, from_file)
         conn = get_connection()
         if conn is None:
             return
+        deleted = []
         try:
-            with conn.cursor() as cur:
-                cur.execute(COURSE_DELETE, (id,))
-                if cur.rowcount > 0:
-                    conn.commit()
-                    click.echo(f"Deleted course ID: {id}")
-                else:
-                    click.echo(f"Course with ID {id} not found.")
+            for page_ids in repository.delete(conn, COURSE, targets, page_size):
+                deleted.extend(page_ids)
+            echo_deleted('course', 'Course', targets, deleted)
         except Exception as e:
             conn.rollback()
+            echo_deleted('course', 'Course', deleted, deleted)
             click.echo(f"Error deleting course: {e}")
         finally:
-            conn.close()
\ No newline at end of file
+            if deleted:
+                invalidate_table(FEATURE_STORE)  # ON DELETE CASCADE of Feature_Store.course_id
+            conn.close()
+
+    add_import_command(course, COURSE)
+    add_export_command(course, COURSE)
\ No newline at end of file
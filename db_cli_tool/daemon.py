@@ -0,0 +1,320 @@
+# Warm daemon mode for db_tool.py: `db_tool.py serve` keeps an interpreter,
+# the imported command modules and the connection pool alive behind a Unix
+# domain socket, and regular invocations forward their arguments to it.
+# Only the standard library is imported here because the client side runs
+# before click and psycopg2 would be loaded.
+import io
+import marshal
+import os
+import socket
+import stat
+import struct
+import sys
+
+# Frames are a one-byte kind and a 4-byte big-endian payload length.
+# Requests are marshal-encoded (json/tempfile alone would double the client's
+# import time); client and daemon run the same interpreter.
+# Client -> server: 'r' request dict, 'i' a line of stdin (empty at EOF).
+# Server -> client: 'o' stdout bytes, 'e' stderr bytes, 'i' stdin wanted,
+# 'x' exit status (ASCII), 'n' not served: run the command in-process.
+_HEADER = struct.Struct('!cI')
+
+CONNECT_TIMEOUT = 0.5  # seconds to wait for a daemon before running in-process
+
+# The client's DB_TOOL_* variables are forwarded with each request. These are
+# read once when the daemon starts (connection settings, the pools, the
+# cache), so a client whose values differ from the daemon's runs in-process;
+# all others, e.g. DB_TOOL_CHANGED_BY, are applied for the length of the request.
+STARTUP_ENV = ('DB_TOOL_DSN', 'DB_TOOL_REPLICAS', 'DB_TOOL_CACHE', 'DB_TOOL_CACHE_TTL', 'DB_TOOL_PREPARE')
+# Read by the client only
+_CLIENT_ENV = ('DB_TOOL_NO_DAEMON', 'DB_TOOL_SOCKET')
+
+
+def socket_dir():
+    """Returns the directory of the default socket.
+
+    That is $XDG_RUNTIME_DIR, which only the user can access, or else a
+    db_tool-<uid> directory in the temp dir that serve() creates with mode
+    0700.
+    """
+    runtime = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime:
+        return runtime
+    return os.path.join(os.environ.get('TMPDIR', '/tmp'), f"db_tool-{os.getuid()}")
+
+
+def socket_path():
+    """Returns the daemon socket path: $DB_TOOL_SOCKET or db_tool.sock in socket_dir()."""
+    return os.environ.get('DB_TOOL_SOCKET') or os.path.join(socket_dir(), 'db_tool.sock')
+
+
+def _is_private(path, file_type):
+    """Tells whether `path` is a `file_type` (stat.S_ISSOCK, S_ISDIR) owned by this user, with no group or other access."""
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    return file_type(st.st_mode) and st.st_uid == os.getuid() and not st.st_mode & 0o077
+
+
+def _make_private_dir(path):
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    if not _is_private(path, stat.S_ISDIR):
+        raise RuntimeError(f"{path} must be a directory that only you can access")
+
+
+def _peer_uid(conn):
+    """Returns the user ID of the process at the other end of `conn`, or None where the platform can't tell."""
+    option = getattr(socket, 'SO_PEERCRED', None)
+    if option is None:
+        return None
+    _, uid, _ = struct.unpack('3i', conn.getsockopt(socket.SOL_SOCKET, option, struct.calcsize('3i')))
+    return uid
+
+
+def tool_env():
+    """Returns this process's DB_TOOL_* variables that a daemon should see."""
+    return {name: value for name, value in os.environ.items()
+            if name.startswith('DB_TOOL_') and name not in _CLIENT_ENV}
+
+
+def _set_tool_env(env):
+    for name in tool_env():
+        del os.environ[name]
+    os.environ.update(env)
+
+
+def _send(sock, kind, payload=b''):
+    sock.sendall(_HEADER.pack(kind, len(payload)) + payload)
+
+
+def _recv_exact(sock, size):
+    data = b''
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("daemon connection closed")
+        data += chunk
+    return data
+
+
+def _recv(sock):
+    kind, size = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    return kind, _recv_exact(sock, size)
+
+
+def _connect(path):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(CONNECT_TIMEOUT)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+    sock.settimeout(None)
+    return sock
+
+
+def forward(argv, path=None):
+    """Runs a command line in the daemon and replays its output.
+
+    Returns the command's exit status, or None if the caller should run it
+    in-process: no daemon is listening, DB_TOOL_NO_DAEMON is set, or the
+    socket isn't owned by this user and private to them, which a daemon
+    started by someone else would not be.
+    """
+    if os.environ.get('DB_TOOL_NO_DAEMON'):
+        return None
+    path = path or socket_path()
+    if not _is_private(path, stat.S_ISSOCK):
+        return None
+    sock = _connect(path)
+    if sock is None:
+        return None
+    request = {
+        'argv': argv,
+        'cwd': os.getcwd(),
+        'env': tool_env(),
+        'tty': {'stdout': sys.stdout.isatty(), 'stderr': sys.stderr.isatty()},
+    }
+    started = False
+    with sock:
+        try:
+            _send(sock, b'r', marshal.dumps(request))
+            while True:
+                kind, payload = _recv(sock)
+                started = True
+                if kind == b'o':
+                    sys.stdout.buffer.write(payload)
+                    sys.stdout.buffer.flush()
+                elif kind == b'e':
+                    sys.stderr.buffer.write(payload)
+                    sys.stderr.buffer.flush()
+                elif kind == b'i':
+                    _send(sock, b'i', sys.stdin.buffer.readline())
+                elif kind == b'x':
+                    return int(payload)
+                elif kind == b'n':
+                    return None
+        except ConnectionError:
+            if not started:
+                return None  # e.g. a daemon from an older version: run it here instead
+            sys.stderr.write("Error: lost connection to the db_tool daemon\n")
+            return 1
+
+
+def stop(path=None):
+    """Asks a running daemon to exit; returns False if none is listening."""
+    path = path or socket_path()
+    sock = _connect(path) if _is_private(path, stat.S_ISSOCK) else None
+    if sock is None:
+        return False
+    with sock:
+        _send(sock, b'r', marshal.dumps({'shutdown': True}))
+        _recv(sock)
+    return True
+
+
+class _FrameWriter(io.RawIOBase):
+    """Raw stream that sends everything written to it as frames of one kind."""
+
+    def __init__(self, sock, kind, tty):
+        self.sock = sock
+        self.kind = kind
+        self.tty = tty
+
+    def writable(self):
+        return True
+
+    def isatty(self):
+        # Lets click keep colours when the client's terminal supports them
+        return self.tty
+
+    def write(self, data):
+        _send(self.sock, self.kind, bytes(data))
+        return len(data)
+
+
+class _FrameReader(io.RawIOBase):
+    """Raw stream that requests stdin from the client a line at a time (for prompts)."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self._pending = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if not self._pending:
+            _send(self.sock, b'i')
+            kind, self._pending = _recv(self.sock)
+            if not self._pending:
+                return 0
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+def _text_stream(raw):
+    return io.TextIOWrapper(io.BufferedWriter(raw) if raw.writable() else io.BufferedReader(raw),
+                            encoding='utf-8', errors='replace', write_through=True)
+
+
+def _run(cli, sock, request):
+    """Runs one forwarded command with stdio and DB_TOOL_* variables of the client; returns its exit status."""
+    tty = request.get('tty', {})
+    streams = (sys.stdin, sys.stdout, sys.stderr)
+    cwd = os.getcwd()
+    env = tool_env()
+    _set_tool_env(request.get('env', {}))
+    sys.stdin = _text_stream(_FrameReader(sock))
+    sys.stdout = _text_stream(_FrameWriter(sock, b'o', tty.get('stdout', False)))
+    sys.stderr = _text_stream(_FrameWriter(sock, b'e', tty.get('stderr', False)))
+    try:
+        os.chdir(request.get('cwd', cwd))
+        cli.main(args=request['argv'], prog_name='db_tool.py')
+        status = 0
+    except SystemExit as e:
+        status = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except Exception:
+        import traceback
+        traceback.print_exc()
+        status = 1
+    finally:
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except OSError:
+                pass
+        sys.stdin, sys.stdout, sys.stderr = streams
+        os.chdir(cwd)
+        _set_tool_env(env)
+    return status
+
+
+def serve(cli, path=None, idle_timeout=None, on_ready=None):
+    """Serves forwarded command lines for `cli` until stopped.
+
+    Requests are handled one at a time in this process, so imported modules
+    and pooled connections stay warm between invocations. Exits after
+    `idle_timeout` seconds without a request, when asked to by stop(), or on
+    SIGINT/SIGTERM. Connections from other users are refused, and so are
+    requests whose STARTUP_ENV variables differ from this process's.
+    """
+    if path is None:
+        path = socket_path()
+        if not os.environ.get('DB_TOOL_SOCKET'):
+            _make_private_dir(socket_dir())
+    if os.path.exists(path):
+        probe = _connect(path)
+        if probe is not None:
+            probe.close()
+            raise RuntimeError(f"a daemon is already listening on {path}")
+        os.unlink(path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o077)  # the socket runs commands as this user: keep it private
+    try:
+        server.bind(path)
+    finally:
+        os.umask(old_umask)
+    server.listen(16)
+    server.settimeout(idle_timeout)
+    import signal
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    started_env = tool_env()
+    if on_ready:
+        on_ready(path)
+    try:
+        while True:
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                return
+            with conn:
+                uid = _peer_uid(conn)
+                if uid is not None and uid != os.getuid():
+                    continue
+                try:
+                    kind, payload = _recv(conn)
+                    request = marshal.loads(payload)
+                    if request.get('shutdown'):
+                        _send(conn, b'x', b'0')
+                        return
+                    client_env = request.get('env', {})
+                    if any(client_env.get(name) != started_env.get(name) for name in STARTUP_ENV):
+                        _send(conn, b'n')
+                        continue
+                    status = _run(cli, conn, request)
+                    _send(conn, b'x', str(status).encode())
+                except (ConnectionError, OSError, ValueError, EOFError):
+                    # The client went away mid-command; keep serving others
+                    continue
+    finally:
+        server.close()
+        if os.path.exists(path):
+            os.unlink(path)
@@ -1,6 +1,14 @@
-import psycopg2
+import atexit
+import itertools
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
 
-# Hardcoded for demo; in production, use environment variables or a config file
+# Connection settings of the primary, which takes every write. DB_TOOL_DSN
+# (a libpq connection string or URI) overrides the keys it sets.
 DB_PARAMS = {
     'dbname': 'lms_db',
     'user': 'postgres',
@@ -8,12 +16,517 @@ DB_PARAMS = {
     'host': 'localhost',
     'port': '5432'
 }
+# Connection settings of the read replicas that read-only commands are spread
+# over, from DB_TOOL_REPLICAS; empty means everything goes to the primary
+REPLICA_PARAMS = []
+# Seconds a replica that refused a connection is skipped before being tried again
+REPLICA_RETRY_AFTER = 30
 
-def get_connection():
-    """Establishes a connection to the PostgreSQL database."""
-    try:
-        conn = psycopg2.connect(**DB_PARAMS)
+# Connection pool tuning
+POOL_MIN_SIZE = 1            # connections opened on first use and kept open even when idle
+POOL_MAX_SIZE = 10           # hard cap on open connections
+POOL_MAX_IDLE = 300          # seconds an idle connection is kept before being recycled
+POOL_TIMEOUT = 30            # seconds to wait for a free connection when the pool is exhausted
+POOL_PING_AFTER = 30         # idle seconds after which a checkout pings the server first
+# Run the hot statements as server-side prepared statements (see execute_prepared);
+# set DB_TOOL_PREPARE=off behind poolers that don't keep sessions, e.g. PgBouncer in transaction mode
+PREPARE_STATEMENTS = os.environ.get('DB_TOOL_PREPARE', 'on') != 'off'
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes available in time."""
+
+
+def params_from_dsn(dsn):
+    """Turns a libpq connection string or URI into psycopg2 connect() keyword arguments."""
+    from psycopg2.extensions import parse_dsn
+    return parse_dsn(dsn)
+
+
+def replica_params(endpoint, primary=None):
+    """Returns the connect() arguments of one DB_TOOL_REPLICAS endpoint.
+
+    A `host[:port]` endpoint takes its other settings (database, user,
+    password) from `primary`, DB_PARAMS by default; a connection string or
+    URI overrides just the keys it sets.
+    """
+    params = dict(DB_PARAMS if primary is None else primary)
+    if '=' in endpoint or '://' in endpoint:
+        params.update(params_from_dsn(endpoint))
+    else:
+        host, _, port = endpoint.partition(':')
+        params['host'] = host
+        if port:
+            params['port'] = port
+    return params
+
+
+def configure_from_env(environ=os.environ):
+    """Applies DB_TOOL_DSN to DB_PARAMS and fills REPLICA_PARAMS from DB_TOOL_REPLICAS.
+
+    DB_TOOL_REPLICAS is a comma-separated list of endpoints (see
+    replica_params). Runs at import; psycopg2 is only imported when there
+    is a connection string to parse. Pools already open keep their settings
+    until close_pool().
+    """
+    if environ.get('DB_TOOL_DSN'):
+        DB_PARAMS.update(params_from_dsn(environ['DB_TOOL_DSN']))
+    endpoints = [e.strip() for e in environ.get('DB_TOOL_REPLICAS', '').split(',')]
+    REPLICA_PARAMS[:] = [replica_params(endpoint) for endpoint in endpoints if endpoint]
+
+
+configure_from_env()
+
+
+_connection_class = None
+
+
+def _pooled_connection_class():
+    """Returns the PooledConnection class, importing psycopg2 on first use.
+
+    psycopg2 (and the libpq/ssl stack behind it) is most of the CLI's import
+    time, so it is only loaded once a connection is actually opened.
+    """
+    global _connection_class
+    if _connection_class is None:
+        import psycopg2.extensions
+
+        class PooledConnection(psycopg2.extensions.connection):
+            """A psycopg2 connection whose close() hands it back to its pool."""
+
+            pool = None
+            checked_out = False
+            fresh = False
+            prepared = None  # statement text -> name of its PREPAREd statement on this session
+
+            def close(self):
+                if self.pool is None:
+                    super().close()
+                elif self.checked_out:
+                    self.pool.release(self)
+
+            def discard(self):
+                """Really closes the underlying connection."""
+                self.pool = None
+                super().close()
+
+        _connection_class = PooledConnection
+    return _connection_class
+
+
+_profiler = None
+
+
+def set_profiler(profiler):
+    """Routes statements on connections checked out from now on through `profiler`.
+
+    `profiler` is a profiling.Profiler (or any object with its hook methods:
+    connected, begin, executed, fetched); None switches profiling off again.
+    """
+    global _profiler
+    _profiler = profiler
+
+
+def get_profiler():
+    """Returns the profiler installed with set_profiler(), or None."""
+    return _profiler
+
+
+_cursor_class = None
+
+
+def profiling_cursor_class():
+    """Returns the ProfilingCursor class, importing psycopg2 on first use."""
+    global _cursor_class
+    if _cursor_class is None:
+        import psycopg2.extensions
+
+        class ProfilingCursor(psycopg2.extensions.cursor):
+            """A cursor that reports execute and fetch time, rows and bytes of its statements.
+
+            Reports go to the profiler installed when the cursor was created;
+            without one it behaves like a plain cursor. Pass it as
+            `cursor_factory` to instrument connections made elsewhere.
+            """
+
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self.profiler = _profiler
+                self.record = None
+
+            def _timed(self, method, query, *args, vars=None, explain=False):
+                if self.profiler is None:
+                    return method(query, *args)
+                self.record = self.profiler.begin(self, query)
+                start = time.perf_counter()
+                try:
+                    result = method(query, *args)
+                finally:
+                    self.record.execute_s += time.perf_counter() - start
+                self.profiler.executed(self, query, vars, self.record, explain)
+                return result
+
+            def execute(self, query, vars=None):
+                return self._timed(super().execute, query, vars, vars=vars, explain=True)
+
+            def executemany(self, query, vars_list):
+                return self._timed(super().executemany, query, vars_list)
+
+            def copy_expert(self, sql, file, size=8192):
+                return self._timed(super().copy_expert, sql, file, size)
+
+            def _fetched(self, start, rows):
+                if self.profiler is not None and self.record is not None:
+                    self.profiler.fetched(self.record, time.perf_counter() - start, rows)
+                return rows
+
+            def fetchone(self):
+                start = time.perf_counter()
+                row = super().fetchone()
+                self._fetched(start, [] if row is None else [row])
+                return row
+
+            def fetchmany(self, size=None):
+                start = time.perf_counter()
+                return self._fetched(start, super().fetchmany(self.arraysize if size is None else size))
+
+            def fetchall(self):
+                start = time.perf_counter()
+                return self._fetched(start, super().fetchall())
+
+            def __iter__(self):
+                # Named cursors fetch `itersize` rows per round trip, like psycopg2's own iterator
+                if not self.name:
+                    yield from self.fetchall()
+                    return
+                while True:
+                    rows = self.fetchmany(self.itersize)
+                    if not rows:
+                        return
+                    yield from rows
+
+        _cursor_class = ProfilingCursor
+    return _cursor_class
+
+
+class ConnectionPool:
+    """A thread-safe pool of warm connections.
+
+    Connections are checked out with acquire() and returned by release()
+    (or simply by calling close() on them). Checkout verifies that a
+    connection is still usable, pinging the server if it has been idle for
+    a while, and connections idle for longer than `max_idle` are recycled
+    down to `min_size`. The first checkout opens `min_size` connections up
+    front, so the checkouts after it find them warm.
+    """
+
+    def __init__(self, params, min_size=POOL_MIN_SIZE, max_size=POOL_MAX_SIZE,
+                 max_idle=POOL_MAX_IDLE, timeout=POOL_TIMEOUT, ping_after=POOL_PING_AFTER):
+        self.params = params
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self._idle = []  # (connection, released_at), most recently used last
+        self._size = 0
+        self._cond = threading.Condition()
+        self._filled = False
+        self.down_until = 0  # replicas: time.monotonic() until which read routing skips this pool
+
+    def _connect(self):
+        import psycopg2
+        conn = psycopg2.connect(connection_factory=_pooled_connection_class(), **self.params)
+        conn.pool = self
+        conn.fresh = True
+        conn.prepared = {}
         return conn
+
+    def _is_healthy(self, conn, idle_for):
+        import psycopg2
+        if conn.closed or conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            return False
+        if idle_for < self.ping_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _recycle_idle(self):
+        """Closes connections idle for too long; must be called with the lock held."""
+        now = time.monotonic()
+        while len(self._idle) > 0 and self._size > self.min_size and now - self._idle[0][1] > self.max_idle:
+            conn, _ = self._idle.pop(0)
+            self._size -= 1
+            conn.discard()
+
+    def _fill(self):
+        """Opens connections up to `min_size` the first time it is called."""
+        with self._cond:
+            if self._filled:
+                return
+            self._filled = True
+            missing = max(self.min_size - self._size, 0)
+            self._size += missing
+        for opened in range(missing):
+            try:
+                conn = self._connect()
+            except Exception:
+                for _ in range(missing - opened):
+                    self._forget()
+                raise
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+
+    def acquire(self):
+        """Checks out a healthy connection, opening a new one if below `max_size`.
+
+        With a profiler installed (see set_profiler) the checkout time is
+        reported and the connection hands out ProfilingCursors.
+        """
+        start = time.perf_counter()
+        conn = self._checkout()
+        if _profiler is not None:
+            conn.cursor_factory = profiling_cursor_class()
+            _profiler.connected(time.perf_counter() - start, conn.fresh)
+        conn.fresh = False
+        return conn
+
+    def _checkout(self):
+        self._fill()
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self._cond:
+                while True:
+                    self._recycle_idle()
+                    if self._idle:
+                        conn, released_at = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        conn = None
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeout(f"no connection available after {self.timeout}s")
+                    self._cond.wait(remaining)
+            if conn is None:
+                try:
+                    conn = self._connect()
+                    conn.checked_out = True
+                    return conn
+                except Exception:
+                    self._forget()
+                    raise
+            if self._is_healthy(conn, time.monotonic() - released_at):
+                conn.checked_out = True
+                return conn
+            conn.discard()
+            self._forget()
+
+    def release(self, conn):
+        """Returns a connection to the pool, rolling back any open transaction."""
+        import psycopg2
+        conn.checked_out = False
+        conn.cursor_factory = None
+        if conn.closed:
+            conn.discard()
+            self._forget()
+            return
+        try:
+            if conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+            if conn.autocommit:
+                conn.autocommit = False
+        except psycopg2.Error:
+            conn.discard()
+            self._forget()
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def _forget(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def closeall(self):
+        """Closes every idle connection; checked-out ones are closed on release."""
+        with self._cond:
+            for conn, _ in self._idle:
+                conn.discard()
+            self._size -= len(self._idle)
+            self._idle = []
+
+
+_pool = None
+_replica_pools = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+# Read-only checkouts take the replicas in turn, from a random first one so
+# that many short CLI runs spread out as well
+_replica_turn = itertools.count(random.randrange(1024))
+_primary_only = False
+
+
+def _reset_after_fork():
+    """Forgets the pools of a parent process; must be called with the lock held."""
+    global _pool, _replica_pools, _pool_pid
+    # A forked child must not share its parent's sockets
+    if _pool_pid != os.getpid():
+        _pool, _replica_pools, _pool_pid = None, None, os.getpid()
+
+
+def get_pool():
+    """Returns the process-wide connection pool of the primary, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        _reset_after_fork()
+        if _pool is None:
+            _pool = ConnectionPool(DB_PARAMS)
+        return _pool
+
+
+def get_replica_pools():
+    """Returns a process-wide pool per REPLICA_PARAMS entry, creating them on first use."""
+    global _replica_pools
+    with _pool_lock:
+        _reset_after_fork()
+        if _replica_pools is None:
+            _replica_pools = [ConnectionPool(params) for params in REPLICA_PARAMS]
+        return _replica_pools
+
+
+def close_pool():
+    """Closes the process-wide pools; the next get_connection() starts fresh ones."""
+    global _pool, _replica_pools
+    with _pool_lock:
+        if _pool_pid == os.getpid():
+            for pool in [_pool] + (_replica_pools or []):
+                if pool is not None:
+                    pool.closeall()
+        _pool, _replica_pools = None, None
+
+
+atexit.register(close_pool)
+
+
+def set_primary_only(enabled):
+    """Routes read-only checkouts to the primary as well (the global --primary option).
+
+    Reads then see every write committed before them, which a lagging
+    replica may not have replayed yet.
+    """
+    global _primary_only
+    _primary_only = enabled
+
+
+def _replicas_in_turn():
+    """Returns the replica pools to try for a read-only checkout, in round-robin order.
+
+    Replicas that recently refused a connection are left out; with
+    set_primary_only() there are none.
+    """
+    pools = [] if _primary_only else get_replica_pools()
+    if not pools:
+        return []
+    start = next(_replica_turn) % len(pools)
+    now = time.monotonic()
+    return [pool for pool in pools[start:] + pools[:start] if pool.down_until <= now]
+
+
+def _acquire(readonly):
+    if readonly:
+        import psycopg2
+        for pool in _replicas_in_turn():
+            try:
+                return pool.acquire()
+            except psycopg2.OperationalError:
+                pool.down_until = time.monotonic() + REPLICA_RETRY_AFTER
+            except PoolTimeout:
+                pass
+    return get_pool().acquire()
+
+
+def read_params():
+    """Returns the connect() arguments for a read-only client outside the pools, e.g. the asyncpg engine.
+
+    That is the next replica in turn, or DB_PARAMS with no replicas or
+    with set_primary_only().
+    """
+    pools = _replicas_in_turn()
+    return pools[0].params if pools else DB_PARAMS
+
+
+def get_connection(readonly=False):
+    """Checks out a pooled connection to the PostgreSQL database.
+
+    Connections are to the primary unless `readonly` is set: read-only
+    work goes to the read replicas in turn, skipping any that refuse
+    connections, and falls back to the primary when none is available.
+    Calling close() on the returned connection hands it back to its pool.
+    """
+    try:
+        return _acquire(readonly)
     except Exception as e:
         print(f"Error connecting to database: {e}")
-        return None
\ No newline at end of file
+        return None
+
+
+@contextmanager
+def connection(readonly=False):
+    """Context-manager form of get_connection().
+
+    Commits when the block succeeds, rolls back when it raises, and always
+    returns the connection to its pool. Connection errors propagate.
+    """
+    conn = _acquire(readonly)
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+_PLACEHOLDER = re.compile(r'%([s%])')
+
+
+def _positional(query):
+    """Rewrites psycopg2's `%s` placeholders as PREPARE's `$1, $2, ...`."""
+    numbers = itertools.count(1)
+    return _PLACEHOLDER.sub(lambda m: f"${next(numbers)}" if m.group(1) == 's' else '%', query)
+
+
+def execute_prepared(cur, query, params=()):
+    """Executes `query` as a prepared statement of the cursor's pooled connection.
+
+    The first call on a connection PREPAREs the statement, so the server
+    parses and analyzes it once; later calls only send `EXECUTE name (...)`,
+    and after a few executions the server may switch to a cached generic
+    plan. Prepared statements outlive transactions (a rollback keeps them)
+    and live as long as the pooled connection. Use it only for constant
+    statement texts such as the `queries.py` constants: every distinct text
+    stays prepared. Connections from outside the pool run the query as usual.
+    """
+    prepared = getattr(cur.connection, 'prepared', None)
+    if prepared is None or not PREPARE_STATEMENTS:
+        cur.execute(query, params)
+        return
+    name = prepared.get(query)
+    if name is None:
+        name = f"db_tool_{len(prepared) + 1}"
+        cur.execute(f"PREPARE {name} AS {_positional(query)}")
+        prepared[query] = name
+    if params:
+        cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+    else:
+        cur.execute(f"EXECUTE {name}")
@@ -1,49 +1,134 @@
+import sys
+
+# Hand the command to a running `serve` daemon before paying for click,
+# the command modules and a new database connection
+if __name__ == '__main__' and sys.argv[1:2] not in (['serve'], []):
+    from daemon import forward
+    status = forward(sys.argv[1:])
+    if status is not None:
+        sys.exit(status)
+
+import importlib
 import click
-from user import add_commands as add_user_commands
-from course import add_commands as add_course_commands
-from chapter import add_commands as add_chapter_commands
-from enrollment import add_commands as add_enrollment_commands
-from transaction import add_commands as add_transaction_commands
-from feature_store import add_commands as add_feature_store_commands
-from feature_store_audit import add_commands as add_feature_store_audit_commands
-
-@click.group()
-def cli():
+from click.utils import make_default_short_help
+from output import format_option, set_format
+
+# Command name -> (module providing add_commands(cli), short help shown in --help)
+LAZY_COMMANDS = {
+    'user': ('user', "Commands for managing the User table."),
+    'course': ('course', "Commands for managing the Course table."),
+    'chapter': ('chapter', "Commands for managing the Chapter table."),
+    'enrollment': ('enrollment', "Commands for managing the Enrollment table."),
+    'transaction': ('transaction', "Commands for managing the Transaction table."),
+    'feature-store': ('feature_store', "Commands for managing the Feature_Store table."),
+    'feature-store-audit': ('feature_store_audit', "Commands for managing the Feature_Store_Audit table."),
+    'report': ('report', "Pre-aggregated revenue and enrollment reports."),
+    'partition': ('partition', "Create, list and expire the monthly partitions of Transaction and Feature_Store_Audit."),
+    'seed': ('seed', "Load synthetic users, courses, chapters, enrollments, transactions and feature versions."),
+    'migrate': ('migrate', "Apply, revert and verify versioned schema migrations."),
+    'benchmark': ('benchmark', "Benchmarks for sizing batches and catching performance regressions."),
+}
+
+
+class LazyGroup(click.Group):
+    """A click group that imports a subcommand's module only when it is used.
+
+    `lazy_commands` maps command names to `(module, short_help)`. The module's
+    add_commands(cli) runs the first time the command is resolved, so
+    `--help` or a single `user get` doesn't import every table module (or
+    psycopg2) up front.
+    """
+
+    def __init__(self, *args, lazy_commands=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = lazy_commands or {}
+
+    def list_commands(self, ctx):
+        return sorted(set(self.commands) | set(self.lazy_commands))
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name not in self.commands and cmd_name in self.lazy_commands:
+            self._load(cmd_name)
+        return self.commands.get(cmd_name)
+
+    def _load(self, cmd_name):
+        module = importlib.import_module(self.lazy_commands[cmd_name][0])
+        registry = click.Group()
+        module.add_commands(registry)
+        self.add_command(registry.commands[cmd_name])
+
+    def format_commands(self, ctx, formatter):
+        # Same layout as click.Group, but unloaded commands use their listed
+        # help instead of being imported just to print it
+        rows = []
+        for name in self.list_commands(ctx):
+            cmd = self.commands.get(name)
+            if cmd is None:
+                rows.append((name, self.lazy_commands[name][1]))
+            elif not cmd.hidden:
+                rows.append((name, cmd))
+        if rows:
+            limit = formatter.width - 6 - max(len(name) for name, _ in rows)
+            rows = [(name, make_default_short_help(help, limit) if isinstance(help, str)
+                     else help.get_short_help_str(limit)) for name, help in rows]
+            with formatter.section("Commands"):
+                formatter.write_dl(rows)
+
+
+@click.group(cls=LazyGroup, lazy_commands=LAZY_COMMANDS)
+@click.option('--profile', '--timings', 'profile', is_flag=True,
+              help="Print where the command's time went (connect, execute, fetch, the rest) to stderr")
+@click.option('--profile-format', type=click.Choice(['table', 'json']), default='table', show_default=True,
+              help="Format of the --profile report")
+@click.option('--explain', is_flag=True,
+              help="Also profile each statement with EXPLAIN (ANALYZE, BUFFERS); implies --profile")
+@format_option
+@click.option('--primary', is_flag=True,
+              help="Run read-only commands on the primary instead of a read replica, to see your latest writes")
+@click.pass_context
+def cli(ctx, profile, profile_format, explain, output_format, primary):
     """CLI tool for performing CRUD operations on the database."""
-    pass
+    set_format(ctx, output_format)
+    if primary:
+        import db_connection
+        db_connection.set_primary_only(True)
+        ctx.call_on_close(lambda: db_connection.set_primary_only(False))
+    if profile or explain:
+        import profiling
+        profiler = profiling.start(explain, explain_format='json' if profile_format == 'json' else 'text')
+
+        def report():
+            profiling.stop(profiler)
+            profiling.echo_profile(profiler, profile_format)
 
-# Register all table commands
-add_user_commands(cli)
-add_course_commands(cli)
-add_chapter_commands(cli)
-add_enrollment_commands(cli)
-add_transaction_commands(cli)
-add_feature_store_commands(cli)
-add_feature_store_audit_commands(cli)
+        ctx.call_on_close(report)
 
 @cli.command()
-def init_sample_data():
-    """Insert sample data into the database for testing."""
-    conn = get_connection()
-    if conn is None:
+@click.option('--socket', 'path', help="Socket path (default: $DB_TOOL_SOCKET or db_tool.sock in a directory private to the user)")
+@click.option('--idle-timeout', type=click.FloatRange(min=0), help="Exit after this many seconds without a request")
+@click.option('--stop', is_flag=True, help="Stop the running daemon instead of starting one")
+def serve(path, idle_timeout, stop):
+    """Keep a warm process serving CLI invocations over a Unix socket.
+
+    While it runs, `python db_tool.py ...` forwards its arguments to this
+    process instead of starting up and connecting from scratch, and falls
+    back to running in-process when the daemon is not listening.
+    """
+    import daemon
+    if stop:
+        click.echo("Daemon stopped." if daemon.stop(path) else "No daemon is running.")
         return
+    # Import every command group now so the first forwarded call is warm too
+    for name in cli.list_commands(None):
+        cli.get_command(None, name)
     try:
-        with conn.cursor() as cur:
-            # Sample users
-            cur.execute(USER_INSERT, ("Alice", "alice@example.com", "instructor"))
-            alice_id = cur.fetchone()[0]
-            cur.execute(USER_INSERT, ("Bob", "bob@example.com", "student"))
-            bob_id = cur.fetchone()[0]
-            # Sample course
-            cur.execute(COURSE_INSERT, ("Python 101", alice_id, "Intro to Python", 49.99))
-            course_id = cur.fetchone()[0]
-            conn.commit()
-            click.echo("Sample data inserted: 2 users, 1 course.")
-    except Exception as e:
-        conn.rollback()
-        click.echo(f"Error inserting sample data: {e}")
-    finally:
-        conn.close()
+        daemon.serve(cli, path, idle_timeout,
+                     on_ready=lambda p: click.echo(f"Serving db_tool on {p} (Ctrl-C to stop)"))
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    except KeyboardInterrupt:
+        pass
+
 
 if __name__ == '__main__':
     cli()
\ No newline at end of file
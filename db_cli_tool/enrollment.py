@@ -1,6 +1,18 @@
 import click
+import repository
 from db_connection import get_connection
-from queries import ENROLLMENT_INSERT, ENROLLMENT_SELECT_ALL, ENROLLMENT_SELECT_BY_ID, ENROLLMENT_UPDATE, ENROLLMENT_DELETE
+from bulk import add_import_command
+from export import add_export_command
+from streaming import echo_rows
+from output import echo_notice, echo_row
+from listing import list_options, collect_ids, where_option, ID_LIST
+from batch import collect_rows, collect_target_ids, echo_created, echo_deleted, from_file_option, page_size_option, concurrency_option
+from tables import ENROLLMENT
+
+
+def _format_enrollment(e):
+    return f"ID: {e[0]}, User ID: {e[1]}, Course ID: {e[2]}"
+
 
 def add_commands(cli):
     """Adds Enrollment-related commands to the CLI."""
@@ -10,42 +22,76 @@ def add_commands(cli):
         pass
 
     @enrollment.command()
-    @click.option('--user-id', required=True, type=int, help="User ID")
-    @click.option('--course-id', required=True, type=int, help="Course ID")
-    def create(user_id, course_id):
-        """Create a new enrollment."""
+    @click.option('--user-id', multiple=True, type=int, help="User ID")
+    @click.option('--course-id', multiple=True, type=int, help="Course ID")
+    @from_file_option("CSV or JSONL file with one enrollment per row")
+    @page_size_option
+    def create(user_id, course_id, from_file, page_size):
+        """Create one or many enrollments.
+
+        Repeat the options to create several rows at once; an option given
+        only once applies to every row.
+        """
+        rows = collect_rows(ENROLLMENT, ('user_id', 'course_id'), (user_id, course_id), from_file)
         conn = get_connection()
         if conn is None:
             return
+        created = []
         try:
-            with conn.cursor() as cur:
-                cur.execute(ENROLLMENT_INSERT, (user_id, course_id))
-                enrollment_id = cur.fetchone()[0]
-                conn.commit()
-                click.echo(click.style(f"Created enrollment with ID: {enrollment_id}", fg='green'))
+            for page_ids in repository.create(conn, ENROLLMENT, rows, page_size):
+                created.extend(page_ids)
+            echo_created('enrollment', created)
         except Exception as e:
             conn.rollback()
+            echo_created('enrollment', created)
             click.echo(f"Error creating enrollment: {e}")
         finally:
             conn.close()
 
+    @enrollment.command('enroll-cohort')
+    @click.option('--course-id', required=True, type=int, help="Course to enroll the users in")
+    @click.option('--user-id', multiple=True, type=int, help="User ID to enroll (repeatable)")
+    @click.option('--user-ids', type=ID_LIST, help="Comma-separated User IDs to enroll")
+    @from_file_option("File with one User ID per line")
+    @concurrency_option
+    def enroll_cohort(course_id, user_id, user_ids, from_file, concurrency):
+        """Enroll a cohort of users in a course with concurrent inserts.
+
+        Every enrollment commits on its own, so users who are already
+        enrolled or do not exist are reported without failing the rest.
+        """
+        import async_engine
+        targets = collect_target_ids(user_id, user_ids, from_file, 'enroll')
+        try:
+            async def enroll():
+                async with async_engine.AsyncEngine(concurrency=concurrency) as engine:
+                    return await async_engine.enroll_cohort(engine, course_id, targets)
+            enrolled, failed = async_engine.run(enroll())
+            if enrolled:
+                click.echo(click.style(f"Enrolled {len(enrolled)} user(s) in course {course_id}: "
+                                       f"{', '.join(map(str, enrolled))}", fg='green'))
+            for failed_user, error in failed.items():
+                click.echo(f"User {failed_user} not enrolled: {error}")
+        except ImportError:
+            click.echo(f"Error enrolling cohort: {async_engine.ASYNCPG_MISSING}")
+        except Exception as e:
+            click.echo(f"Error enrolling cohort: {e}")
+
     @enrollment.command()
-    def list():
-        """List all enrollments."""
-        conn = get_connection()
+    @list_options(ENROLLMENT)
+    def list(itersize, limit, after_id, order_by, desc, **filters):
+        """List enrollments, optionally filtered and paged."""
+        conn = get_connection(readonly=True)
         if conn is None:
             return
         try:
-            with conn.cursor() as cur:
-                cur.execute(ENROLLMENT_SELECT_ALL)
-                enrollments = cur.fetchall()
-                if not enrollments:
-                    click.echo("No enrollments found.")
-                    return
-                for e in enrollments:
-                    click.echo(f"ID: {e[0]}, User ID: {e[1]}, Course ID: {e[2]}")
+            rows = repository.list_rows(conn, ENROLLMENT, filters, after_id, order_by, desc, limit, itersize)
+            if not echo_rows(rows, _format_enrollment, repository.statements(ENROLLMENT).columns):
+                echo_notice("No enrollments found.")
+        except click.UsageError:
+            raise
         except Exception as e:
-            click.echo(f"Error listing enrollments: {e}")
+            echo_notice(f"Error listing enrollments: {e}")
         finally:
             conn.close()
 
@@ -53,43 +99,37 @@ def add_commands(cli):
     @click.option('--id', required=True, type=int, help="Enrollment ID to retrieve")
     def get(id):
         """Get an enrollment by ID."""
-        conn = get_connection()
-        if conn is None:
-            return
         try:
-            with conn.cursor() as cur:
-                cur.execute(ENROLLMENT_SELECT_BY_ID, (id,))
-                enrollment = cur.fetchone()
-                if enrollment:
-                    click.echo(f"ID: {enrollment[0]}, User ID: {enrollment[1]}, Course ID: {enrollment[2]}")
-                else:
-                    click.echo(f"Enrollment with ID {id} not found.")
+            enrollment = repository.get(ENROLLMENT, id)
+            if enrollment:
+                echo_row(enrollment, _format_enrollment, repository.statements(ENROLLMENT).columns)
+            else:
+                echo_notice(f"Enrollment with ID {id} not found.")
         except Exception as e:
-            click.echo(f"Error retrieving enrollment: {e}")
-        finally:
-            conn.close()
+            echo_notice(f"Error retrieving enrollment: {e}")
 
     @enrollment.command()
-    @click.option('--id', required=True, type=int, help="Enrollment ID to update")
+    @click.option('--id', type=int, help="Enrollment ID to update")
+    @click.option('--ids', type=ID_LIST, help="Comma-separated Enrollment IDs to update")
+    @where_option(ENROLLMENT)
     @click.option('--user-id', type=int, help="New User ID")
     @click.option('--course-id', type=int, help="New Course ID")
-    def update(id, user_id, course_id):
-        """Update an enrollment's details."""
+    def update(id, ids, where, user_id, course_id):
+        """Update one or many enrollments in a single statement."""
+        values = (user_id, course_id)
+        if all(v is None for v in values):
+            click.echo("Nothing to update.")
+            return
+        statement = repository.update_statement(ENROLLMENT, values, collect_ids(id, ids), where)
         conn = get_connection()
         if conn is None:
             return
         try:
-            with conn.cursor() as cur:
-                cur.execute(ENROLLMENT_SELECT_BY_ID, (id,))
-                current = cur.fetchone()
-                if not current:
-                    click.echo(f"Enrollment with ID {id} not found.")
-                    return
-                new_user_id = user_id if user_id is not None else current[1]
-                new_course_id = course_id if course_id is not None else current[2]
-                cur.execute(ENROLLMENT_UPDATE, (new_user_id, new_course_id, id))
-                conn.commit()
-                click.echo(f"Updated enrollment ID: {id}")
+            updated = repository.update(conn, ENROLLMENT, statement)
+            if updated:
+                click.echo(f"Updated enrollment ID(s): {', '.join(map(str, updated))}")
+            else:
+                click.echo("No matching enrollments found.")
         except Exception as e:
             conn.rollback()
             click.echo(f"Error updating enrollment: {e}")
@@ -97,23 +137,28 @@ def add_commands(cli):
             conn.close()
 
     @enrollment.command()
-    @click.option('--id', required=True, type=int, help="Enrollment ID to delete")
-    @click.confirmation_option(prompt="Are you sure you want to delete this enrollment?")
-    def delete(id):
-        """Delete an enrollment by ID."""
+    @click.option('--id', multiple=True, type=int, help="Enrollment ID to delete (repeatable)")
+    @click.option('--ids', type=ID_LIST, help="Comma-separated Enrollment IDs to delete")
+    @from_file_option("File with one Enrollment ID per line")
+    @page_size_option
+    @click.confirmation_option(prompt="Are you sure you want to delete the selected enrollments?")
+    def delete(id, ids, from_file, page_size):
+        """Delete one or many enrollments by ID."""
+        targets = collect_target_ids(id, ids, from_file)
         conn = get_connection()
         if conn is None:
             return
+        deleted = []
         try:
-            with conn.cursor() as cur:
-                cur.execute(ENROLLMENT_DELETE, (id,))
-                if cur.rowcount > 0:
-                    conn.commit()
-                    click.echo(f"Deleted enrollment ID: {id}")
-                else:
-                    click.echo(f"Enrollment with ID {id} not found.")
+            for page_ids in repository.delete(conn, ENROLLMENT, targets, page_size):
+                deleted.extend(page_ids)
+            echo_deleted('enrollment', 'Enrollment', targets, deleted)
         except Exception as e:
             conn.rollback()
+            echo_deleted('enrollment', 'Enrollment', deleted, deleted)
             click.echo(f"Error deleting enrollment: {e}")
         finally:
-            conn.close()
\ No newline at end of file
+            conn.close()
+
+    add_import_command(enrollment, ENROLLMENT)
+    add_export_command(enrollment, ENROLLMENT, parallel=True)
\ No newline at end of file
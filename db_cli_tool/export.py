@@ -0,0 +1,318 @@
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+from decimal import Decimal
+import click
+from db_connection import DB_PARAMS, get_connection
+from listing import filter_options, build_conditions, select_option, json_projection
+from tables import column_types, json_column
+
+FORMATS = ('csv', 'jsonl', 'parquet')
+# Rows buffered per Parquet row group
+PARQUET_BATCH_ROWS = 50000
+# JSONL is copied in CSV mode with control characters as quote and delimiter,
+# so row_to_json() output passes through COPY unescaped, one document per line
+_JSONL_COPY_OPTIONS = "FORMAT csv, QUOTE e'\\x01', DELIMITER e'\\x02'"
+# A parallel export without --chunk-rows splits the ID range into this many
+# chunks per worker, so a worker that draws dense chunks doesn't hold up the rest
+PARALLEL_CHUNKS_PER_WORKER = 4
+
+# One exported column: `expr` selected as `name`; `params` are the values of its placeholders
+ExportColumn = namedtuple('ExportColumn', ['name', 'expr', 'type', 'params'], defaults=[()])
+# One written file; `key_range` is the `[start, end)` ID span of a chunk, None when unchunked
+ExportedFile = namedtuple('ExportedFile', ['path', 'rows', 'key_range'])
+
+
+def detect_format(path, fmt=None):
+    """Returns the export format, guessing from the file extension when `fmt` is not given."""
+    if fmt:
+        return fmt
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.parquet':
+        return 'parquet'
+    if ext in ('.jsonl', '.ndjson', '.json'):
+        return 'jsonl'
+    return 'csv'
+
+
+def export_columns(table, names=None, select=()):
+    """Returns an ExportColumn for each requested column, all of them by default.
+
+    `select` holds `--select` paths: the table's JSON column is then
+    replaced by just those parts of it, extracted by the server.
+    """
+    types = column_types(table)
+    names = names or list(types)
+    unknown = [n for n in names if n not in types]
+    if unknown:
+        raise click.BadParameter(f"unknown column(s) for {table.name}: {', '.join(unknown)}",
+                                 param_hint="'--columns'")
+    columns = [ExportColumn(n, n, types[n]) for n in names]
+    if select:
+        column = json_column(table)
+        columns = [c for c in columns if c.name != column]
+        columns += [ExportColumn(label, expr, 'json', params) for label, expr, params in json_projection(column, select)]
+    return columns
+
+
+def _quote_ident(name):
+    # %% because the statement is completed with mogrify()
+    return '"' + name.replace('"', '""').replace('%', '%%') + '"'
+
+
+def copy_statement(table, columns, conditions, fmt):
+    """Builds the `COPY (SELECT ...) TO STDOUT` statement for one export file.
+
+    Its placeholders take the columns' params, then those of `conditions`.
+    """
+    select = ', '.join(c.expr if c.expr == c.name else f"{c.expr} AS {_quote_ident(c.name)}" for c in columns)
+    query = f"SELECT {select} FROM {table.name}"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += f" ORDER BY {table.pk}"
+    if fmt == 'csv':
+        return f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)"
+    return f"COPY (SELECT row_to_json(r) FROM ({query}) r) TO STDOUT WITH ({_JSONL_COPY_OPTIONS})"
+
+
+class _ParquetSink:
+    """File-like target for COPY that turns JSONL rows into Parquet row groups."""
+
+    def __init__(self, path, columns, batch_rows=PARQUET_BATCH_ROWS):
+        import pyarrow
+        import pyarrow.parquet
+        self._pa = pyarrow
+        arrow_types = {
+            'int': pyarrow.int64(),
+            'decimal': pyarrow.decimal128(38, 10),
+            'timestamp': pyarrow.timestamp('us'),
+        }
+        # JSON columns are stored as JSON text so the schema stays fixed
+        self.schema = pyarrow.schema([(c.name, arrow_types.get(c.type, pyarrow.string())) for c in columns])
+        self.columns = columns
+        self.batch_rows = batch_rows
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+        self._pending = b''
+        self._rows = []
+
+    def write(self, data):
+        lines = (self._pending + data).split(b'\n')
+        self._pending = lines.pop()
+        self._rows.extend(json.loads(line, parse_float=Decimal) for line in lines)
+        if len(self._rows) >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        if not self._rows:
+            return
+        arrays = {}
+        for column in self.columns:
+            values = [row.get(column.name) for row in self._rows]
+            if column.type == 'json':
+                values = [None if v is None else json.dumps(v) for v in values]
+            elif column.type == 'timestamp':
+                values = [None if v is None else datetime.fromisoformat(v) for v in values]
+            arrays[column.name] = values
+        self.writer.write_table(self._pa.Table.from_pydict(arrays, schema=self.schema))
+        self._rows = []
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+def _copy_to(cur, statement, path, fmt, columns):
+    """Runs one COPY into `path` ('-' for stdout) and returns the number of rows copied."""
+    if path == '-':
+        sys.stdout.flush()
+        cur.copy_expert(statement, sys.stdout.buffer)
+        sys.stdout.buffer.flush()
+        return cur.rowcount
+    out = _ParquetSink(path, columns) if fmt == 'parquet' else open(path, 'wb')
+    try:
+        cur.copy_expert(statement, out)
+    finally:
+        out.close()
+    return cur.rowcount
+
+
+def chunk_path(path, index):
+    """Returns the name of the `index`-th output file for a chunked export."""
+    root, ext = os.path.splitext(path)
+    return f"{root}-{index:05d}{ext}"
+
+
+def manifest_path(path):
+    """Returns the name of the manifest written next to a chunked export."""
+    return os.path.splitext(path)[0] + '.manifest.json'
+
+
+def export_chunk(params, snapshot, statement, target, fmt, columns):
+    """Runs one chunk's COPY on a new connection that reads the exported `snapshot`.
+
+    Called in worker processes by export_table(); returns the rows copied.
+    """
+    import psycopg2
+    conn = psycopg2.connect(**params)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY")
+            cur.execute("SET TRANSACTION SNAPSHOT %s", (snapshot,))
+            rows = _copy_to(cur, statement, target, fmt, columns)
+        conn.commit()
+    finally:
+        conn.close()
+    return rows
+
+
+def export_table(conn, table, path, fmt=None, columns=None, filters=None, chunk_rows=None, workers=1,
+                 conn_params=None):
+    """Streams the rows of `table` into CSV, JSONL or Parquet files with COPY TO STDOUT.
+
+    Rows flow straight from the server into the output file, so memory use
+    stays constant. With `chunk_rows`, the primary-key range is split into
+    spans of that many IDs and each span is written to its own numbered file;
+    all files are read from the same REPEATABLE READ snapshot.
+    With `workers` > 1 the chunks are copied by that many processes, each on
+    its own connection that imports the snapshot of `conn` with
+    pg_export_snapshot(). A snapshot can only be imported on the server that
+    exported it, so `conn_params` defaults to the settings of `conn`'s pool,
+    which may be a read replica (DB_PARAMS for connections made elsewhere).
+    Without `chunk_rows` the range is split into PARALLEL_CHUNKS_PER_WORKER
+    chunks per worker.
+    Returns the ExportedFile list and the snapshot ID (None unless parallel).
+    """
+    fmt = detect_format(path, fmt)
+    columns = columns or export_columns(table)
+    conditions, params = build_conditions(table, filters or {})
+    select_params = [param for column in columns for param in column.params]
+    if conn_params is None:
+        pool = getattr(conn, 'pool', None)
+        conn_params = pool.params if pool is not None else DB_PARAMS
+    snapshot = None
+    with conn.cursor() as cur:
+        cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY")
+        if workers > 1:
+            cur.execute("SELECT pg_export_snapshot()")
+            snapshot = cur.fetchone()[0]
+        if chunk_rows is None and workers == 1:
+            ranges = [None]
+        else:
+            where = " WHERE " + " AND ".join(conditions) if conditions else ""
+            cur.execute(f"SELECT MIN({table.pk}), MAX({table.pk}) FROM {table.name}{where}", params)
+            low, high = cur.fetchone()
+            if low is not None and chunk_rows is None:
+                chunk_rows = -(-(high - low + 1) // (workers * PARALLEL_CHUNKS_PER_WORKER))
+            ranges = [] if low is None else [
+                (start, min(start + chunk_rows, high + 1)) for start in range(low, high + 1, chunk_rows)]
+        tasks = []
+        for span in ranges:
+            span_conditions, span_params = list(conditions), list(params)
+            target = path
+            if span is not None:
+                span_conditions += [f"{table.pk} >= %s", f"{table.pk} < %s"]
+                span_params += list(span)
+                target = chunk_path(path, len(tasks))
+            statement = cur.mogrify(copy_statement(table, columns, span_conditions, fmt),
+                                    select_params + span_params).decode()
+            tasks.append((target, statement, span))
+        if workers > 1 and len(tasks) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            # The snapshot stays importable only while this transaction is open
+            with ProcessPoolExecutor(min(workers, len(tasks))) as executor:
+                counts = list(executor.map(export_chunk, *zip(*[
+                    (conn_params, snapshot, statement, target, fmt, columns)
+                    for target, statement, _ in tasks])))
+        else:
+            counts = [_copy_to(cur, statement, target, fmt, columns) for target, statement, _ in tasks]
+    conn.commit()
+    files = []
+    for (target, _, span), rows in zip(tasks, counts):
+        if span is not None and rows == 0:
+            os.remove(target)
+            continue
+        files.append(ExportedFile(target, rows, span))
+    return files, snapshot
+
+
+def write_manifest(path, table, fmt, columns, files, snapshot=None, filters=None):
+    """Describes a chunked export in `manifest_path(path)` for downstream loaders.
+
+    Lists each file (relative to the manifest) with its row count, size and
+    `[start, end)` primary-key span, plus the columns and their types.
+    Returns the manifest's path.
+    """
+    target = manifest_path(path)
+    base = os.path.dirname(os.path.abspath(target))
+    manifest = {
+        'table': table.name.strip('"'),
+        'primary_key': table.pk,
+        'format': fmt,
+        'exported_at': datetime.now(timezone.utc).isoformat(),
+        'snapshot': snapshot,
+        'filters': {k: v for k, v in (filters or {}).items() if v not in (None, (), [])},
+        'columns': [{'name': c.name, 'type': c.type} for c in columns],
+        'rows': sum(f.rows for f in files),
+        'files': [{'path': os.path.relpath(os.path.abspath(f.path), base), 'rows': f.rows,
+                   'bytes': os.path.getsize(f.path), 'key_start': f.key_range[0], 'key_end': f.key_range[1]}
+                  for f in files],
+    }
+    with open(target, 'w', encoding='utf-8') as out:
+        json.dump(manifest, out, indent=2, default=str)
+        out.write('\n')
+    return target
+
+
+def _workers_option(f):
+    return click.option('--workers', type=click.IntRange(min=1), default=1, show_default=True,
+                        help="Processes copying chunks in parallel from one snapshot")(f)
+
+
+def add_export_command(group, table, parallel=False):
+    """Adds an `export` command for `table` to a table command group.
+
+    With `parallel`, the command takes --workers to copy chunks on a process pool.
+    """
+    label = table.name.strip('"')
+    # Tables with a JSON column can export parts of it with --select
+    json_options = select_option(table) if json_column(table) else (lambda f: f)
+    workers_option = _workers_option if parallel else (lambda f: f)
+
+    @group.command('export', help=f"Export {label} rows to CSV, JSONL or Parquet using COPY. "
+                                  f"PATH may be '-' for stdout (CSV/JSONL only).")
+    @click.argument('path')
+    @click.option('--format', 'fmt', type=click.Choice(FORMATS),
+                  help="Output format (default: guessed from the file extension)")
+    @click.option('--columns', help="Comma-separated columns to export (default: all)")
+    @click.option('--chunk-rows', type=click.IntRange(min=1),
+                  help="Split the output into numbered files, each covering this many IDs")
+    @workers_option
+    @filter_options(table)
+    @json_options
+    def export(path, fmt, columns, chunk_rows, select=(), workers=1, **filters):
+        fmt = detect_format(path, fmt)
+        if path == '-' and (fmt == 'parquet' or chunk_rows or workers > 1):
+            raise click.UsageError("Parquet, chunked and parallel exports need a file PATH.")
+        selected = export_columns(table, columns.split(',') if columns else None, select)
+        conn = get_connection(readonly=True)
+        if conn is None:
+            return
+        try:
+            start = time.perf_counter()
+            files, snapshot = export_table(conn, table, path, fmt, selected, filters, chunk_rows, workers)
+            elapsed = time.perf_counter() - start
+            rows = sum(f.rows for f in files)
+            click.echo(f"Exported {rows} {label} rows to {len(files)} file(s) in {elapsed:.2f}s "
+                       f"({rows / elapsed:.0f} rows/s)", err=path == '-')
+            if chunk_rows or workers > 1:
+                click.echo(f"Manifest: {write_manifest(path, table, fmt, selected, files, snapshot, filters)}")
+        except ImportError:
+            click.echo("Error exporting: Parquet output requires pyarrow (pip install pyarrow)")
+        except Exception as e:
+            conn.rollback()
+            click.echo(f"Error exporting {label}: {e}")
+        finally:
+            conn.close()
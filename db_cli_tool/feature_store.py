@@ -1,6 +1,32 @@
+import json
 import click
+import repository
 from db_connection import get_connection
-from queries import FEATURE_STORE_INSERT, FEATURE_STORE_SELECT_ALL, FEATURE_STORE_SELECT_BY_ID, FEATURE_STORE_UPDATE, FEATURE_STORE_DELETE
+from bulk import add_import_command
+from export import add_export_command
+from streaming import echo_rows
+from output import echo_notice, echo_row
+from listing import list_options, collect_ids, where_option, select_option, json_projection, ID_LIST
+from batch import collect_rows, collect_target_ids, echo_created, echo_deleted, from_file_option, page_size_option, read_ids
+from feature_store_audit import audit_settings, changed_by_option
+from tables import FEATURE_STORE
+from queries import FEATURE_STORE_SELECT_PROJECTED, FEATURE_STORE_SELECT_LATEST
+
+def get_latest(conn, course_ids):
+    """Returns the highest-version feature_store row of each course, in one query.
+
+    Returns `{course_id: (feature_store_id, course_id, metadata, version)}`;
+    courses without any entry are left out. Rows with a NULL version only
+    win when a course has no versioned entry.
+    """
+    with conn.cursor() as cur:
+        cur.execute(FEATURE_STORE_SELECT_LATEST, (sorted(set(course_ids)),))
+        return {row[1]: row for row in cur.fetchall()}
+
+
+def _format_feature_store(fs):
+    return f"ID: {fs[0]}, Course ID: {fs[1]}, Metadata: {json.dumps(fs[2])}, Version: {fs[3]}"
+
 
 def add_commands(cli):
     """Adds Feature_Store-related commands to the CLI."""
@@ -10,43 +36,69 @@ def add_commands(cli):
         pass
 
     @feature_store.command()
-    @click.option('--course-id', required=True, type=int, help="Course ID")
-    @click.option('--metadata', required=True, help="Feature metadata (JSON string)")
-    @click.option('--version', required=True, type=int, help="Feature version")
-    def create(course_id, metadata, version):
-        """Create a new feature_store entry."""
+    @click.option('--course-id', multiple=True, type=int, help="Course ID")
+    @click.option('--metadata', multiple=True, help="Feature metadata (JSON string)")
+    @click.option('--version', multiple=True, type=int, help="Feature version")
+    @from_file_option("CSV or JSONL file with one feature_store per row")
+    @page_size_option
+    @changed_by_option
+    def create(course_id, metadata, version, from_file, page_size, changed_by):
+        """Create one or many feature_store entries.
+
+        Repeat the options to create several rows at once; an option given
+        only once applies to every row. Every write is recorded in
+        Feature_Store_Audit in the same transaction.
+        """
+        rows = collect_rows(FEATURE_STORE, ('course_id', 'metadata', 'version'), (course_id, metadata, version), from_file)
         conn = get_connection()
         if conn is None:
             return
+        created = []
         try:
-            with conn.cursor() as cur:
-                cur.execute(FEATURE_STORE_INSERT, (course_id, metadata, version))
-                feature_store_id = cur.fetchone()[0]
-                conn.commit()
-                click.echo(click.style(f"Created feature_store with ID: {feature_store_id}", fg='green'))
+            for page_ids in repository.create(conn, FEATURE_STORE, rows, page_size, audit_settings(changed_by)):
+                created.extend(page_ids)
+            echo_created('feature_store', created)
         except Exception as e:
             conn.rollback()
+            echo_created('feature_store', created)
             click.echo(f"Error creating feature_store: {e}")
         finally:
             conn.close()
 
     @feature_store.command()
-    def list():
-        """List all feature_store entries."""
-        conn = get_connection()
+    @list_options(FEATURE_STORE)
+    @select_option(FEATURE_STORE)
+    def list(itersize, limit, after_id, order_by, desc, select, **filters):
+        """List feature_store entries, optionally filtered and paged.
+
+        Metadata is printed as JSON; with --select only the selected parts
+        of it are fetched.
+        """
+        base_query, base_params, labels = None, [], ['Metadata']
+        columns = repository.statements(FEATURE_STORE).columns
+        if select:
+            projection = json_projection('metadata', select)
+            base_query = FEATURE_STORE_SELECT_PROJECTED.format(projection=', '.join(expr for _, expr, _ in projection))
+            base_params = [param for _, _, params in projection for param in params]
+            labels = [label for label, _, _ in projection]
+            columns = (columns[0], columns[1], *labels, columns[-1])
+        conn = get_connection(readonly=True)
         if conn is None:
             return
         try:
-            with conn.cursor() as cur:
-                cur.execute(FEATURE_STORE_SELECT_ALL)
-                feature_stores = cur.fetchall()
-                if not feature_stores:
-                    click.echo("No feature_store entries found.")
-                    return
-                for fs in feature_stores:
-                    click.echo(f"ID: {fs[0]}, Course ID: {fs[1]}, Metadata: {fs[2]}, Version: {fs[3]}")
+            rows = repository.list_rows(conn, FEATURE_STORE, filters, after_id, order_by, desc, limit, itersize,
+                                        base_query, base_params)
+
+            def format_row(fs):
+                values = ', '.join(f"{label}: {json.dumps(value)}" for label, value in zip(labels, fs[2:-1]))
+                return f"ID: {fs[0]}, Course ID: {fs[1]}, {values}, Version: {fs[-1]}"
+
+            if not echo_rows(rows, format_row, columns):
+                echo_notice("No feature_store entries found.")
+        except click.UsageError:
+            raise
         except Exception as e:
-            click.echo(f"Error listing feature_store: {e}")
+            echo_notice(f"Error listing feature_store: {e}")
         finally:
             conn.close()
 
@@ -54,43 +106,72 @@ def add_commands(cli):
     @click.option('--id', required=True, type=int, help="Feature_Store ID to retrieve")
     def get(id):
         """Get a feature_store entry by ID."""
-        conn = get_connection()
+        try:
+            feature_store = repository.get(FEATURE_STORE, id)
+            if feature_store:
+                echo_row(feature_store, _format_feature_store, repository.statements(FEATURE_STORE).columns)
+            else:
+                echo_notice(f"Feature_Store with ID {id} not found.")
+        except Exception as e:
+            echo_notice(f"Error retrieving feature_store: {e}")
+
+    @feature_store.command('get-latest')
+    @click.option('--course-ids', type=ID_LIST, help="Comma-separated Course IDs")
+    @from_file_option("File with one Course ID per line")
+    def get_latest_command(course_ids, from_file):
+        """Print the latest feature_store version of many courses as JSON.
+
+        Prints one JSON object keyed by course ID; courses without an entry
+        map to null.
+        """
+        targets = (course_ids or []) + (read_ids(from_file) if from_file else [])
+        if not targets:
+            raise click.UsageError("Give the course IDs with --course-ids or --from-file.")
+        conn = get_connection(readonly=True)
         if conn is None:
             return
         try:
-            with conn.cursor() as cur:
-                cur.execute(FEATURE_STORE_SELECT_BY_ID, (id,))
-                feature_store = cur.fetchone()
-                if feature_store:
-                    click.echo(f"ID: {feature_store[0]}, Course ID: {feature_store[1]}, Metadata: {feature_store[2]}, Version: {feature_store[3]}")
-                else:
-                    click.echo(f"Feature_Store with ID {id} not found.")
+            latest = get_latest(conn, targets)
+            conn.commit()
+            result = {}
+            for course_id in targets:
+                row = latest.get(course_id)
+                result[str(course_id)] = None if row is None else {
+                    'feature_store_id': row[0], 'course_id': row[1], 'metadata': row[2], 'version': row[3]}
+            click.echo(json.dumps(result))
         except Exception as e:
-            click.echo(f"Error retrieving feature_store: {e}")
+            conn.rollback()
+            click.echo(f"Error retrieving latest feature_store entries: {e}")
         finally:
             conn.close()
 
     @feature_store.command()
-    @click.option('--id', required=True, type=int, help="Feature_Store ID to update")
+    @click.option('--id', type=int, help="Feature_Store ID to update")
+    @click.option('--ids', type=ID_LIST, help="Comma-separated Feature_Store IDs to update")
+    @where_option(FEATURE_STORE)
     @click.option('--metadata', help="New metadata (JSON string)")
     @click.option('--version', type=int, help="New version")
-    def update(id, metadata, version):
-        """Update a feature_store entry's details."""
+    @changed_by_option
+    def update(id, ids, where, metadata, version, changed_by):
+        """Update one or many feature_store entries in a single statement.
+
+        The audit trail records what changed in each entry, with metadata
+        diffed key by key; entries left unchanged are not recorded.
+        """
+        values = (metadata, version)
+        if all(v is None for v in values):
+            click.echo("Nothing to update.")
+            return
+        statement = repository.update_statement(FEATURE_STORE, values, collect_ids(id, ids), where)
         conn = get_connection()
         if conn is None:
             return
         try:
-            with conn.cursor() as cur:
-                cur.execute(FEATURE_STORE_SELECT_BY_ID, (id,))
-                current = cur.fetchone()
-                if not current:
-                    click.echo(f"Feature_Store with ID {id} not found.")
-                    return
-                new_metadata = metadata if metadata is not None else current[2]
-                new_version = version if version is not None else current[3]
-                cur.execute(FEATURE_STORE_UPDATE, (new_metadata, new_version, id))
-                conn.commit()
-                click.echo(f"Updated feature_store ID: {id}")
+            updated = repository.update(conn, FEATURE_STORE, statement, audit_settings(changed_by))
+            if updated:
+                click.echo(f"Updated feature_store ID(s): {', '.join(map(str, updated))}")
+            else:
+                click.echo("No matching feature_store entries found.")
         except Exception as e:
             conn.rollback()
             click.echo(f"Error updating feature_store: {e}")
@@ -98,23 +179,29 @@ def add_commands(cli):
             conn.close()
 
     @feature_store.command()
-    @click.option('--id', required=True, type=int, help="Feature_Store ID to delete")
-    @click.confirmation_option(prompt="Are you sure you want to delete this feature_store entry?")
-    def delete(id):
-        """Delete a feature_store entry by ID."""
+    @click.option('--id', multiple=True, type=int, help="Feature_Store ID to delete (repeatable)")
+    @click.option('--ids', type=ID_LIST, help="Comma-separated Feature_Store IDs to delete")
+    @from_file_option("File with one Feature_Store ID per line")
+    @page_size_option
+    @changed_by_option
+    @click.confirmation_option(prompt="Are you sure you want to delete the selected feature_store entries?")
+    def delete(id, ids, from_file, page_size, changed_by):
+        """Delete one or many feature_store entries by ID."""
+        targets = collect_target_ids(id, ids, from_file)
         conn = get_connection()
         if conn is None:
             return
+        deleted = []
         try:
-            with conn.cursor() as cur:
-                cur.execute(FEATURE_STORE_DELETE, (id,))
-                if cur.rowcount > 0:
-                    conn.commit()
-                    click.echo(f"Deleted feature_store ID: {id}")
-                else:
-                    click.echo(f"Feature_Store with ID {id} not found.")
+            for page_ids in repository.delete(conn, FEATURE_STORE, targets, page_size, audit_settings(changed_by)):
+                deleted.extend(page_ids)
+            echo_deleted('feature_store', 'Feature_Store', targets, deleted)
         except Exception as e:
             conn.rollback()
+            echo_deleted('feature_store', 'Feature_Store', deleted, deleted)
             click.echo(f"Error deleting feature_store: {e}")
         finally:
-            conn.close()
\ No newline at end of file
+            conn.close()
+
+    add_import_command(feature_store, FEATURE_STORE)
+    add_export_command(feature_store, FEATURE_STORE, parallel=True)
\ No newline at end of file
@@ -1,6 +1,32 @@
+import json
 import click
+import repository
 from db_connection import get_connection
-from queries import FEATURE_STORE_AUDIT_INSERT, FEATURE_STORE_AUDIT_SELECT_ALL, FEATURE_STORE_AUDIT_SELECT_BY_ID, FEATURE_STORE_AUDIT_DELETE
+from bulk import add_import_command
+from export import add_export_command
+from streaming import echo_rows
+from output import echo_notice, echo_row
+from listing import list_options, ID_LIST
+from batch import collect_target_ids, echo_deleted, from_file_option, page_size_option
+from tables import FEATURE_STORE_AUDIT, JSON_DOCUMENT
+
+# Transaction-local setting the Feature_Store audit triggers read changed_by from
+CHANGED_BY_SETTING = 'lms.changed_by'
+
+changed_by_option = click.option(
+    '--changed-by', type=int, envvar='DB_TOOL_CHANGED_BY',
+    help="User ID recorded as the author in the audit trail [env: DB_TOOL_CHANGED_BY]")
+
+
+def audit_settings(changed_by):
+    """Returns the settings (see batch.apply_settings) that attribute audit rows to `changed_by`."""
+    return {CHANGED_BY_SETTING: changed_by} if changed_by is not None else {}
+
+
+def format_audit(audit):
+    return (f"ID: {audit[0]}, Feature_Store ID: {audit[1]}, Changed By: {audit[2]}, "
+            f"Changes: {json.dumps(audit[3])}, Created At: {audit[4]}")
+
 
 def add_commands(cli):
     """Adds Feature_Store_Audit-related commands to the CLI."""
@@ -11,18 +37,19 @@ def add_commands(cli):
 
     @feature_store_audit.command()
     @click.option('--feature-store-id', required=True, type=int, help="Feature_Store ID")
-    @click.option('--change-description', required=True, help="Description of the change")
-    def create(feature_store_id, change_description):
-        """Create a new feature_store_audit entry."""
+    @changed_by_option
+    @click.option('--changes', required=True, type=JSON_DOCUMENT, help="Description of the change (JSON)")
+    def create(feature_store_id, changed_by, changes):
+        """Add a manual note to a feature_store entry's audit trail.
+
+        feature_store create, update and delete record their own audit rows.
+        """
         conn = get_connection()
         if conn is None:
             return
         try:
-            with conn.cursor() as cur:
-                cur.execute(FEATURE_STORE_AUDIT_INSERT, (feature_store_id, change_description))
-                audit_id = cur.fetchone()[0]
-                conn.commit()
-                click.echo(click.style(f"Created feature_store_audit with ID: {audit_id}", fg='green'))
+            [audit_id], = repository.create(conn, FEATURE_STORE_AUDIT, [(feature_store_id, changed_by, changes)])
+            click.echo(click.style(f"Created feature_store_audit with ID: {audit_id}", fg='green'))
         except Exception as e:
             conn.rollback()
             click.echo(f"Error creating feature_store_audit: {e}")
@@ -30,22 +57,23 @@ def add_commands(cli):
             conn.close()
 
     @feature_store_audit.command()
-    def list():
-        """List all feature_store_audit entries."""
-        conn = get_connection()
+    @list_options(FEATURE_STORE_AUDIT)
+    def list(itersize, limit, after_id, order_by, desc, **filters):
+        """List feature_store_audit entries, optionally filtered and paged.
+
+        `--feature-store-id N` lists the history of one entry, oldest first.
+        """
+        conn = get_connection(readonly=True)
         if conn is None:
             return
         try:
-            with conn.cursor() as cur:
-                cur.execute(FEATURE_STORE_AUDIT_SELECT_ALL)
-                audits = cur.fetchall()
-                if not audits:
-                    click.echo("No feature_store_audit entries found.")
-                    return
-                for a in audits:
-                    click.echo(f"ID: {a[0]}, Feature_Store ID: {a[1]}, Change Description: {a[2]}")
+            rows = repository.list_rows(conn, FEATURE_STORE_AUDIT, filters, after_id, order_by, desc, limit, itersize)
+            if not echo_rows(rows, format_audit, repository.statements(FEATURE_STORE_AUDIT).columns):
+                echo_notice("No feature_store_audit entries found.")
+        except click.UsageError:
+            raise
         except Exception as e:
-            click.echo(f"Error listing feature_store_audit: {e}")
+            echo_notice(f"Error listing feature_store_audit: {e}")
         finally:
             conn.close()
 
@@ -53,40 +81,38 @@ def add_commands(cli):
     @click.option('--id', required=True, type=int, help="Feature_Store_Audit ID to retrieve")
     def get(id):
         """Get a feature_store_audit entry by ID."""
-        conn = get_connection()
-        if conn is None:
-            return
         try:
-            with conn.cursor() as cur:
-                cur.execute(FEATURE_STORE_AUDIT_SELECT_BY_ID, (id,))
-                audit = cur.fetchone()
-                if audit:
-                    click.echo(f"ID: {audit[0]}, Feature_Store ID: {audit[1]}, Change Description: {audit[2]}")
-                else:
-                    click.echo(f"Feature_Store_Audit with ID {id} not found.")
+            audit = repository.get(FEATURE_STORE_AUDIT, id)
+            if audit:
+                echo_row(audit, format_audit, repository.statements(FEATURE_STORE_AUDIT).columns)
+            else:
+                echo_notice(f"Feature_Store_Audit with ID {id} not found.")
         except Exception as e:
-            click.echo(f"Error retrieving feature_store_audit: {e}")
-        finally:
-            conn.close()
+            echo_notice(f"Error retrieving feature_store_audit: {e}")
 
     @feature_store_audit.command()
-    @click.option('--id', required=True, type=int, help="Feature_Store_Audit ID to delete")
-    @click.confirmation_option(prompt="Are you sure you want to delete this feature_store_audit entry?")
-    def delete(id):
-        """Delete a feature_store_audit entry by ID."""
+    @click.option('--id', multiple=True, type=int, help="Feature_Store_Audit ID to delete (repeatable)")
+    @click.option('--ids', type=ID_LIST, help="Comma-separated Feature_Store_Audit IDs to delete")
+    @from_file_option("File with one Feature_Store_Audit ID per line")
+    @page_size_option
+    @click.confirmation_option(prompt="Are you sure you want to delete the selected feature_store_audit entries?")
+    def delete(id, ids, from_file, page_size):
+        """Delete one or many feature_store_audit entries by ID."""
+        targets = collect_target_ids(id, ids, from_file)
         conn = get_connection()
         if conn is None:
             return
+        deleted = []
         try:
-            with conn.cursor() as cur:
-                cur.execute(FEATURE_STORE_AUDIT_DELETE, (id,))
-                if cur.rowcount > 0:
-                    conn.commit()
-                    click.echo(f"Deleted feature_store_audit ID: {id}")
-                else:
-                    click.echo(f"Feature_Store_Audit with ID {id} not found.")
+            for page_ids in repository.delete(conn, FEATURE_STORE_AUDIT, targets, page_size):
+                deleted.extend(page_ids)
+            echo_deleted('feature_store_audit', 'Feature_Store_Audit', targets, deleted)
         except Exception as e:
             conn.rollback()
+            echo_deleted('feature_store_audit', 'Feature_Store_Audit', deleted, deleted)
             click.echo(f"Error deleting feature_store_audit: {e}")
         finally:
-            conn.close()
\ No newline at end of file
+            conn.close()
+
+    add_import_command(feature_store_audit, FEATURE_STORE_AUDIT)
+    add_export_command(feature_store_audit, FEATURE_STORE_AUDIT)
\ No newline at end of file
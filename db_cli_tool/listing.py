@@ -0,0 +1,169 @@
+import click
+from streaming import itersize_option
+from tables import column_types, json_column
+
+
+class IdList(click.ParamType):
+    """A comma-separated list of integer IDs, e.g. `1,2,3`."""
+
+    name = 'ids'
+
+    def convert(self, value, param, ctx):
+        if isinstance(value, list):
+            return value
+        try:
+            return [int(part) for part in value.split(',') if part.strip()]
+        except ValueError:
+            self.fail(f"{value!r} is not a comma-separated list of IDs", param, ctx)
+
+
+ID_LIST = IdList()
+
+
+def where_option(table):
+    """Decorator adding a repeatable `--where COLUMN=VALUE` option to a command."""
+    columns = ', '.join(column_types(table))
+    return click.option('--where', multiple=True, metavar='COLUMN=VALUE',
+                        help=f"Only rows whose column equals the value; repeatable. Columns: {columns}")
+
+
+def list_options(table):
+    """Decorator adding paging, ordering and the table's filter options to a list command."""
+    def decorator(f):
+        f = filter_options(table)(f)
+        f = click.option('--desc', is_flag=True, help="Sort in descending order")(f)
+        f = click.option('--order-by', type=click.Choice(table.order_columns), default=table.pk,
+                         show_default=True, help="Column to sort by")(f)
+        f = click.option('--after-id', type=int,
+                         help=f"Resume after the row with this {table.pk} (keyset paging)")(f)
+        f = click.option('--limit', type=click.IntRange(min=1), help="Maximum number of rows to return")(f)
+        return itersize_option(f)
+    return decorator
+
+
+def select_option(table):
+    """Decorator adding a repeatable `--select PATH` option projecting the table's JSON column."""
+    return click.option(
+        '--select', multiple=True, metavar='PATH',
+        help=f"Only return this part of {json_column(table)}; repeatable. Dotted keys/array indexes "
+             f"(e.g. model.layers.0) or an SQL/JSON path starting with $ (e.g. '$.tags[0]')")
+
+
+def json_projection(column, paths):
+    """Turns `--select` paths into `(label, expression, params)` triples evaluated by the server.
+
+    `a.b.0` becomes `column #> %s::text[]` with the keys as a text array; a
+    path starting with `$` is an SQL/JSON path run through
+    jsonb_path_query_first(). Either way only the selected values are sent
+    to the client. Paths are bind parameters, so any character is allowed
+    in them; pass each expression's params with the query, in order.
+    """
+    projection = []
+    for path in paths:
+        if path.startswith('$'):
+            projection.append((path, f"jsonb_path_query_first({column}, %s::jsonpath)", [path]))
+            continue
+        keys = [key for key in path.split('.') if key]
+        if not keys:
+            raise click.BadParameter(f"empty path {path!r}", param_hint="'--select'")
+        projection.append((path, f"{column} #> %s::text[]", [keys]))
+    return projection
+
+
+def filter_options(table):
+    """Decorator adding the table's per-column filter options to a command."""
+    def decorator(f):
+        for flt in reversed(table.filters):
+            f = click.option(flt.option, flt.param, type=flt.type, help=flt.help)(f)
+        return f
+    return decorator
+
+
+def build_conditions(table, filters):
+    """Returns the `(conditions, params)` selected by the given filter option values."""
+    conditions, params = [], []
+    for flt in table.filters:
+        value = filters.get(flt.param)
+        if value is not None:
+            conditions.append(flt.condition)
+            params.append(value)
+    return conditions, params
+
+
+def build_list_query(table, base_query, filters, after_id=None, order_by=None, desc=False, limit=None,
+                     after_value=None):
+    """Extends a `*_SELECT_ALL` query with filters, keyset paging, ordering and a limit.
+
+    Paging is keyset based: `after_id` names the last row of the previous
+    page and the next page starts right after it in the requested order, so
+    every page costs the same regardless of how deep it is. When ordering
+    by another column than the key, `after_value` is that row's value of
+    the column (see repository.list_rows, which looks it up).
+    Returns a `(query, params)` tuple.
+    """
+    conditions, params = build_conditions(table, filters)
+    order_by = order_by or table.pk
+    op = '<' if desc else '>'
+    if after_id is not None:
+        if order_by == table.pk:
+            conditions.append(f"{table.pk} {op} %s")
+            params.append(after_id)
+        else:
+            conditions.append(f"({order_by}, {table.pk}) {op} (%s, %s)")
+            params.extend([after_value, after_id])
+
+    query = base_query
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    direction = " DESC" if desc else ""
+    query += f" ORDER BY {order_by}{direction}"
+    if order_by != table.pk:
+        query += f", {table.pk}{direction}"
+    if limit is not None:
+        query += " LIMIT %s"
+        params.append(limit)
+    return query, params
+
+
+def collect_ids(id=None, ids=None):
+    """Merges an `--id` value and an `--ids` list into one list."""
+    return ([id] if id is not None else []) + list(ids or [])
+
+
+def parse_where(table, where):
+    """Turns `--where COLUMN=VALUE` pairs into `(conditions, params)`."""
+    types = column_types(table)
+    conditions, params = [], []
+    for pair in where:
+        column, sep, value = pair.partition('=')
+        column = column.strip()
+        if not sep or column not in types:
+            raise click.BadParameter(f"expected COLUMN=VALUE with a column of {table.name}, got {pair!r}",
+                                     param_hint="'--where'")
+        conditions.append(f"{column} = %s")
+        params.append(value)
+    return conditions, params
+
+
+def build_update(table, update_query, values, ids=None, where=()):
+    """Completes a `*_UPDATE` statement with the rows to change and `RETURNING`.
+
+    The `*_UPDATE` constants set every column to `COALESCE(%s, column)`, so
+    passing None for a value leaves that column untouched and the whole
+    change is one statement and one round trip. Rows are selected by
+    primary key (`ids`), by `--where` pairs, or both. A single ID is matched
+    with `=` rather than `= ANY(...)`, which lets a prepared statement settle
+    on a generic plan instead of being planned again for every array.
+    Returns a `(query, params)` tuple.
+    """
+    conditions, params = parse_where(table, where)
+    if ids and len(ids) == 1:
+        conditions.insert(0, f"{table.pk} = %s")
+        params.insert(0, ids[0])
+    elif ids:
+        conditions.insert(0, f"{table.pk} = ANY(%s)")
+        params.insert(0, list(ids))
+    if not conditions:
+        raise click.UsageError("Select the rows to update with --id, --ids or --where.")
+    query = f"{update_query} WHERE {' AND '.join(conditions)} RETURNING {table.pk}"
+    return query, list(values) + params
@@ -42,16 +42,20 @@ CREATE TABLE "Enrollment" (
   UNIQUE (user_id, course_id)
 );
 
--- Transaction Table
+-- Transaction Table, range-partitioned by month on created_at (the primary
+-- key has to include it). Monthly partitions are created by migration 0009
+-- and `partition maintain`; rows outside them land in the default partition.
 CREATE TABLE "Transaction" (
-  transaction_id SERIAL PRIMARY KEY,
+  transaction_id SERIAL,
   user_id        INT NOT NULL REFERENCES "User"(user_id) ON DELETE CASCADE,
   course_id      INT NOT NULL REFERENCES "Course"(course_id) ON DELETE CASCADE,
   amount         DECIMAL(10,2),
   status         VARCHAR(50),
   created_at     TIMESTAMP NOT NULL DEFAULT NOW(),
-  updated_at     TIMESTAMP NOT NULL DEFAULT NOW()
-);
+  updated_at     TIMESTAMP NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (transaction_id, created_at)
+) PARTITION BY RANGE (created_at);
+CREATE TABLE "Transaction_default" PARTITION OF "Transaction" DEFAULT;
 
 -- Feature_Store Table
 CREATE TABLE "Feature_Store" (
@@ -63,11 +67,13 @@ CREATE TABLE "Feature_Store" (
   updated_at       TIMESTAMP NOT NULL DEFAULT NOW()
 );
 
--- Feature_Store_Audit Table
+-- Feature_Store_Audit Table, partitioned like "Transaction"
 CREATE TABLE "Feature_Store_Audit" (
-  audit_id         SERIAL PRIMARY KEY,
+  audit_id         SERIAL,
   feature_store_id INT NOT NULL REFERENCES "Feature_Store"(feature_store_id) ON DELETE CASCADE,
   changed_by       INT REFERENCES "User"(user_id) ON DELETE SET NULL,
   changes          JSONB,
-  created_at       TIMESTAMP NOT NULL DEFAULT NOW()
-);
\ No newline at end of file
+  created_at       TIMESTAMP NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (audit_id, created_at)
+) PARTITION BY RANGE (created_at);
+CREATE TABLE "Feature_Store_Audit_default" PARTITION OF "Feature_Store_Audit" DEFAULT;
\ No newline at end of file
@@ -0,0 +1,268 @@
+import os
+import re
+from collections import namedtuple
+from datetime import datetime
+import click
+from db_connection import get_connection
+from listing import build_conditions
+from tables import COURSE, CHAPTER, ENROLLMENT, TRANSACTION, FEATURE_STORE, FEATURE_STORE_AUDIT
+from queries import FEATURE_STORE_SELECT_LATEST
+from report import revenue_query
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+# Serializes concurrent `migrate` runs against the same database
+MIGRATION_LOCK_ID = 7_301_001
+
+MIGRATIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+  version    INT PRIMARY KEY,
+  name       VARCHAR(255) NOT NULL,
+  applied_at TIMESTAMP NOT NULL DEFAULT NOW()
+)"""
+
+Migration = namedtuple('Migration', ['version', 'name', 'up', 'down'])
+
+_FILE_PATTERN = re.compile(r'^(\d+)_(\w+)\.(up|down)\.sql$')
+
+def _filter_query(table, filters):
+    """Returns the `(query, params)` for the rows a list/export filter selects.
+
+    Only the filter is checked: with the CLI's ORDER BY on the primary key the
+    planner may legitimately prefer walking the primary key for large matches.
+    """
+    conditions, params = build_conditions(table, filters)
+    return f"SELECT {table.pk} FROM {table.name} WHERE {' AND '.join(conditions)}", params
+
+
+# (description, (query, params), index the plan is expected to use)
+INDEX_CHECKS = [
+    ("course list --instructor-id",
+     _filter_query(COURSE, {'instructor_id': 1}), 'course_instructor_id_idx'),
+    ("chapter list --course-id, ON DELETE CASCADE Course -> Chapter",
+     _filter_query(CHAPTER, {'course_id': 1}), 'chapter_course_id_chapter_id_idx'),
+    ("enrollment list --course-id",
+     _filter_query(ENROLLMENT, {'course_id': 1}), 'enrollment_course_id_idx'),
+    ("transaction list --user-id",
+     _filter_query(TRANSACTION, {'user_id': 1}), 'transaction_user_id_idx'),
+    ("transaction list --course-id",
+     _filter_query(TRANSACTION, {'course_id': 1}), 'transaction_course_id_idx'),
+    ("transaction list --since --until",
+     _filter_query(TRANSACTION, {'since': datetime(2024, 1, 1), 'until': datetime(2024, 1, 2)}),
+     'transaction_created_at_brin_idx'),
+    ("feature_store list --course-id",
+     _filter_query(FEATURE_STORE, {'course_id': 1}), 'feature_store_course_id_version_idx'),
+    ("feature_store get-latest",
+     (FEATURE_STORE_SELECT_LATEST, [[1, 2, 3]]), 'feature_store_course_id_version_idx'),
+    ("feature_store list --where-json",
+     _filter_query(FEATURE_STORE, {'where_json': '{"k": 1}'}), 'feature_store_metadata_gin_idx'),
+    ("report revenue --course-id",
+     revenue_query('course', course_id=1), 'report_course_revenue_daily_key'),
+    ("report revenue --by day --since",
+     revenue_query('day', since=datetime(2024, 1, 1)), 'report_course_revenue_daily_day_idx'),
+    ("feature_store_audit list --feature-store-id",
+     _filter_query(FEATURE_STORE_AUDIT, {'feature_store_id': 1}), 'feature_store_audit_history_idx'),
+    ("feature_store_audit list --changed-by",
+     _filter_query(FEATURE_STORE_AUDIT, {'changed_by': 1}), 'feature_store_audit_changed_by_idx'),
+]
+
+
+def load_migrations(directory=MIGRATIONS_DIR):
+    """Returns the migrations found in `directory`, ordered by version."""
+    found = {}
+    for filename in os.listdir(directory):
+        match = _FILE_PATTERN.match(filename)
+        if not match:
+            continue
+        version, name, direction = int(match.group(1)), match.group(2), match.group(3)
+        with open(os.path.join(directory, filename), encoding='utf-8') as f:
+            found.setdefault(version, {'name': name})[direction] = f.read()
+    migrations = []
+    for version in sorted(found):
+        scripts = found[version]
+        if 'up' not in scripts or 'down' not in scripts:
+            raise click.ClickException(f"migration {version} needs both an .up.sql and a .down.sql script")
+        migrations.append(Migration(version, scripts['name'], scripts['up'], scripts['down']))
+    return migrations
+
+
+def applied_versions(conn):
+    """Returns the set of migration versions recorded in schema_migrations."""
+    with conn.cursor() as cur:
+        cur.execute(MIGRATIONS_TABLE)
+        cur.execute("SELECT version FROM schema_migrations")
+        versions = {row[0] for row in cur.fetchall()}
+    conn.commit()
+    return versions
+
+
+def _run(conn, migration, direction):
+    """Runs one migration script and records it, all in a single transaction."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK_ID,))
+        if direction == 'up':
+            cur.execute(migration.up)
+            cur.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                        (migration.version, migration.name))
+        else:
+            cur.execute(migration.down)
+            cur.execute("DELETE FROM schema_migrations WHERE version = %s", (migration.version,))
+    conn.commit()
+
+
+def migrate_up(conn, target=None, migrations=None):
+    """Applies pending migrations up to and including `target` (all by default).
+
+    Yields each migration once it has been committed.
+    """
+    migrations = migrations if migrations is not None else load_migrations()
+    done = applied_versions(conn)
+    for migration in migrations:
+        if target is not None and migration.version > target:
+            break
+        if migration.version not in done:
+            _run(conn, migration, 'up')
+            yield migration
+
+
+def migrate_down(conn, target=0, migrations=None):
+    """Reverts applied migrations newer than `target`, newest first.
+
+    Yields each migration once its revert has been committed.
+    """
+    migrations = migrations if migrations is not None else load_migrations()
+    done = applied_versions(conn)
+    for migration in reversed(migrations):
+        if migration.version > target and migration.version in done:
+            _run(conn, migration, 'down')
+            yield migration
+
+
+# Names of the partitioned indexes the given (partition) indexes belong to
+_INDEX_ANCESTORS = """
+SELECT DISTINCT c.relname
+FROM unnest(%s::text[]) AS n(name)
+CROSS JOIN LATERAL pg_partition_ancestors(to_regclass(quote_ident(n.name))) AS a
+JOIN pg_class c ON c.oid = a.relid
+WHERE a.relid <> to_regclass(quote_ident(n.name))"""
+
+
+def _plan_indexes(plan):
+    """Collects every index name referenced anywhere in an EXPLAIN (FORMAT JSON) plan."""
+    names = set()
+    if 'Index Name' in plan:
+        names.add(plan['Index Name'])
+    for child in plan.get('Plans', []):
+        names |= _plan_indexes(child)
+    return names
+
+
+def check_indexes(conn, checks=INDEX_CHECKS):
+    """EXPLAINs each check's query and returns `(description, index, used, plan_indexes)`.
+
+    Sequential scans are disabled for the check so the result reflects
+    whether an index *can* serve the query, independent of how small the
+    tables happen to be. On a partitioned table the plan scans the
+    partitions' own indexes; they count as uses of the parent's index.
+    """
+    results = []
+    with conn.cursor() as cur:
+        cur.execute("SET LOCAL enable_seqscan = off")
+        for description, (query, params), index in checks:
+            cur.execute("EXPLAIN (FORMAT JSON) " + query, params)
+            used = _plan_indexes(cur.fetchone()[0][0]['Plan'])
+            cur.execute(_INDEX_ANCESTORS, (sorted(used),))
+            parents = {row[0] for row in cur.fetchall()}
+            results.append((description, index, index in used | parents, parents or used))
+    conn.rollback()
+    return results
+
+
+def add_commands(cli):
+    """Adds schema migration commands to the CLI."""
+    @cli.group()
+    def migrate():
+        """Apply, revert and verify versioned schema migrations."""
+        pass
+
+    @migrate.command()
+    def status():
+        """Show which migrations are applied."""
+        conn = get_connection()
+        if conn is None:
+            return
+        try:
+            done = applied_versions(conn)
+            for migration in load_migrations():
+                state = click.style('applied', fg='green') if migration.version in done else 'pending'
+                click.echo(f"{migration.version:04d} {migration.name}: {state}")
+        except Exception as e:
+            click.echo(f"Error reading migration status: {e}")
+        finally:
+            conn.close()
+
+    @migrate.command()
+    @click.option('--to', 'target', type=int, help="Stop after this version (default: latest)")
+    def up(target):
+        """Apply pending migrations."""
+        conn = get_connection()
+        if conn is None:
+            return
+        try:
+            applied = 0
+            for migration in migrate_up(conn, target):
+                click.echo(click.style(f"Applied {migration.version:04d} {migration.name}", fg='green'))
+                applied += 1
+            if not applied:
+                click.echo("No pending migrations.")
+        except Exception as e:
+            conn.rollback()
+            click.echo(f"Error applying migrations: {e}")
+        finally:
+            conn.close()
+
+    @migrate.command()
+    @click.option('--to', 'target', type=int, required=True, help="Revert every migration newer than this version (0 reverts all)")
+    @click.confirmation_option(prompt="Are you sure you want to revert migrations?")
+    def down(target):
+        """Revert applied migrations."""
+        conn = get_connection()
+        if conn is None:
+            return
+        try:
+            reverted = 0
+            for migration in migrate_down(conn, target):
+                click.echo(f"Reverted {migration.version:04d} {migration.name}")
+                reverted += 1
+            if not reverted:
+                click.echo("Nothing to revert.")
+        except Exception as e:
+            conn.rollback()
+            click.echo(f"Error reverting migrations: {e}")
+        finally:
+            conn.close()
+
+    @migrate.command()
+    @click.pass_context
+    def check(ctx):
+        """Verify with EXPLAIN that the CLI's queries use the expected indexes."""
+        conn = get_connection()
+        if conn is None:
+            return
+        try:
+            results = check_indexes(conn)
+        except Exception as e:
+            conn.rollback()
+            click.echo(f"Error checking query plans: {e}")
+            return
+        finally:
+            conn.close()
+        missing = 0
+        for description, index, used, plan_indexes in results:
+            if used:
+                click.echo(f"{click.style('OK', fg='green')}      {description}: {index}")
+            else:
+                missing += 1
+                found = ', '.join(sorted(plan_indexes)) or 'no index'
+                click.echo(f"{click.style('MISSING', fg='red')} {description}: expected {index}, plan uses {found}")
+        if missing:
+            ctx.exit(1)
@@ -0,0 +1,8 @@
+DROP INDEX IF EXISTS course_instructor_id_idx;
+DROP INDEX IF EXISTS chapter_course_id_idx;
+DROP INDEX IF EXISTS enrollment_course_id_idx;
+DROP INDEX IF EXISTS transaction_user_id_idx;
+DROP INDEX IF EXISTS transaction_course_id_idx;
+DROP INDEX IF EXISTS feature_store_course_id_idx;
+DROP INDEX IF EXISTS feature_store_audit_feature_store_id_idx;
+DROP INDEX IF EXISTS feature_store_audit_changed_by_idx;
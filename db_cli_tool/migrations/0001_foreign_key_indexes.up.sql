@@ -0,0 +1,12 @@
+-- B-tree indexes for the foreign-key access paths. Without them every
+-- per-course/per-user lookup and every ON DELETE CASCADE / SET NULL from
+-- "User" or "Course" is a sequential scan of the referencing table.
+-- Enrollment.user_id is already covered by UNIQUE (user_id, course_id).
+CREATE INDEX IF NOT EXISTS course_instructor_id_idx ON "Course" (instructor_id);
+CREATE INDEX IF NOT EXISTS chapter_course_id_idx ON "Chapter" (course_id);
+CREATE INDEX IF NOT EXISTS enrollment_course_id_idx ON "Enrollment" (course_id);
+CREATE INDEX IF NOT EXISTS transaction_user_id_idx ON "Transaction" (user_id);
+CREATE INDEX IF NOT EXISTS transaction_course_id_idx ON "Transaction" (course_id);
+CREATE INDEX IF NOT EXISTS feature_store_course_id_idx ON "Feature_Store" (course_id);
+CREATE INDEX IF NOT EXISTS feature_store_audit_feature_store_id_idx ON "Feature_Store_Audit" (feature_store_id);
+CREATE INDEX IF NOT EXISTS feature_store_audit_changed_by_idx ON "Feature_Store_Audit" (changed_by);
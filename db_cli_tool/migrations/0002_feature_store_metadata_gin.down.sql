@@ -0,0 +1 @@
+DROP INDEX IF EXISTS feature_store_metadata_gin_idx;
@@ -0,0 +1,3 @@
+-- GIN index for containment (@>) queries on Feature_Store.metadata.
+-- jsonb_path_ops is smaller and faster than the default opclass for @>.
+CREATE INDEX IF NOT EXISTS feature_store_metadata_gin_idx ON "Feature_Store" USING GIN (metadata jsonb_path_ops);
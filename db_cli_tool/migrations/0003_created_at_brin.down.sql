@@ -0,0 +1,2 @@
+DROP INDEX IF EXISTS transaction_created_at_brin_idx;
+DROP INDEX IF EXISTS feature_store_audit_created_at_brin_idx;
@@ -0,0 +1,5 @@
+-- BRIN indexes on created_at for the append-heavy tables. Rows arrive in
+-- created_at order, so a few bytes per block range are enough to skip most
+-- of the heap for --since/--until range scans.
+CREATE INDEX IF NOT EXISTS transaction_created_at_brin_idx ON "Transaction" USING BRIN (created_at);
+CREATE INDEX IF NOT EXISTS feature_store_audit_created_at_brin_idx ON "Feature_Store_Audit" USING BRIN (created_at);
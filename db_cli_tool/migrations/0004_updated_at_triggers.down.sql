@@ -0,0 +1,4 @@
+DROP TRIGGER IF EXISTS user_set_updated_at ON "User";
+DROP TRIGGER IF EXISTS course_set_updated_at ON "Course";
+DROP TRIGGER IF EXISTS feature_store_set_updated_at ON "Feature_Store";
+DROP FUNCTION IF EXISTS set_updated_at();
@@ -0,0 +1,17 @@
+-- Keep updated_at current on every UPDATE, whoever issues it (bulk upserts,
+-- ad-hoc SQL, other services). The read-through cache revalidates cached
+-- User, Course and Feature_Store rows by comparing updated_at, so it must
+-- change whenever the row does.
+CREATE OR REPLACE FUNCTION set_updated_at() RETURNS trigger AS $$
+BEGIN
+  NEW.updated_at := clock_timestamp();
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER user_set_updated_at BEFORE UPDATE ON "User"
+  FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+CREATE TRIGGER course_set_updated_at BEFORE UPDATE ON "Course"
+  FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+CREATE TRIGGER feature_store_set_updated_at BEFORE UPDATE ON "Feature_Store"
+  FOR EACH ROW EXECUTE FUNCTION set_updated_at();
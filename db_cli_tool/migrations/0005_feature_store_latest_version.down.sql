@@ -0,0 +1,2 @@
+CREATE INDEX IF NOT EXISTS feature_store_course_id_idx ON "Feature_Store" (course_id);
+DROP INDEX IF EXISTS feature_store_course_id_version_idx;
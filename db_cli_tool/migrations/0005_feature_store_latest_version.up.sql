@@ -0,0 +1,7 @@
+-- Serves "latest version per course" lookups (feature_store get-latest)
+-- straight from the index: rows come out in DISTINCT ON order, so no sort.
+-- It also covers plain course_id lookups, making the single-column index
+-- from 0001 redundant.
+CREATE INDEX IF NOT EXISTS feature_store_course_id_version_idx
+  ON "Feature_Store" (course_id, version DESC NULLS LAST, feature_store_id DESC);
+DROP INDEX IF EXISTS feature_store_course_id_idx;
@@ -0,0 +1,14 @@
+CREATE INDEX IF NOT EXISTS feature_store_audit_feature_store_id_idx ON "Feature_Store_Audit" (feature_store_id);
+DROP INDEX IF EXISTS feature_store_audit_history_idx;
+
+-- NOT VALID: audit rows of entries deleted meanwhile are kept as they are
+ALTER TABLE "Feature_Store_Audit" ADD CONSTRAINT "Feature_Store_Audit_feature_store_id_fkey"
+  FOREIGN KEY (feature_store_id) REFERENCES "Feature_Store"(feature_store_id) ON DELETE CASCADE NOT VALID;
+
+DROP TRIGGER IF EXISTS feature_store_audit_insert ON "Feature_Store";
+DROP TRIGGER IF EXISTS feature_store_audit_update ON "Feature_Store";
+DROP TRIGGER IF EXISTS feature_store_audit_delete ON "Feature_Store";
+DROP FUNCTION IF EXISTS feature_store_audit_insert();
+DROP FUNCTION IF EXISTS feature_store_audit_update();
+DROP FUNCTION IF EXISTS feature_store_audit_delete();
+DROP FUNCTION IF EXISTS jsonb_object_diff(jsonb, jsonb);
@@ -0,0 +1,85 @@
+-- Write the Feature_Store audit trail from statement-level triggers. Each
+-- INSERT, UPDATE or DELETE on "Feature_Store" adds its audit rows with one
+-- INSERT ... SELECT over the statement's transition tables, in the same
+-- transaction, however many rows it touched. The author is taken from the
+-- transaction-local setting lms.changed_by (set_config(..., true)).
+
+-- Top-level diff of two JSON objects: keys added or changed, keys removed.
+-- Anything that isn't a pair of objects is recorded as old/new values.
+CREATE OR REPLACE FUNCTION jsonb_object_diff(old jsonb, new jsonb) RETURNS jsonb AS $$
+  SELECT CASE
+    WHEN jsonb_typeof(old) = 'object' AND jsonb_typeof(new) = 'object' THEN jsonb_build_object(
+      'set', COALESCE((SELECT jsonb_object_agg(n.key, n.value) FROM jsonb_each(new) n
+                       WHERE old -> n.key IS DISTINCT FROM n.value), '{}'),
+      'removed', COALESCE((SELECT jsonb_agg(o.key) FROM jsonb_object_keys(old) AS o(key)
+                           WHERE NOT new ? o.key), '[]'))
+    ELSE jsonb_build_object('old', old, 'new', new)
+  END
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION feature_store_audit_insert() RETURNS trigger AS $$
+DECLARE
+  author INT := NULLIF(current_setting('lms.changed_by', true), '')::int;
+BEGIN
+  INSERT INTO "Feature_Store_Audit" (feature_store_id, changed_by, changes)
+  SELECT n.feature_store_id, author,
+         jsonb_build_object('op', 'insert', 'course_id', n.course_id, 'version', n.version, 'metadata', n.metadata)
+  FROM new_rows n;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION feature_store_audit_update() RETURNS trigger AS $$
+DECLARE
+  author INT := NULLIF(current_setting('lms.changed_by', true), '')::int;
+BEGIN
+  INSERT INTO "Feature_Store_Audit" (feature_store_id, changed_by, changes)
+  SELECT n.feature_store_id, author,
+         jsonb_build_object('op', 'update')
+         || CASE WHEN o.course_id IS DISTINCT FROM n.course_id
+                 THEN jsonb_build_object('course_id', jsonb_build_object('old', o.course_id, 'new', n.course_id))
+                 ELSE '{}' END
+         || CASE WHEN o.version IS DISTINCT FROM n.version
+                 THEN jsonb_build_object('version', jsonb_build_object('old', o.version, 'new', n.version))
+                 ELSE '{}' END
+         || CASE WHEN o.metadata IS DISTINCT FROM n.metadata
+                 THEN jsonb_build_object('metadata', jsonb_object_diff(o.metadata, n.metadata))
+                 ELSE '{}' END
+  FROM old_rows o
+  JOIN new_rows n USING (feature_store_id)
+  WHERE o.course_id IS DISTINCT FROM n.course_id
+     OR o.version IS DISTINCT FROM n.version
+     OR o.metadata IS DISTINCT FROM n.metadata;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION feature_store_audit_delete() RETURNS trigger AS $$
+DECLARE
+  author INT := NULLIF(current_setting('lms.changed_by', true), '')::int;
+BEGIN
+  INSERT INTO "Feature_Store_Audit" (feature_store_id, changed_by, changes)
+  SELECT o.feature_store_id, author,
+         jsonb_build_object('op', 'delete', 'course_id', o.course_id, 'version', o.version, 'metadata', o.metadata)
+  FROM old_rows o;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER feature_store_audit_insert AFTER INSERT ON "Feature_Store"
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION feature_store_audit_insert();
+CREATE TRIGGER feature_store_audit_update AFTER UPDATE ON "Feature_Store"
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION feature_store_audit_update();
+CREATE TRIGGER feature_store_audit_delete AFTER DELETE ON "Feature_Store"
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION feature_store_audit_delete();
+
+-- The history must outlive the entry it describes (including the delete
+-- record itself), so the cascading foreign key goes.
+ALTER TABLE "Feature_Store_Audit" DROP CONSTRAINT IF EXISTS "Feature_Store_Audit_feature_store_id_fkey";
+
+-- History lookups filter on feature_store_id and page by audit_id.
+CREATE INDEX IF NOT EXISTS feature_store_audit_history_idx ON "Feature_Store_Audit" (feature_store_id, audit_id);
+DROP INDEX IF EXISTS feature_store_audit_feature_store_id_idx;
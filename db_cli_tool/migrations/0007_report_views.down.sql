@@ -0,0 +1,3 @@
+DROP TABLE IF EXISTS report_refreshes;
+DROP MATERIALIZED VIEW IF EXISTS report_course_enrollment;
+DROP MATERIALIZED VIEW IF EXISTS report_course_revenue_daily;
@@ -0,0 +1,35 @@
+-- Pre-aggregated reporting for `report`. The views are refreshed with
+-- `report refresh`, which uses REFRESH MATERIALIZED VIEW CONCURRENTLY so
+-- readers are never blocked; that needs a unique index on each view.
+
+-- Revenue per course, day and status. Per-course, per-instructor and daily
+-- totals are rolled up from this at query time.
+CREATE MATERIALIZED VIEW report_course_revenue_daily AS
+SELECT course_id,
+       created_at::date         AS day,
+       status,
+       COUNT(*)                 AS transactions,
+       COALESCE(SUM(amount), 0) AS revenue
+FROM "Transaction"
+GROUP BY course_id, created_at::date, status;
+
+CREATE UNIQUE INDEX report_course_revenue_daily_key ON report_course_revenue_daily (course_id, day, status);
+CREATE INDEX report_course_revenue_daily_day_idx ON report_course_revenue_daily (day);
+
+CREATE MATERIALIZED VIEW report_course_enrollment AS
+SELECT course_id,
+       COUNT(*)                                 AS enrollments,
+       COUNT(*) FILTER (WHERE progress >= 100)  AS completed,
+       ROUND(AVG(COALESCE(progress, 0)), 2)     AS avg_progress
+FROM "Enrollment"
+GROUP BY course_id;
+
+CREATE UNIQUE INDEX report_course_enrollment_key ON report_course_enrollment (course_id);
+
+-- Last refresh of each view, so its cost and staleness can be reported
+CREATE TABLE report_refreshes (
+  view_name    VARCHAR(63) PRIMARY KEY,
+  refreshed_at TIMESTAMP NOT NULL DEFAULT NOW(),
+  duration_ms  DOUBLE PRECISION NOT NULL,
+  row_count    BIGINT NOT NULL
+);
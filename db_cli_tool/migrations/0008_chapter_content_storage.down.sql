@@ -0,0 +1,3 @@
+ALTER TABLE "Chapter" ALTER COLUMN content SET STORAGE EXTENDED;
+CREATE INDEX IF NOT EXISTS chapter_course_id_idx ON "Chapter" (course_id);
+DROP INDEX IF EXISTS chapter_course_id_chapter_id_idx;
@@ -0,0 +1,10 @@
+-- Chapter content is read in substr() ranges (chapter get --with-content).
+-- With EXTERNAL storage it is kept uncompressed out of line, so a range only
+-- fetches the TOAST chunks it covers instead of decompressing the whole
+-- value. Rows already stored compressed keep that form until rewritten.
+ALTER TABLE "Chapter" ALTER COLUMN content SET STORAGE EXTERNAL;
+-- Serves chapter list --course-id in chapter order straight from the index,
+-- and still covers the ON DELETE CASCADE from "Course", so the single-column
+-- index from 0001 is redundant.
+CREATE INDEX IF NOT EXISTS chapter_course_id_chapter_id_idx ON "Chapter" (course_id, chapter_id);
+DROP INDEX IF EXISTS chapter_course_id_idx;
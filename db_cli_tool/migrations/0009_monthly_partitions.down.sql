@@ -0,0 +1,54 @@
+-- Copies the rows of every attached partition back into plain tables.
+-- Detached partitions are left alone.
+DROP MATERIALIZED VIEW IF EXISTS report_course_revenue_daily;
+ALTER TABLE "Transaction" RENAME TO "Transaction_partitioned";
+ALTER INDEX "Transaction_pkey" RENAME TO "Transaction_partitioned_pkey";
+CREATE TABLE "Transaction" (
+  transaction_id INT PRIMARY KEY DEFAULT nextval('"Transaction_transaction_id_seq"'),
+  user_id        INT NOT NULL REFERENCES "User"(user_id) ON DELETE CASCADE,
+  course_id      INT NOT NULL REFERENCES "Course"(course_id) ON DELETE CASCADE,
+  amount         DECIMAL(10,2),
+  status         VARCHAR(50),
+  created_at     TIMESTAMP NOT NULL DEFAULT NOW(),
+  updated_at     TIMESTAMP NOT NULL DEFAULT NOW()
+);
+INSERT INTO "Transaction" (transaction_id, user_id, course_id, amount, status, created_at, updated_at)
+  SELECT transaction_id, user_id, course_id, amount, status, created_at, updated_at FROM "Transaction_partitioned";
+ALTER SEQUENCE "Transaction_transaction_id_seq" OWNED BY "Transaction".transaction_id;
+DROP TABLE "Transaction_partitioned";
+CREATE INDEX transaction_user_id_idx ON "Transaction" (user_id);
+CREATE INDEX transaction_course_id_idx ON "Transaction" (course_id);
+CREATE INDEX transaction_created_at_brin_idx ON "Transaction" USING BRIN (created_at);
+
+CREATE MATERIALIZED VIEW report_course_revenue_daily AS
+SELECT course_id,
+       created_at::date         AS day,
+       status,
+       COUNT(*)                 AS transactions,
+       COALESCE(SUM(amount), 0) AS revenue
+FROM "Transaction"
+GROUP BY course_id, created_at::date, status;
+CREATE UNIQUE INDEX report_course_revenue_daily_key ON report_course_revenue_daily (course_id, day, status);
+CREATE INDEX report_course_revenue_daily_day_idx ON report_course_revenue_daily (day);
+ANALYZE "Transaction";
+ANALYZE report_course_revenue_daily;
+
+ALTER TABLE "Feature_Store_Audit" RENAME TO "Feature_Store_Audit_partitioned";
+ALTER INDEX "Feature_Store_Audit_pkey" RENAME TO "Feature_Store_Audit_partitioned_pkey";
+CREATE TABLE "Feature_Store_Audit" (
+  audit_id         INT PRIMARY KEY DEFAULT nextval('"Feature_Store_Audit_audit_id_seq"'),
+  feature_store_id INT NOT NULL,
+  changed_by       INT REFERENCES "User"(user_id) ON DELETE SET NULL,
+  changes          JSONB,
+  created_at       TIMESTAMP NOT NULL DEFAULT NOW()
+);
+INSERT INTO "Feature_Store_Audit" (audit_id, feature_store_id, changed_by, changes, created_at)
+  SELECT audit_id, feature_store_id, changed_by, changes, created_at FROM "Feature_Store_Audit_partitioned";
+ALTER SEQUENCE "Feature_Store_Audit_audit_id_seq" OWNED BY "Feature_Store_Audit".audit_id;
+DROP TABLE "Feature_Store_Audit_partitioned";
+CREATE INDEX feature_store_audit_history_idx ON "Feature_Store_Audit" (feature_store_id, audit_id);
+CREATE INDEX feature_store_audit_changed_by_idx ON "Feature_Store_Audit" (changed_by);
+CREATE INDEX feature_store_audit_created_at_brin_idx ON "Feature_Store_Audit" USING BRIN (created_at);
+ANALYZE "Feature_Store_Audit";
+
+DROP FUNCTION IF EXISTS create_month_partitions(regclass, timestamp, timestamp);
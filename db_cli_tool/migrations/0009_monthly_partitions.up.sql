@@ -0,0 +1,110 @@
+-- Range-partition the append-only "Transaction" and "Feature_Store_Audit"
+-- tables by month on created_at. Queries with a created_at range only scan
+-- the matching partitions, and `partition maintain` removes expired months
+-- by detaching or dropping whole partitions instead of running DELETE.
+-- Primary keys have to include the partition key, so they become
+-- (id, created_at); IDs stay unique through their sequences.
+
+-- Creates the missing monthly partitions of `parent` from the month of
+-- `first` through the month of `last` and returns their names. Rows of those
+-- months already in the default partition are moved into the new partition
+-- before it is attached. Also callable from a scheduler such as pg_cron.
+CREATE OR REPLACE FUNCTION create_month_partitions(parent regclass, first timestamp, last timestamp)
+RETURNS SETOF text AS $$
+DECLARE
+  base     text := (SELECT relname FROM pg_class WHERE oid = parent);
+  fallback regclass := to_regclass(quote_ident(base || '_default'));
+  month    timestamp := date_trunc('month', first);
+  name     text;
+BEGIN
+  WHILE month <= last LOOP
+    name := base || to_char(month, '"_"YYYY_MM');
+    IF to_regclass(quote_ident(name)) IS NULL THEN
+      EXECUTE format('CREATE TABLE %I (LIKE %s INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', name, parent);
+      IF fallback IS NOT NULL THEN
+        EXECUTE format('WITH moved AS (DELETE FROM %s WHERE created_at >= %L AND created_at < %L RETURNING *) '
+                       'INSERT INTO %I SELECT * FROM moved', fallback, month, month + interval '1 month', name);
+      END IF;
+      EXECUTE format('ALTER TABLE %s ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                     parent, name, month, month + interval '1 month');
+      RETURN NEXT name;
+    END IF;
+    month := month + interval '1 month';
+  END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Databases created from an lms.sql without partitioning are converted by
+-- copying into the new tables; the revenue view depends on "Transaction"
+-- and is rebuilt afterwards.
+DO $$
+BEGIN
+  IF (SELECT relkind FROM pg_class WHERE oid = '"Transaction"'::regclass) <> 'p' THEN
+    DROP MATERIALIZED VIEW IF EXISTS report_course_revenue_daily;
+    ALTER TABLE "Transaction" RENAME TO "Transaction_unpartitioned";
+    ALTER INDEX "Transaction_pkey" RENAME TO "Transaction_unpartitioned_pkey";
+    CREATE TABLE "Transaction" (
+      transaction_id INT NOT NULL DEFAULT nextval('"Transaction_transaction_id_seq"'),
+      user_id        INT NOT NULL REFERENCES "User"(user_id) ON DELETE CASCADE,
+      course_id      INT NOT NULL REFERENCES "Course"(course_id) ON DELETE CASCADE,
+      amount         DECIMAL(10,2),
+      status         VARCHAR(50),
+      created_at     TIMESTAMP NOT NULL DEFAULT NOW(),
+      updated_at     TIMESTAMP NOT NULL DEFAULT NOW(),
+      PRIMARY KEY (transaction_id, created_at)
+    ) PARTITION BY RANGE (created_at);
+    CREATE TABLE "Transaction_default" PARTITION OF "Transaction" DEFAULT;
+    PERFORM create_month_partitions('"Transaction"', MIN(created_at), MAX(created_at))
+      FROM "Transaction_unpartitioned" HAVING COUNT(*) > 0;
+    INSERT INTO "Transaction" (transaction_id, user_id, course_id, amount, status, created_at, updated_at)
+      SELECT transaction_id, user_id, course_id, amount, status, created_at, updated_at FROM "Transaction_unpartitioned";
+    ALTER SEQUENCE "Transaction_transaction_id_seq" OWNED BY "Transaction".transaction_id;
+    DROP TABLE "Transaction_unpartitioned";
+    CREATE INDEX transaction_user_id_idx ON "Transaction" (user_id);
+    CREATE INDEX transaction_course_id_idx ON "Transaction" (course_id);
+    CREATE INDEX transaction_created_at_brin_idx ON "Transaction" USING BRIN (created_at);
+
+    CREATE MATERIALIZED VIEW report_course_revenue_daily AS
+    SELECT course_id,
+           created_at::date         AS day,
+           status,
+           COUNT(*)                 AS transactions,
+           COALESCE(SUM(amount), 0) AS revenue
+    FROM "Transaction"
+    GROUP BY course_id, created_at::date, status;
+    CREATE UNIQUE INDEX report_course_revenue_daily_key ON report_course_revenue_daily (course_id, day, status);
+    CREATE INDEX report_course_revenue_daily_day_idx ON report_course_revenue_daily (day);
+    ANALYZE "Transaction";
+    ANALYZE report_course_revenue_daily;
+  END IF;
+
+  IF (SELECT relkind FROM pg_class WHERE oid = '"Feature_Store_Audit"'::regclass) <> 'p' THEN
+    ALTER TABLE "Feature_Store_Audit" RENAME TO "Feature_Store_Audit_unpartitioned";
+    ALTER INDEX "Feature_Store_Audit_pkey" RENAME TO "Feature_Store_Audit_unpartitioned_pkey";
+    CREATE TABLE "Feature_Store_Audit" (
+      audit_id         INT NOT NULL DEFAULT nextval('"Feature_Store_Audit_audit_id_seq"'),
+      feature_store_id INT NOT NULL,
+      changed_by       INT REFERENCES "User"(user_id) ON DELETE SET NULL,
+      changes          JSONB,
+      created_at       TIMESTAMP NOT NULL DEFAULT NOW(),
+      PRIMARY KEY (audit_id, created_at)
+    ) PARTITION BY RANGE (created_at);
+    CREATE TABLE "Feature_Store_Audit_default" PARTITION OF "Feature_Store_Audit" DEFAULT;
+    PERFORM create_month_partitions('"Feature_Store_Audit"', MIN(created_at), MAX(created_at))
+      FROM "Feature_Store_Audit_unpartitioned" HAVING COUNT(*) > 0;
+    INSERT INTO "Feature_Store_Audit" (audit_id, feature_store_id, changed_by, changes, created_at)
+      SELECT audit_id, feature_store_id, changed_by, changes, created_at FROM "Feature_Store_Audit_unpartitioned";
+    ALTER SEQUENCE "Feature_Store_Audit_audit_id_seq" OWNED BY "Feature_Store_Audit".audit_id;
+    DROP TABLE "Feature_Store_Audit_unpartitioned";
+    CREATE INDEX feature_store_audit_history_idx ON "Feature_Store_Audit" (feature_store_id, audit_id);
+    CREATE INDEX feature_store_audit_changed_by_idx ON "Feature_Store_Audit" (changed_by);
+    CREATE INDEX feature_store_audit_created_at_brin_idx ON "Feature_Store_Audit" USING BRIN (created_at);
+    ANALYZE "Feature_Store_Audit";
+  END IF;
+END
+$$;
+
+-- Partitions for the current month and the next three; `partition maintain`
+-- keeps creating them ahead.
+SELECT create_month_partitions('"Transaction"', NOW()::timestamp, NOW()::timestamp + interval '3 months');
+SELECT create_month_partitions('"Feature_Store_Audit"', NOW()::timestamp, NOW()::timestamp + interval '3 months');
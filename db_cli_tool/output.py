@@ -0,0 +1,177 @@
+import io
+from datetime import date, datetime, time
+from decimal import Decimal
+from functools import lru_cache
+import click
+
+# Values of the global --format option; `table` is the human-readable default
+FORMATS = ('table', 'tsv', 'json', 'jsonl')
+# Bytes of COPY output collected before each write to stdout
+OUTPUT_CHUNK_BYTES = 256 * 1024
+
+_FORMAT_KEY = 'db_tool.format'
+
+# Same COPY options as export.py's JSONL: CSV mode with control characters as
+# quote and delimiter, so JSON documents pass through COPY unescaped
+_JSON_COPY_OPTIONS = "FORMAT csv, QUOTE e'\\x01', DELIMITER e'\\x02'"
+# COPY text escapes, so tsv written from Python matches tsv written by COPY
+_TSV_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+format_option = click.option(
+    '--format', 'output_format', type=click.Choice(FORMATS), default='table', show_default=True,
+    help="How list, get and report commands write rows: one readable line per row, or tsv/json/jsonl for scripts")
+
+
+def set_format(ctx, output_format):
+    """Makes `output_format` the format of the command run under `ctx`."""
+    ctx.meta[_FORMAT_KEY] = output_format
+
+
+def current_format():
+    """Returns the --format of the running command ('table' outside of one)."""
+    ctx = click.get_current_context(silent=True)
+    return ctx.meta.get(_FORMAT_KEY, 'table') if ctx is not None else 'table'
+
+
+def echo_notice(message):
+    """Echoes a message that isn't a row, e.g. "No users found.".
+
+    In the machine-readable formats it goes to stderr, so stdout only ever
+    holds records.
+    """
+    click.echo(message, err=current_format() != 'table')
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+@lru_cache(maxsize=None)
+def json_encoder():
+    """Returns a function encoding a value as compact JSON bytes.
+
+    Uses orjson when it is installed (`pip install orjson`), which is several
+    times faster, and the json module otherwise. Decimals become numbers and
+    dates ISO 8601 strings either way.
+    """
+    try:
+        import orjson
+    except ImportError:
+        import json
+        encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=_default).encode
+        return lambda value: encode(value).encode()
+    dumps = orjson.dumps
+    return lambda value: dumps(value, default=_default)
+
+
+def _tsv_field(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, (dict, list)):
+        import json
+        # Spaced like the jsonb text that COPY writes
+        value = json.dumps(value, ensure_ascii=False, default=_default)
+    return str(value).translate(_TSV_ESCAPES)
+
+
+def _quote_ident(name):
+    # %% because the statement is completed with mogrify()
+    return '"' + name.replace('"', '""').replace('%', '%%') + '"'
+
+
+def _tsv_header(columns):
+    return ('\t'.join(columns) + '\n').encode()
+
+
+def write_rows(rows, columns, output_format=None):
+    """Writes rows already in memory as records keyed by `columns` and returns how many were written.
+
+    tsv has a header line and COPY text escaping (\\N is NULL), json is one
+    array with a record per line, jsonl a record per line. Query results are
+    written by copy_rows instead.
+    """
+    output_format = output_format or current_format()
+    if output_format == 'tsv':
+        lines = [('\t'.join(map(_tsv_field, row)) + '\n').encode() for row in rows]
+        click.echo(_tsv_header(columns) + b''.join(lines), nl=False)
+        return len(lines)
+    encode = json_encoder()
+    records = [encode(dict(zip(columns, row))) for row in rows]
+    if output_format == 'json':
+        click.echo(b'[\n' + b',\n'.join(records) + b'\n]\n' if records else b'[]\n', nl=False)
+    else:
+        click.echo(b''.join(record + b'\n' for record in records), nl=False)
+    return len(records)
+
+
+def echo_row(row, format_row, columns):
+    """Echoes a single row: `format_row(row)` in the table format, else one `columns` record.
+
+    In json that is a bare object rather than an array.
+    """
+    output_format = current_format()
+    if output_format == 'table':
+        click.echo(format_row(row))
+    else:
+        write_rows([row], columns, 'jsonl' if output_format == 'json' else output_format)
+
+
+class _StdoutSink(io.RawIOBase):
+    """Raw stream under the buffer COPY writes into; passes each full buffer on to stdout.
+
+    With `array` the one document per line that COPY sends becomes a JSON
+    array: every newline but the last gets a comma, so the last byte seen is
+    held back until the next write or finish(). Documents never contain a
+    raw newline, as JSON escapes them in strings.
+    """
+
+    def __init__(self, array=False):
+        self.array = array
+        self.started = False
+        self.held = b''
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        size = len(data)
+        data = bytes(data)
+        if self.array:
+            data, self.held = self.held + data, data[-1:]
+            data = (b'' if self.started else b'[\n') + data[:-1].replace(b'\n', b',\n')
+        self.started = True
+        click.echo(data, nl=False)
+        return size
+
+    def finish(self):
+        if self.array:
+            click.echo(b'\n]\n' if self.started else b'[]\n', nl=False)
+
+
+def copy_rows(conn, query, params, columns, output_format=None):
+    """Streams the result of `query` as records keyed by `columns` and returns how many were written.
+
+    The server renders the records: tsv is the text format of COPY ... TO
+    STDOUT (plus a header line), json and jsonl are row_to_json() documents
+    with the columns renamed to `columns`. The client only passes bytes on,
+    OUTPUT_CHUNK_BYTES at a time, so no Python objects are made per row and
+    the database, not the formatting, sets the pace.
+    """
+    output_format = output_format or current_format()
+    if output_format == 'tsv':
+        click.echo(_tsv_header(columns), nl=False)
+        statement = f"COPY ({query}) TO STDOUT"
+    else:
+        aliases = ', '.join(_quote_ident(column) for column in columns)
+        statement = f"COPY (SELECT row_to_json(r) FROM ({query}) r({aliases})) TO STDOUT WITH ({_JSON_COPY_OPTIONS})"
+    sink = _StdoutSink(array=output_format == 'json')
+    with conn.cursor() as cur:
+        out = io.BufferedWriter(sink, OUTPUT_CHUNK_BYTES)
+        cur.copy_expert(cur.mogrify(statement, params), out)
+        out.flush()
+        sink.finish()
+        return cur.rowcount
@@ -0,0 +1,201 @@
+import re
+from collections import namedtuple
+from datetime import datetime
+import click
+from db_connection import get_connection
+from tables import TRANSACTION, FEATURE_STORE_AUDIT
+from queries import PARTITION_IS_PARTITIONED, PARTITION_LIST, PARTITION_CREATE, PARTITION_DEFAULT_MONTHS
+
+# Tables range-partitioned by month on created_at (migration 0009), by --table value
+PARTITIONED_TABLES = {'transaction': TRANSACTION, 'feature_store_audit': FEATURE_STORE_AUDIT}
+# Months of partitions `partition maintain` keeps created after the current one
+DEFAULT_PREMAKE_MONTHS = 3
+# How long `partition maintain` waits for a table lock before giving up, so
+# it never queues ahead of (and so blocks) the application's queries
+MAINTAIN_LOCK_TIMEOUT = '5s'
+
+# An attached partition; `start` and `end` are None for the default partition
+Partition = namedtuple('Partition', ['name', 'start', 'end', 'rows', 'bytes'])
+
+_BOUNDS = re.compile(r"FROM \('([^']*)'\) TO \('([^']*)'\)")
+
+
+def _quote_ident(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def month_start(moment):
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def is_partitioned(conn, table):
+    with conn.cursor() as cur:
+        cur.execute(PARTITION_IS_PARTITIONED, (table.name,))
+        row = cur.fetchone()
+    return bool(row and row[0])
+
+
+def list_partitions(conn, table):
+    """Returns the attached partitions of `table`, oldest first and the default partition last.
+
+    Row counts are the planner's estimates from the last ANALYZE.
+    """
+    with conn.cursor() as cur:
+        cur.execute(PARTITION_LIST, (table.name,))
+        rows = cur.fetchall()
+    partitions = []
+    for name, bound, estimate, size in rows:
+        match = _BOUNDS.search(bound)
+        start, end = (datetime.fromisoformat(match.group(1)), datetime.fromisoformat(match.group(2))) if match else (None, None)
+        partitions.append(Partition(name, start, end, estimate, size))
+    partitions.sort(key=lambda p: (p.start is None, p.start or datetime.min))
+    return partitions
+
+
+def create_partitions(conn, table, first, last):
+    """Creates the missing monthly partitions from `first`'s month through `last`'s and commits.
+
+    Rows of those months waiting in the default partition are moved into
+    them. Returns the names of the new partitions; on a table that isn't
+    partitioned (migration 0009 not applied) it does nothing.
+    """
+    if not is_partitioned(conn, table):
+        conn.rollback()
+        return []
+    with conn.cursor() as cur:
+        cur.execute(PARTITION_CREATE, (table.name, first, last))
+        created = [row[0] for row in cur.fetchall()]
+    conn.commit()
+    return created
+
+
+def maintain_partitions(conn, table, premake=DEFAULT_PREMAKE_MONTHS, retention=None, drop=False):
+    """Keeps `table`'s partitions current; yields `(action, partition name)` once each step is committed.
+
+    Creates the partitions of the current month, of `premake` months ahead
+    and of every month with rows in the default partition. With `retention`
+    (months), partitions that ended more than `retention` months before the
+    current month started are detached, or dropped with `drop`. Expired
+    months go as whole tables, without a DELETE. Each step waits at most
+    MAINTAIN_LOCK_TIMEOUT for its locks.
+    """
+    partitions = list_partitions(conn, table)
+    with conn.cursor() as cur:
+        cur.execute("SELECT LOCALTIMESTAMP")
+        this_month = month_start(cur.fetchone()[0])
+        months = [(this_month, add_months(this_month, premake))]
+        default = next((p for p in partitions if p.start is None), None)
+        if default is not None:
+            cur.execute(PARTITION_DEFAULT_MONTHS.format(column=table.partition_key,
+                                                        partition=_quote_ident(default.name)))
+            months += [(month, month) for month, in cur.fetchall()]
+        cur.execute(f"SET LOCAL lock_timeout = '{MAINTAIN_LOCK_TIMEOUT}'")
+        created = []
+        for first, last in months:
+            cur.execute(PARTITION_CREATE, (table.name, first, last))
+            created += [row[0] for row in cur.fetchall()]
+    conn.commit()
+    for name in created:
+        yield 'created', name
+    if retention is None:
+        return
+
+    cutoff = add_months(this_month, -retention)
+    for partition in list_partitions(conn, table):
+        if partition.end is None or partition.end > cutoff:
+            continue
+        with conn.cursor() as cur:
+            cur.execute(f"SET LOCAL lock_timeout = '{MAINTAIN_LOCK_TIMEOUT}'")
+            cur.execute(f"ALTER TABLE {table.name} DETACH PARTITION {_quote_ident(partition.name)}")
+            if drop:
+                cur.execute(f"DROP TABLE {_quote_ident(partition.name)}")
+        conn.commit()
+        yield ('dropped' if drop else 'detached'), partition.name
+
+
+def _tables(names):
+    return [PARTITIONED_TABLES[name] for name in names or PARTITIONED_TABLES]
+
+
+table_option = click.option('--table', 'tables', multiple=True, type=click.Choice(list(PARTITIONED_TABLES)),
+                            help="Partitioned table to work on (repeatable; default: all)")
+
+
+def add_commands(cli):
+    """Adds partition maintenance commands to the CLI."""
+    @cli.group()
+    def partition():
+        """Create, list and expire the monthly partitions of Transaction and Feature_Store_Audit."""
+        pass
+
+    @partition.command()
+    @table_option
+    def list(tables):
+        """List the partitions with their month, estimated rows and size."""
+        conn = get_connection(readonly=True)
+        if conn is None:
+            return
+        try:
+            for table in _tables(tables):
+                label = table.name.strip('"')
+                if not is_partitioned(conn, table):
+                    click.echo(f"{label} is not partitioned; run `migrate up` first.")
+                    continue
+                for p in list_partitions(conn, table):
+                    span = 'default' if p.start is None else f"{p.start:%Y-%m-%d} to {p.end:%Y-%m-%d}"
+                    click.echo(f"{p.name}: {span}, ~{p.rows} rows, {p.bytes // 1024} kB")
+            conn.rollback()
+        except Exception as e:
+            conn.rollback()
+            click.echo(f"Error listing partitions: {e}")
+        finally:
+            conn.close()
+
+    @partition.command()
+    @table_option
+    @click.option('--premake', type=click.IntRange(min=0), default=DEFAULT_PREMAKE_MONTHS, show_default=True,
+                  help="Months of partitions to create ahead of the current one")
+    @click.option('--retention', type=click.IntRange(min=1),
+                  help="Remove partitions that ended more than this many months before the current month "
+                       "(default: keep all)")
+    @click.option('--drop', is_flag=True, help="Drop expired partitions instead of detaching them")
+    @click.option('--yes', is_flag=True, help="Don't ask before dropping partitions")
+    def maintain(tables, premake, retention, drop, yes):
+        """Create upcoming partitions and detach or drop expired ones.
+
+        Meant to run daily, e.g. from cron. Detached partitions stay as
+        standalone tables under the same name, to be archived or dropped
+        later; rows in the default partition are moved to their month's
+        partition first.
+        """
+        if drop and retention is None:
+            raise click.UsageError("--drop needs --retention.")
+        if drop and not yes:
+            click.confirm("Drop the expired partitions and every row in them?", abort=True)
+        conn = get_connection()
+        if conn is None:
+            return
+        try:
+            for table in _tables(tables):
+                label = table.name.strip('"')
+                if not is_partitioned(conn, table):
+                    conn.rollback()
+                    click.echo(f"{label} is not partitioned; run `migrate up` first.")
+                    continue
+                changed = False
+                for action, name in maintain_partitions(conn, table, premake, retention, drop):
+                    click.echo(f"{action.capitalize()} {name}")
+                    changed = True
+                if not changed:
+                    click.echo(f"Partitions of {label} are up to date.")
+        except Exception as e:
+            conn.rollback()
+            click.echo(f"Error maintaining partitions: {e}")
+        finally:
+            conn.close()
+
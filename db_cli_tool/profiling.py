@@ -0,0 +1,238 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+import click
+import db_connection
+
+# Statements listed in the --profile table (the slowest, in execution order)
+PROFILE_TOP_STATEMENTS = 20
+# Characters of SQL shown per statement in the --profile table
+PROFILE_SQL_WIDTH = 70
+
+# Statements EXPLAIN ANALYZE can re-run; writes (and prepared statements,
+# which may be writes) only inside a transaction, where a savepoint undoes
+# the second execution
+_EXPLAINABLE = ('select', 'with', 'insert', 'update', 'delete', 'values', 'table', 'execute')
+_EXPLAINABLE_AUTOCOMMIT = ('select', 'values', 'table')
+_EXPLAIN_SAVEPOINT = 'db_tool_explain'
+
+
+class Statement:
+    """Timings of one executed statement, filled in by ProfilingCursor."""
+
+    def __init__(self, query):
+        self.query = query
+        self.execute_s = 0.0
+        self.fetch_s = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.plan = None
+
+    def as_dict(self):
+        result = {'query': self.query, 'execute_ms': self.execute_s * 1000, 'fetch_ms': self.fetch_s * 1000,
+                  'rows': self.rows, 'bytes': self.bytes}
+        if self.plan is not None:
+            result['plan'] = self.plan
+        return result
+
+
+def _statement_text(cursor, query):
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', 'replace')
+    elif not isinstance(query, str):
+        query = query.as_string(cursor)  # psycopg2.sql.Composable
+    return ' '.join(query.split())
+
+
+def _row_bytes(row):
+    """Approximates a row's size on the wire (PostgreSQL's text format)."""
+    size = 0
+    for value in row:
+        if value is None:
+            continue
+        if isinstance(value, (str, bytes, memoryview)):
+            size += len(value)
+        elif isinstance(value, (dict, list)):
+            size += len(json.dumps(value, default=str))
+        else:
+            size += len(str(value))
+    return size
+
+
+class Profiler:
+    """Collects connection, execute and fetch timings for one command or code block.
+
+    Install it with db_connection.set_profiler() (or use profile()); every
+    connection checked out afterwards reports its checkout time, and its
+    cursors report each statement. With `explain` set, every statement that
+    can be re-run safely is also run under EXPLAIN (ANALYZE, BUFFERS) and the
+    plan is kept, as text or as parsed JSON depending on `explain_format`.
+    The time spent explaining is reported separately from the command's own.
+    """
+
+    def __init__(self, explain=False, explain_format='text'):
+        self.explain = explain
+        self.explain_format = explain_format
+        self.started = time.perf_counter()
+        self.finished = None
+        self.checkouts = 0
+        self.new_connections = 0
+        self.connect_s = 0.0
+        self.explain_s = 0.0
+        self.statements = []
+        self._lock = threading.Lock()
+
+    # Hooks called by db_connection
+
+    def connected(self, seconds, new):
+        with self._lock:
+            self.checkouts += 1
+            self.new_connections += bool(new)
+            self.connect_s += seconds
+
+    def begin(self, cursor, query):
+        record = Statement(_statement_text(cursor, query))
+        with self._lock:
+            self.statements.append(record)
+        return record
+
+    def executed(self, cursor, query, vars, record, explain=True):
+        if cursor.description is None and cursor.rowcount > 0:
+            record.rows = cursor.rowcount  # rows written by a statement without a result set
+        if self.explain and explain:
+            start = time.perf_counter()
+            record.plan = self._explain(cursor, query, vars)
+            self.explain_s += time.perf_counter() - start
+
+    def fetched(self, record, seconds, rows):
+        record.fetch_s += seconds
+        record.rows += len(rows)
+        record.bytes += sum(_row_bytes(row) for row in rows)
+
+    def _explain(self, cursor, query, vars):
+        import psycopg2
+        import psycopg2.extensions
+        conn = cursor.connection
+        text = _statement_text(cursor, query)
+        keyword = text.split(None, 1)[0].lower() if text else ''
+        if keyword not in (_EXPLAINABLE_AUTOCOMMIT if conn.autocommit else _EXPLAINABLE):
+            return None
+        if conn.info.transaction_status == psycopg2.extensions.TRANSACTION_STATUS_INERROR:
+            return None
+        statement = cursor.mogrify(query, vars)
+        options = 'ANALYZE, BUFFERS, FORMAT JSON' if self.explain_format == 'json' else 'ANALYZE, BUFFERS'
+        with psycopg2.extensions.cursor(conn) as cur:  # a plain cursor, so the EXPLAIN isn't profiled
+            if not conn.autocommit:
+                cur.execute(f"SAVEPOINT {_EXPLAIN_SAVEPOINT}")
+            try:
+                cur.execute(f"EXPLAIN ({options}) ".encode() + statement)
+                rows = cur.fetchall()
+            except psycopg2.Error as e:
+                rows = None
+                error = str(e).strip()
+            finally:
+                if not conn.autocommit:
+                    cur.execute(f"ROLLBACK TO SAVEPOINT {_EXPLAIN_SAVEPOINT}")
+                    cur.execute(f"RELEASE SAVEPOINT {_EXPLAIN_SAVEPOINT}")
+        if rows is None:
+            return f"EXPLAIN failed: {error}" if self.explain_format == 'text' else {'error': error}
+        if self.explain_format == 'json':
+            return rows[0][0]
+        return '\n'.join(row[0] for row in rows)
+
+    # Results
+
+    def finish(self):
+        if self.finished is None:
+            self.finished = time.perf_counter()
+
+    def summary(self):
+        """Returns the profile as a JSON-serializable dict (times in milliseconds)."""
+        total_s = (self.finished or time.perf_counter()) - self.started
+        execute_s = sum(s.execute_s for s in self.statements)
+        fetch_s = sum(s.fetch_s for s in self.statements)
+        return {
+            'total_ms': total_s * 1000,
+            'connect_ms': self.connect_s * 1000,
+            'execute_ms': execute_s * 1000,
+            'fetch_ms': fetch_s * 1000,
+            'explain_ms': self.explain_s * 1000,
+            'other_ms': max(total_s - self.connect_s - execute_s - fetch_s - self.explain_s, 0) * 1000,
+            'checkouts': self.checkouts,
+            'new_connections': self.new_connections,
+            'rows': sum(s.rows for s in self.statements),
+            'bytes': sum(s.bytes for s in self.statements),
+            'statements': [s.as_dict() for s in self.statements],
+        }
+
+    def format_table(self, top=PROFILE_TOP_STATEMENTS):
+        """Returns the profile as lines of text."""
+        summary = self.summary()
+        count = len(self.statements)
+        lines = [
+            f"{'phase':<10}{'ms':>10}",
+            f"{'connect':<10}{summary['connect_ms']:>10.1f}  {summary['checkouts']} checkout(s), "
+            f"{summary['new_connections']} new connection(s)",
+            f"{'execute':<10}{summary['execute_ms']:>10.1f}  {count} statement(s)",
+            f"{'fetch':<10}{summary['fetch_ms']:>10.1f}  {summary['rows']} row(s), {summary['bytes'] / 1024:.1f} kB",
+        ]
+        if self.explain:
+            lines.append(f"{'explain':<10}{summary['explain_ms']:>10.1f}  not part of the command's own time")
+        lines.append(f"{'other':<10}{summary['other_ms']:>10.1f}  Python: parsing, rendering, output")
+        lines.append(f"{'total':<10}{summary['total_ms']:>10.1f}")
+        if not count:
+            return lines
+        slowest = set(sorted(range(count), key=lambda i: self.statements[i].execute_s + self.statements[i].fetch_s,
+                             reverse=True)[:top])
+        lines.append('')
+        lines.append(f"{'#':>4}{'execute':>10}{'fetch':>10}{'rows':>9}{'kB':>9}  statement")
+        for i, s in enumerate(self.statements):
+            if i in slowest:
+                query = s.query if len(s.query) <= PROFILE_SQL_WIDTH else s.query[:PROFILE_SQL_WIDTH - 3] + '...'
+                lines.append(f"{i + 1:>4}{s.execute_s * 1000:>10.1f}{s.fetch_s * 1000:>10.1f}"
+                             f"{s.rows:>9}{s.bytes / 1024:>9.1f}  {query}")
+        if count > top:
+            lines.append(f"     ... {count - top} faster statement(s) not shown")
+        for i, s in enumerate(self.statements):
+            if i in slowest and s.plan is not None:
+                lines.append('')
+                lines.append(f"Plan of statement {i + 1}:")
+                lines.extend('  ' + line for line in s.plan.splitlines())
+        return lines
+
+
+def start(explain=False, explain_format='text'):
+    """Creates a Profiler and installs it for connections checked out from now on."""
+    profiler = Profiler(explain, explain_format)
+    db_connection.set_profiler(profiler)
+    return profiler
+
+
+def stop(profiler):
+    """Uninstalls `profiler` and stops its clock."""
+    if db_connection.get_profiler() is profiler:
+        db_connection.set_profiler(None)
+    profiler.finish()
+
+
+@contextmanager
+def profile(explain=False, explain_format='text'):
+    """Profiles the database work done in a `with` block.
+
+    `with profile() as profiler: ...`, then read `profiler.summary()` or
+    `profiler.format_table()`.
+    """
+    profiler = start(explain, explain_format)
+    try:
+        yield profiler
+    finally:
+        stop(profiler)
+
+
+def echo_profile(profiler, fmt='table'):
+    """Writes a finished profile to stderr, so it doesn't mix with the command's output."""
+    if fmt == 'json':
+        click.echo(json.dumps(profiler.summary(), default=str), err=True)
+    else:
+        click.echo('\n'.join(profiler.format_table()), err=True)
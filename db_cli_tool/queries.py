@@ -1,49 +1,98 @@
 # queries.py
 
+# *_UPDATE statements set each column to COALESCE(%s, column) so that a NULL
+# parameter keeps the current value; callers append the WHERE clause and
+# RETURNING with listing.build_update(). *_INSERT_MANY statements take a page
+# of rows through psycopg2.extras.execute_values. *_SELECT_BY_ID_VERSIONED
+# adds updated_at as the last column and *_SELECT_VERSION reads only
+# updated_at; cache.py uses them to revalidate cached rows.
+
 # User queries (assuming these already exist)
 USER_INSERT = "INSERT INTO \"User\" (name, email, role) VALUES (%s, %s, %s) RETURNING user_id"
 USER_SELECT_ALL = "SELECT user_id, name, email, role FROM \"User\""
 USER_SELECT_BY_ID = "SELECT user_id, name, email, role FROM \"User\" WHERE user_id = %s"
-USER_UPDATE = "UPDATE \"User\" SET name = %s, email = %s, role = %s WHERE user_id = %s"
+USER_SELECT_BY_ID_VERSIONED = "SELECT user_id, name, email, role, updated_at FROM \"User\" WHERE user_id = %s"
+USER_SELECT_VERSION = "SELECT updated_at FROM \"User\" WHERE user_id = %s"
+USER_UPDATE = "UPDATE \"User\" SET name = COALESCE(%s, name), email = COALESCE(%s, email), role = COALESCE(%s, role), updated_at = NOW()"
 USER_DELETE = "DELETE FROM \"User\" WHERE user_id = %s"
+USER_INSERT_MANY = "INSERT INTO \"User\" (name, email, role) VALUES %s RETURNING user_id"
+USER_DELETE_MANY = "DELETE FROM \"User\" WHERE user_id = ANY(%s) RETURNING user_id"
+USER_SELECT_EXISTING = "SELECT user_id FROM \"User\" WHERE user_id = ANY(%s)"
 
 # Course queries (assuming these already exist)
 COURSE_INSERT = "INSERT INTO \"Course\" (title, instructor_id, description, price) VALUES (%s, %s, %s, %s) RETURNING course_id"
 COURSE_SELECT_ALL = "SELECT course_id, title, instructor_id, description, price FROM \"Course\""
 COURSE_SELECT_BY_ID = "SELECT course_id, title, instructor_id, description, price FROM \"Course\" WHERE course_id = %s"
-COURSE_UPDATE = "UPDATE \"Course\" SET title = %s, description = %s, price = %s WHERE course_id = %s"
+COURSE_SELECT_BY_ID_VERSIONED = "SELECT course_id, title, instructor_id, description, price, updated_at FROM \"Course\" WHERE course_id = %s"
+COURSE_SELECT_VERSION = "SELECT updated_at FROM \"Course\" WHERE course_id = %s"
+COURSE_UPDATE = "UPDATE \"Course\" SET title = COALESCE(%s, title), description = COALESCE(%s, description), price = COALESCE(%s, price), updated_at = NOW()"
 COURSE_DELETE = "DELETE FROM \"Course\" WHERE course_id = %s"
+COURSE_INSERT_MANY = "INSERT INTO \"Course\" (title, instructor_id, description, price) VALUES %s RETURNING course_id"
+COURSE_DELETE_MANY = "DELETE FROM \"Course\" WHERE course_id = ANY(%s) RETURNING course_id"
+COURSE_SELECT_EXISTING = "SELECT course_id FROM \"Course\" WHERE course_id = ANY(%s)"
 
 # Enrollment queries
 ENROLLMENT_INSERT = "INSERT INTO \"Enrollment\" (user_id, course_id) VALUES (%s, %s) RETURNING enrollment_id"
 ENROLLMENT_SELECT_ALL = "SELECT enrollment_id, user_id, course_id FROM \"Enrollment\""
 ENROLLMENT_SELECT_BY_ID = "SELECT enrollment_id, user_id, course_id FROM \"Enrollment\" WHERE enrollment_id = %s"
-ENROLLMENT_UPDATE = "UPDATE \"Enrollment\" SET user_id = %s, course_id = %s WHERE enrollment_id = %s"
+ENROLLMENT_UPDATE = "UPDATE \"Enrollment\" SET user_id = COALESCE(%s, user_id), course_id = COALESCE(%s, course_id), updated_at = NOW()"
 ENROLLMENT_DELETE = "DELETE FROM \"Enrollment\" WHERE enrollment_id = %s"
+ENROLLMENT_INSERT_MANY = "INSERT INTO \"Enrollment\" (user_id, course_id) VALUES %s RETURNING enrollment_id"
+ENROLLMENT_DELETE_MANY = "DELETE FROM \"Enrollment\" WHERE enrollment_id = ANY(%s) RETURNING enrollment_id"
 
 # Transaction queries
 TRANSACTION_INSERT = "INSERT INTO \"Transaction\" (user_id, course_id, amount) VALUES (%s, %s, %s) RETURNING transaction_id"
 TRANSACTION_SELECT_ALL = "SELECT transaction_id, user_id, course_id, amount FROM \"Transaction\""
 TRANSACTION_SELECT_BY_ID = "SELECT transaction_id, user_id, course_id, amount FROM \"Transaction\" WHERE transaction_id = %s"
-TRANSACTION_UPDATE = "UPDATE \"Transaction\" SET amount = %s WHERE transaction_id = %s"
+TRANSACTION_UPDATE = "UPDATE \"Transaction\" SET amount = COALESCE(%s, amount), updated_at = NOW()"
 TRANSACTION_DELETE = "DELETE FROM \"Transaction\" WHERE transaction_id = %s"
+TRANSACTION_INSERT_MANY = "INSERT INTO \"Transaction\" (user_id, course_id, amount) VALUES %s RETURNING transaction_id"
+TRANSACTION_DELETE_MANY = "DELETE FROM \"Transaction\" WHERE transaction_id = ANY(%s) RETURNING transaction_id"
 
 # Feature_Store queries
 FEATURE_STORE_INSERT = "INSERT INTO \"Feature_Store\" (course_id, metadata, version) VALUES (%s, %s, %s) RETURNING feature_store_id"
 FEATURE_STORE_SELECT_ALL = "SELECT feature_store_id, course_id, metadata, version FROM \"Feature_Store\""
+FEATURE_STORE_SELECT_PROJECTED = "SELECT feature_store_id, course_id, {projection}, version FROM \"Feature_Store\""
 FEATURE_STORE_SELECT_BY_ID = "SELECT feature_store_id, course_id, metadata, version FROM \"Feature_Store\" WHERE feature_store_id = %s"
-FEATURE_STORE_UPDATE = "UPDATE \"Feature_Store\" SET metadata = %s, version = %s WHERE feature_store_id = %s"
+FEATURE_STORE_SELECT_BY_ID_VERSIONED = "SELECT feature_store_id, course_id, metadata, version, updated_at FROM \"Feature_Store\" WHERE feature_store_id = %s"
+FEATURE_STORE_SELECT_VERSION = "SELECT updated_at FROM \"Feature_Store\" WHERE feature_store_id = %s"
+FEATURE_STORE_SELECT_LATEST = "SELECT DISTINCT ON (course_id) feature_store_id, course_id, metadata, version FROM \"Feature_Store\" WHERE course_id = ANY(%s) ORDER BY course_id, version DESC NULLS LAST, feature_store_id DESC"
+FEATURE_STORE_UPDATE = "UPDATE \"Feature_Store\" SET metadata = COALESCE(%s, metadata), version = COALESCE(%s, version), updated_at = NOW()"
 FEATURE_STORE_DELETE = "DELETE FROM \"Feature_Store\" WHERE feature_store_id = %s"
+FEATURE_STORE_INSERT_MANY = "INSERT INTO \"Feature_Store\" (course_id, metadata, version) VALUES %s RETURNING feature_store_id"
+FEATURE_STORE_DELETE_MANY = "DELETE FROM \"Feature_Store\" WHERE feature_store_id = ANY(%s) RETURNING feature_store_id"
 
 # Feature_Store_Audit queries
-FEATURE_STORE_AUDIT_INSERT = "INSERT INTO \"Feature_Store_Audit\" (feature_store_id, change_description) VALUES (%s, %s) RETURNING audit_id"
-FEATURE_STORE_AUDIT_SELECT_ALL = "SELECT audit_id, feature_store_id, change_description FROM \"Feature_Store_Audit\""
-FEATURE_STORE_AUDIT_SELECT_BY_ID = "SELECT audit_id, feature_store_id, change_description FROM \"Feature_Store_Audit\" WHERE audit_id = %s"
+# Rows are normally written by the Feature_Store triggers (migration 0006); the insert is for manual notes
+FEATURE_STORE_AUDIT_INSERT = "INSERT INTO \"Feature_Store_Audit\" (feature_store_id, changed_by, changes) VALUES (%s, %s, %s) RETURNING audit_id"
+FEATURE_STORE_AUDIT_SELECT_ALL = "SELECT audit_id, feature_store_id, changed_by, changes, created_at FROM \"Feature_Store_Audit\""
+FEATURE_STORE_AUDIT_SELECT_BY_ID = "SELECT audit_id, feature_store_id, changed_by, changes, created_at FROM \"Feature_Store_Audit\" WHERE audit_id = %s"
 FEATURE_STORE_AUDIT_DELETE = "DELETE FROM \"Feature_Store_Audit\" WHERE audit_id = %s"
+FEATURE_STORE_AUDIT_DELETE_MANY = "DELETE FROM \"Feature_Store_Audit\" WHERE audit_id = ANY(%s) RETURNING audit_id"
 
 # Chapter queries
+# Reads return octet_length(content) instead of the content itself: it is
+# answered from the TOAST pointer, so listing never de-TOASTs large chapters.
+# The content is fetched in ranges with CHAPTER_SELECT_CONTENT_CHUNK.
 CHAPTER_INSERT = "INSERT INTO \"Chapter\" (course_id, title, video_url, content) VALUES (%s, %s, %s, %s) RETURNING chapter_id"
-CHAPTER_SELECT_ALL = "SELECT chapter_id, course_id, title, video_url, content FROM \"Chapter\""
-CHAPTER_SELECT_BY_ID = "SELECT chapter_id, course_id, title, video_url, content FROM \"Chapter\" WHERE chapter_id = %s"
-CHAPTER_UPDATE = "UPDATE \"Chapter\" SET course_id = %s, title = %s, video_url = %s, content = %s WHERE chapter_id = %s"
-CHAPTER_DELETE = "DELETE FROM \"Chapter\" WHERE chapter_id = %s"
\ No newline at end of file
+CHAPTER_SELECT_ALL = "SELECT chapter_id, course_id, title, video_url, octet_length(content) FROM \"Chapter\""
+CHAPTER_SELECT_BY_ID = "SELECT chapter_id, course_id, title, video_url, octet_length(content) FROM \"Chapter\" WHERE chapter_id = %s"
+CHAPTER_SELECT_CONTENT_CHUNK = "SELECT substr(content, %s, %s) FROM \"Chapter\" WHERE chapter_id = %s"
+CHAPTER_UPDATE = "UPDATE \"Chapter\" SET course_id = COALESCE(%s, course_id), title = COALESCE(%s, title), video_url = COALESCE(%s, video_url), content = COALESCE(%s, content), updated_at = NOW()"
+CHAPTER_DELETE = "DELETE FROM \"Chapter\" WHERE chapter_id = %s"
+CHAPTER_INSERT_MANY = "INSERT INTO \"Chapter\" (course_id, title, video_url, content) VALUES %s RETURNING chapter_id"
+CHAPTER_DELETE_MANY = "DELETE FROM \"Chapter\" WHERE chapter_id = ANY(%s) RETURNING chapter_id"
+
+# Partition queries (monthly range partitions from migration 0009)
+PARTITION_IS_PARTITIONED = "SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(%s)"
+PARTITION_LIST = "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), GREATEST(c.reltuples, 0)::bigint, pg_total_relation_size(c.oid) FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = %s::regclass"
+PARTITION_CREATE = "SELECT create_month_partitions(%s::regclass, %s, %s)"
+# Formatted with the partition key and the quoted default partition
+PARTITION_DEFAULT_MONTHS = "SELECT DISTINCT date_trunc('month', {column}) FROM {partition}"
+
+# Report queries (materialized views from migration 0007). REPORT_REVENUE is
+# formatted with the grouping expression; report.py appends WHERE/GROUP BY.
+REPORT_REVENUE = "SELECT {key}, SUM(r.transactions), SUM(r.revenue) FROM report_course_revenue_daily r LEFT JOIN \"Course\" c ON c.course_id = r.course_id"
+REPORT_ENROLLMENT_STATS = "SELECT course_id, enrollments, completed, avg_progress FROM report_course_enrollment"
+REPORT_REFRESH_LOG = "INSERT INTO report_refreshes (view_name, duration_ms, row_count) VALUES (%s, %s, %s) ON CONFLICT (view_name) DO UPDATE SET refreshed_at = NOW(), duration_ms = EXCLUDED.duration_ms, row_count = EXCLUDED.row_count"
+REPORT_STATUS = "SELECT v.matviewname, r.refreshed_at, r.duration_ms, r.row_count, pg_total_relation_size(quote_ident(v.matviewname)::regclass) FROM pg_matviews v LEFT JOIN report_refreshes r ON r.view_name = v.matviewname WHERE v.matviewname = ANY(%s) ORDER BY v.matviewname"
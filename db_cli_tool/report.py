@@ -0,0 +1,165 @@
+import time
+import click
+from db_connection import get_connection
+from output import echo_notice
+from streaming import QueryRows, echo_rows
+from queries import REPORT_REVENUE, REPORT_ENROLLMENT_STATS, REPORT_REFRESH_LOG, REPORT_STATUS
+
+# Materialized views maintained by `report refresh` (see migration 0007)
+REPORT_VIEWS = ('report_course_revenue_daily', 'report_course_enrollment')
+
+# Fields of an enrollment-stats row for the machine-readable --format output
+ENROLLMENT_STATS_COLUMNS = ('course_id', 'enrollments', 'completed', 'average_progress')
+
+# --by value -> (grouping expression, label, ORDER BY)
+REVENUE_DIMENSIONS = {
+    'course': ('r.course_id', 'Course ID', '3 DESC, 1'),
+    'instructor': ('c.instructor_id', 'Instructor ID', '3 DESC, 1'),
+    'day': ('r.day', 'Day', '1'),
+}
+
+
+def revenue_query(by, since=None, until=None, course_id=None, status=None, limit=None):
+    """Builds the `(query, params)` rolling report_course_revenue_daily up by `by`."""
+    key, _, order = REVENUE_DIMENSIONS[by]
+    conditions, params = [], []
+    for condition, value in (("r.day >= %s", since), ("r.day < %s", until),
+                             ("r.course_id = %s", course_id), ("r.status = %s", status)):
+        if value is not None:
+            conditions.append(condition)
+            params.append(value)
+    query = REPORT_REVENUE.format(key=key)
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += f" GROUP BY 1 ORDER BY {order}"
+    if limit is not None:
+        query += " LIMIT %s"
+        params.append(limit)
+    return query, params
+
+
+def refresh_view(conn, view, concurrently=True):
+    """Refreshes one report view and logs its cost; returns `(duration_ms, row_count)`.
+
+    A concurrent refresh builds the new contents next to the old ones and
+    applies the difference, so dashboards can keep reading meanwhile; it
+    takes longer than a plain refresh, which locks out readers.
+    """
+    with conn.cursor() as cur:
+        start = time.perf_counter()
+        cur.execute(f"REFRESH MATERIALIZED VIEW {'CONCURRENTLY ' if concurrently else ''}{view}")
+        duration_ms = (time.perf_counter() - start) * 1000
+        cur.execute(f"SELECT COUNT(*) FROM {view}")
+        row_count = cur.fetchone()[0]
+        cur.execute(REPORT_REFRESH_LOG, (view, duration_ms, row_count))
+    conn.commit()
+    return duration_ms, row_count
+
+
+def add_commands(cli):
+    """Adds reporting commands to the CLI."""
+    @cli.group()
+    def report():
+        """Pre-aggregated revenue and enrollment reports."""
+        pass
+
+    @report.command()
+    @click.option('--by', type=click.Choice(list(REVENUE_DIMENSIONS)), default='course', show_default=True,
+                  help="Dimension to total the revenue by")
+    @click.option('--since', type=click.DateTime(['%Y-%m-%d']), help="Only transactions on or after this day")
+    @click.option('--until', type=click.DateTime(['%Y-%m-%d']), help="Only transactions before this day")
+    @click.option('--course-id', type=int, help="Only transactions of this course")
+    @click.option('--status', help="Only transactions with this status")
+    @click.option('--limit', type=click.IntRange(min=1), help="Maximum number of rows to return")
+    def revenue(by, since, until, course_id, status, limit):
+        """Total transactions and revenue by course, instructor or day.
+
+        Reads the report_course_revenue_daily view, so the figures are as of
+        its last `report refresh`.
+        """
+        query, params = revenue_query(by, since and since.date(), until and until.date(), course_id, status, limit)
+        label = REVENUE_DIMENSIONS[by][1]
+        columns = (label.lower().replace(' ', '_'), 'transactions', 'revenue')
+        conn = get_connection(readonly=True)
+        if conn is None:
+            return
+        try:
+            def format_row(r):
+                return f"{label}: {r[0]}, Transactions: {r[1]}, Revenue: {r[2]}"
+
+            if not echo_rows(QueryRows(conn, query, params), format_row, columns):
+                echo_notice("No transactions found.")
+        except Exception as e:
+            echo_notice(f"Error building revenue report: {e}")
+        finally:
+            conn.close()
+
+    @report.command('enrollment-stats')
+    @click.option('--course-id', type=int, help="Only this course")
+    def enrollment_stats(course_id):
+        """Enrollment count, completions and average progress per course.
+
+        Reads the report_course_enrollment view, so the figures are as of its
+        last `report refresh`. A course counts as completed at 100% progress.
+        """
+        query, params = REPORT_ENROLLMENT_STATS, []
+        if course_id is not None:
+            query += " WHERE course_id = %s"
+            params.append(course_id)
+        query += " ORDER BY course_id"
+        conn = get_connection(readonly=True)
+        if conn is None:
+            return
+        try:
+            def format_row(r):
+                return f"Course ID: {r[0]}, Enrollments: {r[1]}, Completed: {r[2]}, Average Progress: {r[3]}"
+
+            if not echo_rows(QueryRows(conn, query, params), format_row, ENROLLMENT_STATS_COLUMNS):
+                echo_notice("No enrollments found.")
+        except Exception as e:
+            echo_notice(f"Error building enrollment report: {e}")
+        finally:
+            conn.close()
+
+    @report.command()
+    @click.option('--view', 'views', multiple=True, type=click.Choice(REPORT_VIEWS),
+                  help="View to refresh (repeatable; default: all)")
+    @click.option('--blocking', is_flag=True,
+                  help="Use a plain refresh: faster, but readers wait until it finishes")
+    def refresh(views, blocking):
+        """Recompute the report views and print what each refresh cost."""
+        conn = get_connection()
+        if conn is None:
+            return
+        try:
+            for view in views or REPORT_VIEWS:
+                duration_ms, row_count = refresh_view(conn, view, concurrently=not blocking)
+                click.echo(f"Refreshed {view}: {row_count} rows in {duration_ms:.1f} ms")
+        except Exception as e:
+            conn.rollback()
+            click.echo(f"Error refreshing report views: {e}")
+        finally:
+            conn.close()
+
+    @report.command()
+    def status():
+        """Show when each report view was last refreshed, what it cost and its size."""
+        conn = get_connection(readonly=True)
+        if conn is None:
+            return
+        try:
+            with conn.cursor() as cur:
+                cur.execute(REPORT_STATUS, (list(REPORT_VIEWS),))
+                rows = cur.fetchall()
+            if not rows:
+                click.echo("No report views found; run `migrate up` first.")
+            for view, refreshed_at, duration_ms, row_count, size in rows:
+                if refreshed_at is None:
+                    click.echo(f"{view}: not refreshed by `report refresh` yet, {size // 1024} kB")
+                else:
+                    click.echo(f"{view}: refreshed {refreshed_at:%Y-%m-%d %H:%M:%S} in {duration_ms:.1f} ms, "
+                               f"{row_count} rows, {size // 1024} kB")
+        except Exception as e:
+            click.echo(f"Error reading report status: {e}")
+        finally:
+            conn.close()
@@ -0,0 +1,160 @@
+from collections import namedtuple
+import click
+from db_connection import connection, execute_prepared
+from batch import DEFAULT_PAGE_SIZE, apply_settings, delete_many, insert_many
+from cache import get_by_id, invalidate
+from listing import build_list_query, build_update
+from streaming import QueryRows
+from tables import USER, COURSE, CHAPTER, ENROLLMENT, TRANSACTION, FEATURE_STORE, FEATURE_STORE_AUDIT
+from queries import (
+    USER_SELECT_ALL, USER_SELECT_BY_ID, USER_INSERT, USER_INSERT_MANY, USER_UPDATE, USER_DELETE_MANY,
+    USER_SELECT_BY_ID_VERSIONED, USER_SELECT_VERSION,
+    COURSE_SELECT_ALL, COURSE_SELECT_BY_ID, COURSE_INSERT, COURSE_INSERT_MANY, COURSE_UPDATE, COURSE_DELETE_MANY,
+    COURSE_SELECT_BY_ID_VERSIONED, COURSE_SELECT_VERSION,
+    CHAPTER_SELECT_ALL, CHAPTER_SELECT_BY_ID, CHAPTER_INSERT, CHAPTER_INSERT_MANY, CHAPTER_UPDATE, CHAPTER_DELETE_MANY,
+    ENROLLMENT_SELECT_ALL, ENROLLMENT_SELECT_BY_ID, ENROLLMENT_INSERT, ENROLLMENT_INSERT_MANY, ENROLLMENT_UPDATE,
+    ENROLLMENT_DELETE_MANY,
+    TRANSACTION_SELECT_ALL, TRANSACTION_SELECT_BY_ID, TRANSACTION_INSERT, TRANSACTION_INSERT_MANY, TRANSACTION_UPDATE,
+    TRANSACTION_DELETE_MANY,
+    FEATURE_STORE_SELECT_ALL, FEATURE_STORE_SELECT_BY_ID, FEATURE_STORE_INSERT, FEATURE_STORE_INSERT_MANY,
+    FEATURE_STORE_UPDATE, FEATURE_STORE_DELETE_MANY, FEATURE_STORE_SELECT_BY_ID_VERSIONED, FEATURE_STORE_SELECT_VERSION,
+    FEATURE_STORE_AUDIT_SELECT_ALL, FEATURE_STORE_AUDIT_SELECT_BY_ID, FEATURE_STORE_AUDIT_INSERT,
+    FEATURE_STORE_AUDIT_DELETE_MANY,
+)
+
+# The queries.py statements the generic CRUD functions below run for a table.
+# `insert` and `insert_many` take the writable columns in the same order;
+# `update` is a COALESCE-style *_UPDATE (None when the table has no update
+# command). Tables with the versioned lookups have `get` served through
+# cache.py, and their updates and deletes invalidate it. `columns` names the
+# fields of select_all and select_by_id rows for the machine-readable
+# --format output.
+Statements = namedtuple('Statements', ['select_all', 'select_by_id', 'insert', 'insert_many', 'update',
+                                       'delete_many', 'select_by_id_versioned', 'select_version', 'columns'],
+                        defaults=[None, None, None])
+
+STATEMENTS = {
+    USER.name: Statements(USER_SELECT_ALL, USER_SELECT_BY_ID, USER_INSERT, USER_INSERT_MANY, USER_UPDATE,
+                          USER_DELETE_MANY, USER_SELECT_BY_ID_VERSIONED, USER_SELECT_VERSION,
+                          columns=('user_id', 'name', 'email', 'role')),
+    COURSE.name: Statements(COURSE_SELECT_ALL, COURSE_SELECT_BY_ID, COURSE_INSERT, COURSE_INSERT_MANY, COURSE_UPDATE,
+                            COURSE_DELETE_MANY, COURSE_SELECT_BY_ID_VERSIONED, COURSE_SELECT_VERSION,
+                            columns=('course_id', 'title', 'instructor_id', 'description', 'price')),
+    CHAPTER.name: Statements(CHAPTER_SELECT_ALL, CHAPTER_SELECT_BY_ID, CHAPTER_INSERT, CHAPTER_INSERT_MANY,
+                             CHAPTER_UPDATE, CHAPTER_DELETE_MANY,
+                             columns=('chapter_id', 'course_id', 'title', 'video_url', 'content_bytes')),
+    ENROLLMENT.name: Statements(ENROLLMENT_SELECT_ALL, ENROLLMENT_SELECT_BY_ID, ENROLLMENT_INSERT,
+                                ENROLLMENT_INSERT_MANY, ENROLLMENT_UPDATE, ENROLLMENT_DELETE_MANY,
+                                columns=('enrollment_id', 'user_id', 'course_id')),
+    TRANSACTION.name: Statements(TRANSACTION_SELECT_ALL, TRANSACTION_SELECT_BY_ID, TRANSACTION_INSERT,
+                                 TRANSACTION_INSERT_MANY, TRANSACTION_UPDATE, TRANSACTION_DELETE_MANY,
+                                 columns=('transaction_id', 'user_id', 'course_id', 'amount')),
+    FEATURE_STORE.name: Statements(FEATURE_STORE_SELECT_ALL, FEATURE_STORE_SELECT_BY_ID, FEATURE_STORE_INSERT,
+                                   FEATURE_STORE_INSERT_MANY, FEATURE_STORE_UPDATE, FEATURE_STORE_DELETE_MANY,
+                                   FEATURE_STORE_SELECT_BY_ID_VERSIONED, FEATURE_STORE_SELECT_VERSION,
+                                   columns=('feature_store_id', 'course_id', 'metadata', 'version')),
+    FEATURE_STORE_AUDIT.name: Statements(FEATURE_STORE_AUDIT_SELECT_ALL, FEATURE_STORE_AUDIT_SELECT_BY_ID,
+                                         FEATURE_STORE_AUDIT_INSERT, None, None, FEATURE_STORE_AUDIT_DELETE_MANY,
+                                         columns=('audit_id', 'feature_store_id', 'changed_by', 'changes',
+                                                  'created_at')),
+}
+
+
+def statements(table):
+    """Returns the Statements of `table`."""
+    return STATEMENTS[table.name]
+
+
+def _cached(table):
+    return statements(table).select_by_id_versioned is not None
+
+
+def get(table, id):
+    """Fetches one row by primary key, or None; through the cache for cached tables."""
+    st = statements(table)
+    if st.select_by_id_versioned is not None:
+        return get_by_id(table, st.select_by_id_versioned, st.select_version, id)
+    with connection(readonly=True) as conn:
+        with conn.cursor() as cur:
+            execute_prepared(cur, st.select_by_id, (id,))
+            return cur.fetchone()
+
+
+def list_rows(conn, table, filters, after_id=None, order_by=None, desc=False, limit=None, itersize=None,
+              base_query=None, base_params=()):
+    """Returns the QueryRows a list command selects (see listing.build_list_query).
+
+    They are streamed once iterated. `base_query` replaces the table's
+    `*_SELECT_ALL`, e.g. for a projection, and `base_params` are the values
+    of its placeholders. Ordering by another column than the key, the
+    `after_id` row's value of that column is read first; a UsageError is
+    raised if the row no longer exists, rather than listing nothing.
+    """
+    after_value = None
+    if after_id is not None and order_by not in (None, table.pk):
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT {order_by} FROM {table.name} WHERE {table.pk} = %s", (after_id,))
+            row = cur.fetchone()
+        if row is None:
+            raise click.UsageError(f"No {table.name} row with {table.pk} {after_id} to resume after; "
+                                   f"it may have been deleted since the last page.")
+        after_value = row[0]
+    query, params = build_list_query(table, base_query or statements(table).select_all, filters,
+                                     after_id, order_by, desc, limit, after_value)
+    return QueryRows(conn, query, list(base_params) + params, itersize)
+
+
+def create(conn, table, rows, page_size=DEFAULT_PAGE_SIZE, settings=None):
+    """Inserts rows and yields the new IDs of each committed page.
+
+    A single row goes through the table's prepared `*_INSERT`; more rows
+    are sent in pages with `*_INSERT_MANY` (see batch.insert_many).
+    `settings` are applied to each transaction (see batch.apply_settings).
+    """
+    st = statements(table)
+    if len(rows) == 1 or st.insert_many is None:
+        for row in rows:
+            with conn.cursor() as cur:
+                apply_settings(cur, settings)
+                execute_prepared(cur, st.insert, row)
+                id = cur.fetchone()[0]
+            conn.commit()
+            yield [id]
+        return
+    yield from insert_many(conn, st.insert_many, rows, page_size, settings)
+
+
+def update_statement(table, values, ids=None, where=()):
+    """Builds the `(query, params)` applying `values` (None keeps a column) to the selected rows.
+
+    Rows are selected by primary key, by `--where` pairs, or both (see
+    listing.build_update); raises a UsageError when nothing is selected,
+    so commands call it before connecting.
+    """
+    return build_update(table, statements(table).update, values, ids, where)
+
+
+def update(conn, table, statement, settings=None):
+    """Runs an update_statement() as a prepared statement, commits and returns the updated IDs.
+
+    The statement text only depends on the table, on whether one or many
+    IDs are given and on the `--where` columns, so it is prepared once per
+    connection and combination.
+    """
+    query, params = statement
+    with conn.cursor() as cur:
+        apply_settings(cur, settings)
+        execute_prepared(cur, query, params)
+        updated = [row[0] for row in cur.fetchall()]
+    conn.commit()
+    if _cached(table):
+        invalidate(table, updated)
+    return updated
+
+
+def delete(conn, table, ids, page_size=DEFAULT_PAGE_SIZE, settings=None):
+    """Deletes rows by primary key and yields the IDs deleted in each committed page."""
+    for deleted in delete_many(conn, statements(table).delete_many, ids, page_size, settings):
+        if _cached(table):
+            invalidate(table, deleted)
+        yield deleted
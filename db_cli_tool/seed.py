@@ -0,0 +1,356 @@
+import io
+import operator
+import os
+import time
+import zlib
+from collections import namedtuple
+from functools import reduce
+import click
+from datetime import datetime, timedelta
+from db_connection import DB_PARAMS, get_connection
+from partition import create_partitions
+from tables import TRANSACTION
+
+# Rows per table at --scale 1; `seed --scale 1000` makes a million users
+SCALE_ROWS = {
+    'User': 1000,
+    'Course': 50,
+    'Chapter': 500,
+    'Enrollment': 5000,
+    'Transaction': 10000,
+    'Feature_Store': 250,
+}
+# Rows generated and copied per batch (and per worker task)
+DEFAULT_SEED_BATCH_ROWS = 100_000
+INSTRUCTOR_SHARE = 20       # one user in this many is an instructor
+FEATURE_VERSIONS = 5        # Feature_Store versions per course
+SEED_EPOCH = '2024-01-01T00:00:00'
+SEED_SPAN_SECONDS = 365 * 24 * 3600   # transactions are spread over a year, in ID order
+
+FIRST_NAMES = ('Ada', 'Alan', 'Grace', 'Linus', 'Barbara', 'Edsger', 'Margaret', 'Dennis', 'Frances', 'Ken')
+LAST_NAMES = ('Lovelace', 'Turing', 'Hopper', 'Torvalds', 'Liskov', 'Dijkstra', 'Hamilton', 'Ritchie', 'Allen', 'Thompson')
+SUBJECTS = ('Python', 'SQL', 'Statistics', 'Linear Algebra', 'Web Development', 'Machine Learning', 'Networking')
+LEVELS = ('101', 'Fundamentals', 'in Practice', 'Advanced', 'Bootcamp')
+PARAGRAPHS = tuple('Lorem ipsum dolor sit amet, consectetur adipiscing elit. ' * n for n in (4, 16, 64, 256))
+
+# Tables in load order, with the columns each generator returns
+SEED_TABLES = (
+    ('User', 'user_id', ('user_id', 'name', 'email', 'role')),
+    ('Course', 'course_id', ('course_id', 'instructor_id', 'title', 'description', 'price')),
+    ('Chapter', 'chapter_id', ('chapter_id', 'course_id', 'title', 'video_url', 'content')),
+    ('Enrollment', 'enrollment_id', ('enrollment_id', 'user_id', 'course_id', 'progress', 'status')),
+    ('Transaction', 'transaction_id', ('transaction_id', 'user_id', 'course_id', 'amount', 'status', 'created_at')),
+    ('Feature_Store', 'feature_store_id', ('feature_store_id', 'course_id', 'metadata', 'version')),
+)
+
+# Row counts and first IDs of a seeded data set; every generated foreign key
+# is computed from these, so no lookups are needed while generating
+Layout = namedtuple('Layout', ['counts', 'starts', 'seed'])
+
+NUMPY_MISSING = "vectorized generation requires numpy (pip install numpy)"
+
+
+def row_counts(scale):
+    counts = {table: max(int(rows * scale), 1) for table, rows in SCALE_ROWS.items()}
+    # Tiny scales: there can't be more enrollments than (user, course) pairs
+    counts['Enrollment'] = min(counts['Enrollment'], counts['User'] * counts['Course'])
+    return counts
+
+
+class NumpyBackend:
+    """Generates whole columns at once with NumPy.
+
+    `seed` is a list of non-negative integers identifying the batch.
+    """
+
+    name = 'numpy'
+
+    def __init__(self, seed):
+        import numpy
+        self.np = numpy
+        self.rng = numpy.random.Generator(numpy.random.PCG64(seed))
+
+    def arange(self, start, n):
+        return self.np.arange(start, start + n, dtype=self.np.int64)
+
+    def integers(self, low, high, n):
+        return self.rng.integers(low, high, n, dtype=self.np.int64)
+
+    def choice(self, values, n, weights=None):
+        # Object arrays share the Python strings instead of copying them into fixed-width cells
+        return self.np.asarray(values, dtype=object)[self.rng.choice(len(values), n, p=weights)]
+
+    def where_below(self, column, threshold, below, other):
+        return self.np.where(column < threshold, below, other)
+
+    def affine(self, column, multiplier, offset, modulus=None):
+        result = column * multiplier + offset
+        return result if modulus is None else result % modulus
+
+    def divmod(self, column, divisor):
+        return self.np.divmod(column, divisor)
+
+    def cents(self, column):
+        # Formatting the Python floats is several times faster than numpy.char.mod
+        return self.np.fromiter((f"{v:.2f}" for v in (column / 100).tolist()), dtype=object, count=len(column))
+
+    def timestamps(self, seconds):
+        return (self.np.datetime64(SEED_EPOCH) + seconds.astype('timedelta64[s]')).astype(str)
+
+    def concat(self, *parts):
+        return reduce(operator.add, (p if isinstance(p, str) else self._strings(p) for p in parts))
+
+    def text(self, column):
+        return self._strings(column).tolist()
+
+    def _strings(self, column):
+        column = self.np.asarray(column)
+        if column.dtype == object:
+            return column
+        if column.dtype.kind in 'iu':
+            return self.np.fromiter(map(str, column.tolist()), dtype=object, count=len(column))
+        return column.astype(object)
+
+
+class PythonBackend:
+    """Same columns as NumpyBackend, one value at a time with the random module."""
+
+    name = 'python'
+
+    def __init__(self, seed):
+        import random
+        self.rng = random.Random(repr(seed))
+
+    def arange(self, start, n):
+        return list(range(start, start + n))
+
+    def integers(self, low, high, n):
+        randrange = self.rng.randrange
+        return [randrange(low, high) for _ in range(n)]
+
+    def choice(self, values, n, weights=None):
+        return self.rng.choices(values, weights, k=n)
+
+    def where_below(self, column, threshold, below, other):
+        return [below if v < threshold else other for v in column]
+
+    def affine(self, column, multiplier, offset, modulus=None):
+        if modulus is None:
+            return [v * multiplier + offset for v in column]
+        return [(v * multiplier + offset) % modulus for v in column]
+
+    def divmod(self, column, divisor):
+        pairs = [divmod(v, divisor) for v in column]
+        return [q for q, _ in pairs], [r for _, r in pairs]
+
+    def cents(self, column):
+        return [f"{v / 100:.2f}" for v in column]
+
+    def timestamps(self, seconds):
+        epoch = datetime.fromisoformat(SEED_EPOCH)
+        return [(epoch + timedelta(seconds=int(v))).isoformat() for v in seconds]
+
+    def concat(self, *parts):
+        n = next(len(p) for p in parts if not isinstance(p, str))
+        columns = [[p] * n if isinstance(p, str) else list(map(str, p)) for p in parts]
+        return [''.join(values) for values in zip(*columns)]
+
+    def text(self, column):
+        return list(map(str, column))
+
+
+def _backend(name, seed=(0,)):
+    if name == 'python':
+        return PythonBackend(seed)
+    try:
+        return NumpyBackend(seed)
+    except ImportError:
+        if name == 'numpy':
+            raise click.ClickException(NUMPY_MISSING)
+        return PythonBackend(seed)
+
+
+def _enrollment_permutation(layout):
+    """Returns `(multiplier, offset, modulus)` of a bijection on the (user, course) pair indexes.
+
+    Enrollment i gets pair `(multiplier * i + offset) % modulus`; with the
+    multiplier coprime to the modulus no two enrollments share a pair, which
+    keeps UNIQUE (user_id, course_id) without remembering what was drawn.
+    """
+    from math import gcd
+    modulus = layout.counts['User'] * layout.counts['Course']
+    multiplier = 1_000_003
+    while gcd(multiplier, modulus) != 1:
+        multiplier += 2
+    return multiplier % modulus or 1, zlib.crc32(str(layout.seed).encode()) % modulus, modulus
+
+
+def enrollment_pair(layout, i):
+    """The (user_id, course_id) that seeded enrollment number `i` (0-based) belongs to."""
+    multiplier, offset, modulus = _enrollment_permutation(layout)
+    course, user = divmod((multiplier * i + offset) % modulus, layout.counts['User'])
+    return layout.starts['User'] + user, layout.starts['Course'] + course
+
+
+def generate(table, layout, first, n, backend):
+    """Generates rows `first` .. `first + n - 1` of `table` as a list of text columns."""
+    b, counts, starts = backend, layout.counts, layout.starts
+    index = b.arange(first, n)
+    ids = b.affine(index, 1, starts[table])
+    users, courses = counts['User'], counts['Course']
+    instructors = max(users // INSTRUCTOR_SHARE, 1)
+    if table == 'User':
+        return [ids, b.concat(b.choice(FIRST_NAMES, n), ' ', b.choice(LAST_NAMES, n)),
+                b.concat('user', ids, '@example.invalid'),
+                b.where_below(index, instructors, 'instructor', 'student')]
+    if table == 'Course':
+        return [ids, b.affine(b.integers(0, instructors, n), 1, starts['User']),
+                b.concat(b.choice(SUBJECTS, n), ' ', b.choice(LEVELS, n)),
+                b.concat('Synthetic course ', ids), b.cents(b.integers(0, 20000, n))]
+    if table == 'Chapter':
+        number, course = b.divmod(index, courses)
+        return [ids, b.affine(course, 1, starts['Course']), b.concat('Chapter ', b.affine(number, 1, 1)),
+                b.concat('https://video.example.invalid/', ids), b.choice(PARAGRAPHS, n)]
+    if table == 'Enrollment':
+        multiplier, offset, modulus = _enrollment_permutation(layout)
+        course, user = b.divmod(b.affine(index, multiplier, offset, modulus), users)
+        return [ids, b.affine(user, 1, starts['User']), b.affine(course, 1, starts['Course']),
+                b.cents(b.integers(0, 10001, n)),
+                b.choice(('active', 'completed', 'dropped'), n, [0.7, 0.2, 0.1])]
+    if table == 'Transaction':
+        step = max(SEED_SPAN_SECONDS // counts['Transaction'], 1)
+        return [ids, b.affine(b.integers(0, users, n), 1, starts['User']),
+                b.affine(b.integers(0, courses, n), 1, starts['Course']),
+                b.cents(b.integers(499, 20000, n)),
+                b.choice(('completed', 'refunded', 'failed'), n, [0.9, 0.07, 0.03]),
+                b.timestamps(b.affine(index, step, 0))]
+    if table == 'Feature_Store':
+        course, version = b.divmod(index, FEATURE_VERSIONS)
+        return [ids, b.affine(b.affine(course, 1, 0, courses), 1, starts['Course']),
+                b.concat('{"lang": "', b.choice(('en', 'de', 'fr', 'es'), n), '", "model": {"name": "m',
+                         ids, '", "layers": [', b.integers(1, 64, n), ', ', b.integers(1, 64, n), ']}}'),
+                b.affine(version, 1, 1)]
+    raise ValueError(f"unknown table {table}")
+
+
+def _copy_data(backend, columns):
+    # Generated values never contain tabs, newlines or backslashes, so no COPY escaping is needed
+    return io.StringIO(''.join('\t'.join(row) + '\n' for row in zip(*(backend.text(c) for c in columns))))
+
+
+def load_batch(params, table, columns, layout, first, n, backend_name):
+    """Generates one batch and streams it in with COPY on its own connection.
+
+    The batch's random stream depends only on the seed, the table and
+    `first`, so the data doesn't change with the number of workers.
+    Returns `(table, rows, seconds)`.
+    """
+    import psycopg2
+    start = time.perf_counter()
+    backend = _backend(backend_name, [layout.seed, zlib.crc32(table.encode()), first])
+    data = _copy_data(backend, generate(table, layout, first, n, backend))
+    conn = psycopg2.connect(**params)
+    try:
+        with conn.cursor() as cur:
+            cur.copy_expert(f'COPY "{table}" ({", ".join(columns)}) FROM STDIN', data)
+        conn.commit()
+    finally:
+        conn.close()
+    return table, n, time.perf_counter() - start
+
+
+def reserve_ids(conn, table, pk, n):
+    """Advances the table's ID sequence by `n` and returns the first reserved ID."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT setval(pg_get_serial_sequence(%s, %s), nextval(pg_get_serial_sequence(%s, %s)) + %s - 1)",
+                    (f'"{table}"', pk, f'"{table}"', pk, n))
+        end = cur.fetchone()[0]
+    conn.commit()
+    return end - n + 1
+
+
+def seed_database(conn, scale=1, seed=0, workers=1, batch_rows=DEFAULT_SEED_BATCH_ROWS, backend='auto',
+                  params=None, progress=None):
+    """Loads synthetic LMS data at `scale` and returns its Layout.
+
+    IDs are reserved from each table's sequence up front, so foreign keys
+    are computed rather than looked up and the data can be added to a
+    database that already has rows. Users and courses are loaded first;
+    the child tables are then loaded together, split into batches of
+    `batch_rows` that run on `workers` processes, each with its own
+    connection. `progress(table, rows, seconds)` is called per batch.
+    """
+    params = params or DB_PARAMS
+    backend = _backend(backend).name
+    counts = row_counts(scale)
+    starts = {table: reserve_ids(conn, table, pk, counts[table]) for table, pk, _ in SEED_TABLES}
+    layout = Layout(counts, starts, seed)
+    # Monthly partitions for the generated transactions, rather than the default partition
+    epoch = datetime.fromisoformat(SEED_EPOCH)
+    create_partitions(conn, TRANSACTION, epoch, epoch + timedelta(seconds=SEED_SPAN_SECONDS))
+    phases = [SEED_TABLES[:1], SEED_TABLES[1:2], SEED_TABLES[2:]]
+    executor = None
+    if workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        executor = ProcessPoolExecutor(workers)
+    try:
+        for phase in phases:
+            tasks = [(params, table, columns, layout, first, min(batch_rows, counts[table] - first), backend)
+                     for table, _, columns in phase for first in range(0, counts[table], batch_rows)]
+            if executor is None:
+                results = (load_batch(*task) for task in tasks)
+            else:
+                results = executor.map(load_batch, *zip(*tasks))
+            for result in results:
+                if progress:
+                    progress(*result)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    with conn.cursor() as cur:
+        cur.execute("ANALYZE")
+    conn.commit()
+    return layout
+
+
+def add_commands(cli):
+    """Adds the synthetic data generator to the CLI."""
+    @cli.command()
+    @click.option('--scale', type=click.FloatRange(min=0, min_open=True), default=1, show_default=True,
+                  help="Data size; 1 is 1000 users, 50 courses and 10000 transactions")
+    @click.option('--seed', 'seed_value', type=click.IntRange(min=0), default=0, show_default=True,
+                  help="Random seed; the same seed, scale and batch size give the same data")
+    @click.option('--workers', type=click.IntRange(min=1), default=os.cpu_count() or 1, show_default=True,
+                  help="Processes generating and copying batches in parallel")
+    @click.option('--batch-rows', type=click.IntRange(min=1), default=DEFAULT_SEED_BATCH_ROWS, show_default=True,
+                  help="Rows generated and copied per batch")
+    @click.option('--backend', type=click.Choice(['auto', 'numpy', 'python']), default='auto', show_default=True,
+                  help="Column generator: numpy (vectorized) or python; auto uses numpy when installed")
+    def seed(scale, seed_value, workers, batch_rows, backend):
+        """Load synthetic users, courses, chapters, enrollments, transactions and feature versions.
+
+        Foreign keys always point at generated rows and enrollments never
+        repeat a (user, course) pair. Rows are streamed in with COPY.
+        """
+        conn = get_connection()
+        if conn is None:
+            return
+        totals = {}
+
+        def progress(table, rows, seconds):
+            totals[table] = totals.get(table, 0) + rows
+
+        try:
+            start = time.perf_counter()
+            layout = seed_database(conn, scale, seed_value, workers, batch_rows, backend, progress=progress)
+            elapsed = time.perf_counter() - start
+            for table, _, _ in SEED_TABLES:
+                first = layout.starts[table]
+                click.echo(f"{table}: {layout.counts[table]} rows (IDs {first}-{first + layout.counts[table] - 1})")
+            total = sum(totals.values())
+            click.echo(click.style(f"Seeded {total} rows in {elapsed:.2f}s ({total / elapsed:.0f} rows/s)", fg='green'))
+        except Exception as e:
+            conn.rollback()
+            click.echo(f"Error seeding data: {e}")
+        finally:
+            conn.close()
@@ -0,0 +1,63 @@
+import itertools
+import click
+from output import current_format, copy_rows, write_rows
+
+# Rows fetched from the server per round trip by a named cursor
+DEFAULT_ITERSIZE = 2000
+# Formatted lines written to the terminal per click.echo call
+ECHO_BATCH_SIZE = 500
+
+itersize_option = click.option(
+    '--itersize', type=click.IntRange(min=1), default=DEFAULT_ITERSIZE, show_default=True,
+    help="Rows fetched from the server per round trip")
+
+
+def iter_rows(conn, query, params=None, itersize=DEFAULT_ITERSIZE, name='stream'):
+    """Yields rows from a server-side (named) cursor, `itersize` rows at a time.
+
+    Only one batch of rows is held in client memory, so the first rows are
+    available as soon as the server produces them, however large the table.
+    """
+    with conn.cursor(name=name) as cur:
+        cur.itersize = itersize
+        cur.execute(query, params)
+        for row in cur:
+            yield row
+
+
+class QueryRows:
+    """The rows of `query`, streamed through iter_rows when iterated.
+
+    echo_rows copies them straight to stdout in the machine-readable
+    formats instead (see output.copy_rows).
+    """
+
+    def __init__(self, conn, query, params=None, itersize=DEFAULT_ITERSIZE):
+        self.conn = conn
+        self.query = query
+        self.params = params
+        self.itersize = itersize
+
+    def __iter__(self):
+        return iter_rows(self.conn, self.query, self.params, itersize=self.itersize)
+
+
+def echo_rows(rows, format_row, columns=None, batch_size=ECHO_BATCH_SIZE):
+    """Writes formatted rows in buffered batches and returns how many were written.
+
+    With a machine-readable --format the rows are written as `columns`
+    records instead of through `format_row`: QueryRows by output.copy_rows,
+    anything else by output.write_rows.
+    """
+    if current_format() != 'table':
+        if isinstance(rows, QueryRows):
+            return copy_rows(rows.conn, rows.query, rows.params, columns)
+        return write_rows(rows, columns)
+    rows = iter(rows)
+    count = 0
+    while True:
+        batch = [format_row(row) for row in itertools.islice(rows, batch_size)]
+        if not batch:
+            return count
+        click.echo('\n'.join(batch))
+        count += len(batch)
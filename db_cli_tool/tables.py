@@ -0,0 +1,146 @@
+import json
+from collections import namedtuple
+import click
+
+# A per-column filter exposed as a CLI option on list-style commands.
+# `condition` is a SQL fragment with a single %s placeholder for the value.
+Filter = namedtuple('Filter', ['option', 'param', 'condition', 'type', 'help'])
+
+# A writable column; `type` is one of 'int', 'decimal', 'text' or 'json'.
+Column = namedtuple('Column', ['name', 'type', 'required'], defaults=[False])
+
+# Describes a table for the generic list/filter/import machinery.
+# `order_columns` must be NOT NULL so keyset comparisons stay well defined.
+# `conflict` is the unique key that upserts match on; `timestamps` are the
+# server-maintained columns that are exported alongside the writable ones.
+# `partition_key` is the column a range-partitioned table is split on
+# (see partition.py).
+Table = namedtuple('Table', ['name', 'pk', 'columns', 'order_columns', 'filters', 'conflict', 'timestamps',
+                             'partition_key'],
+                   defaults=[('created_at', 'updated_at'), None])
+
+
+def column_types(table):
+    """Maps every readable column of `table` to its type."""
+    types = {c.name: c.type for c in table.columns}
+    types.update((name, 'timestamp') for name in table.timestamps)
+    return types
+
+
+class JsonDocument(click.ParamType):
+    """A JSON document given on the command line, passed on as JSON text."""
+
+    name = 'json'
+
+    def convert(self, value, param, ctx):
+        try:
+            json.loads(value)
+        except ValueError as e:
+            self.fail(f"{value!r} is not valid JSON: {e}", param, ctx)
+        return value
+
+
+JSON_DOCUMENT = JsonDocument()
+
+
+def json_column(table):
+    """Returns the name of the table's JSON column, or None if it has none."""
+    return next((c.name for c in table.columns if c.type == 'json'), None)
+
+
+def _since(column='created_at'):
+    return Filter('--since', 'since', f"{column} >= %s", click.DateTime(), "Only rows created at or after this time")
+
+
+def _until(column='created_at'):
+    return Filter('--until', 'until', f"{column} < %s", click.DateTime(), "Only rows created before this time")
+
+
+def _contains(column):
+    # jsonb @> can use a jsonb_path_ops GIN index on the column
+    return Filter('--where-json', 'where_json', f"{column} @> %s::jsonb", JSON_DOCUMENT,
+                  f"Only rows whose {column} contains this JSON document, e.g. '{{\"lang\": \"en\"}}'")
+
+
+USER = Table('"User"', 'user_id', [
+    Column('user_id', 'int'),
+    Column('name', 'text', True),
+    Column('email', 'text', True),
+    Column('role', 'text', True),
+], ['user_id', 'name', 'email', 'created_at'], [
+    Filter('--role', 'role', "role = %s", str, "Only users with this role"),
+    Filter('--email', 'email', "email = %s", str, "Only the user with this email"),
+], ['email'])
+
+COURSE = Table('"Course"', 'course_id', [
+    Column('course_id', 'int'),
+    Column('instructor_id', 'int'),
+    Column('title', 'text', True),
+    Column('description', 'text'),
+    Column('price', 'decimal'),
+], ['course_id', 'title', 'created_at'], [
+    Filter('--instructor-id', 'instructor_id', "instructor_id = %s", int, "Only courses taught by this instructor"),
+    Filter('--min-price', 'min_price', "price >= %s", float, "Only courses priced at or above this amount"),
+    Filter('--max-price', 'max_price', "price <= %s", float, "Only courses priced at or below this amount"),
+], ['course_id'])
+
+CHAPTER = Table('"Chapter"', 'chapter_id', [
+    Column('chapter_id', 'int'),
+    Column('course_id', 'int', True),
+    Column('title', 'text', True),
+    Column('video_url', 'text'),
+    Column('content', 'text'),
+], ['chapter_id', 'title', 'created_at'], [
+    Filter('--course-id', 'course_id', "course_id = %s", int, "Only chapters of this course"),
+], ['chapter_id'])
+
+ENROLLMENT = Table('"Enrollment"', 'enrollment_id', [
+    Column('enrollment_id', 'int'),
+    Column('user_id', 'int', True),
+    Column('course_id', 'int', True),
+    Column('progress', 'decimal'),
+    Column('status', 'text'),
+], ['enrollment_id', 'created_at'], [
+    Filter('--user-id', 'user_id', "user_id = %s", int, "Only enrollments of this user"),
+    Filter('--course-id', 'course_id', "course_id = %s", int, "Only enrollments in this course"),
+    Filter('--status', 'status', "status = %s", str, "Only enrollments with this status"),
+    _since(),
+    _until(),
+], ['user_id', 'course_id'])
+
+TRANSACTION = Table('"Transaction"', 'transaction_id', [
+    Column('transaction_id', 'int'),
+    Column('user_id', 'int', True),
+    Column('course_id', 'int', True),
+    Column('amount', 'decimal'),
+    Column('status', 'text'),
+], ['transaction_id', 'created_at'], [
+    Filter('--user-id', 'user_id', "user_id = %s", int, "Only transactions of this user"),
+    Filter('--course-id', 'course_id', "course_id = %s", int, "Only transactions for this course"),
+    Filter('--status', 'status', "status = %s", str, "Only transactions with this status"),
+    _since(),
+    _until(),
+], ['transaction_id'], partition_key='created_at')
+
+FEATURE_STORE = Table('"Feature_Store"', 'feature_store_id', [
+    Column('feature_store_id', 'int'),
+    Column('course_id', 'int', True),
+    Column('metadata', 'json'),
+    Column('version', 'int'),
+], ['feature_store_id', 'created_at'], [
+    Filter('--course-id', 'course_id', "course_id = %s", int, "Only entries for this course"),
+    Filter('--version', 'version', "version = %s", int, "Only entries with this version"),
+    _contains('metadata'),
+], ['feature_store_id'])
+
+FEATURE_STORE_AUDIT = Table('"Feature_Store_Audit"', 'audit_id', [
+    Column('audit_id', 'int'),
+    Column('feature_store_id', 'int', True),
+    Column('changed_by', 'int'),
+    Column('changes', 'json'),
+], ['audit_id', 'created_at'], [
+    Filter('--feature-store-id', 'feature_store_id', "feature_store_id = %s", int, "Only audit entries of this feature_store entry"),
+    Filter('--changed-by', 'changed_by', "changed_by = %s", int, "Only changes made by this user"),
+    _since(),
+    _until(),
+], ['audit_id'], ('created_at',), 'created_at')
@@ -0,0 +1,35 @@
+import os
+import sys
+import pytest
+
+# The tool's modules import each other by bare name, as when run as db_tool.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# libpq connection string of a PostgreSQL server for the `needs_db` tests.
+# They only run temporary queries, so any database will do.
+TEST_DSN = os.environ.get('DB_TOOL_TEST_DSN')
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', "needs_db: needs a PostgreSQL server given by DB_TOOL_TEST_DSN")
+
+
+def pytest_collection_modifyitems(config, items):
+    if TEST_DSN:
+        return
+    skip = pytest.mark.skip(reason="set DB_TOOL_TEST_DSN to run tests against PostgreSQL")
+    for item in items:
+        if 'needs_db' in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture
+def pg_conn():
+    """A connection to DB_TOOL_TEST_DSN, rolled back and closed after the test."""
+    import psycopg2
+    conn = psycopg2.connect(TEST_DSN)
+    try:
+        yield conn
+    finally:
+        conn.rollback()
+        conn.close()
@@ -0,0 +1,31 @@
+import pytest
+from bench_suite import percentile, compare
+
+
+@pytest.mark.parametrize('pct, expected', [(0, 1), (50, 5), (90, 9), (95, 10), (99, 10), (100, 10)])
+def test_percentile_nearest_rank(pct, expected):
+    assert percentile(list(range(1, 11)), pct) == expected
+
+
+def test_percentile_of_one_value():
+    assert percentile([3.5], 50) == 3.5
+
+
+def _result(name, p50_ms, calls=100, throughput=0.0):
+    return {'name': name, 'p50_ms': p50_ms, 'calls': calls, 'throughput_per_s': throughput}
+
+
+def test_compare_single_call_by_p50():
+    rows = compare([_result('user get', 1.5)], {'results': [_result('user get', 1.0)]})
+    assert rows == [('user get', 1.0, 1.5, pytest.approx(0.5))]
+
+
+def test_compare_bulk_by_throughput():
+    rows = compare([_result('export', 100.0, calls=1, throughput=2000.0)],
+                   {'results': [_result('export', 120.0, calls=1, throughput=1000.0)]})
+    assert rows == [('export', 120.0, 100.0, pytest.approx(-0.5))]
+
+
+def test_compare_skips_new_and_zero_baselines():
+    rows = compare([_result('new', 1.0), _result('zero', 1.0)], {'results': [_result('zero', 0.0)]})
+    assert rows == []
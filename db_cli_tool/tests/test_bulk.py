@@ -0,0 +1,51 @@
+import pytest
+from bulk import _copy_text, _upsert_sql, convert_record
+from tables import FEATURE_STORE, TRANSACTION, USER
+
+SOURCE = "SELECT * FROM import_stage"
+
+
+def test_upsert_on_conflict_updates_other_columns():
+    assert _upsert_sql(USER, ['name', 'email', 'role'], SOURCE) == (
+        f"INSERT INTO \"User\" (name, email, role) {SOURCE} ON CONFLICT (email) "
+        f"DO UPDATE SET name = EXCLUDED.name, role = EXCLUDED.role")
+
+
+def test_upsert_of_key_only_does_nothing():
+    assert _upsert_sql(USER, ['email'], SOURCE).endswith("ON CONFLICT (email) DO NOTHING")
+
+
+def test_upsert_of_partitioned_table_uses_typed_merge():
+    sql = _upsert_sql(TRANSACTION, ['transaction_id', 'amount'], SOURCE)
+    assert sql == (
+        "MERGE INTO \"Transaction\" t USING (SELECT v.transaction_id::int, v.amount::numeric "
+        f"FROM ({SOURCE}) AS v (transaction_id, amount)) AS s (transaction_id, amount) "
+        "ON t.transaction_id = s.transaction_id WHEN MATCHED THEN UPDATE SET amount = s.amount "
+        "WHEN NOT MATCHED THEN INSERT (transaction_id, amount) VALUES (s.transaction_id, s.amount)")
+
+
+def test_convert_record_as_text_in_column_order():
+    record = {'version': 3.0, 'metadata': {'lang': 'en'}, 'course_id': '7'}
+    assert convert_record(record, FEATURE_STORE.columns, False) == [None, '7', '{"lang": "en"}', '3']
+
+
+def test_convert_record_empty_is_null():
+    assert convert_record({'course_id': 1, 'version': ''}, FEATURE_STORE.columns, True)[3] is None
+    with pytest.raises(ValueError, match="course_id is required"):
+        convert_record({'course_id': ''}, FEATURE_STORE.columns, True)
+
+
+@pytest.mark.parametrize('value', [1.7, True, '1.5', 'x', float('nan')])
+def test_convert_record_rejects_non_integers(value):
+    with pytest.raises(ValueError, match="invalid int for course_id"):
+        convert_record({'course_id': value}, FEATURE_STORE.columns, False)
+
+
+def test_convert_record_rejects_unknown_fields():
+    with pytest.raises(ValueError, match="unexpected field"):
+        convert_record({'course_id': 1, 'colour': 'red'}, FEATURE_STORE.columns, False)
+
+
+def test_copy_text_escapes():
+    assert _copy_text(None) == '\\N'
+    assert _copy_text('a\\b\tc\nd\re') == 'a\\\\b\\tc\\nd\\re'
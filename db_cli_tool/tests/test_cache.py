@@ -0,0 +1,101 @@
+from contextlib import contextmanager
+import pytest
+import cache
+from cache import Entry, MemoryCache, ReadThroughCache
+from tables import USER
+
+
+def test_memory_cache_evicts_least_recently_used():
+    lru = MemoryCache(max_entries=2)
+    lru.put('a', 1)
+    lru.put('b', 2)
+    assert lru.get('a') == 1
+    lru.put('c', 3)
+    assert (lru.get('a'), lru.get('b'), lru.get('c')) == (1, None, 3)
+
+
+def test_memory_cache_discard():
+    lru = MemoryCache()
+    for key in [('ns', 'T', 1), ('ns', 'T', 2), ('ns', 'U', 1), ('other', 'T', 1)]:
+        lru.put(key, key)
+    lru.discard([('ns', 'T', 1)])
+    assert lru.get(('ns', 'T', 1)) is None
+    lru.discard_table('ns', 'T')
+    assert lru.get(('ns', 'T', 2)) is None
+    assert lru.get(('ns', 'U', 1)) and lru.get(('other', 'T', 1))
+
+
+class _Database:
+    """Stands in for connection(): answers the version and row lookups."""
+
+    def __init__(self, row):
+        self.row = row
+        self.statements = []
+
+    @contextmanager
+    def connection(self, readonly=False):
+        yield self
+
+    @contextmanager
+    def cursor(self):
+        yield self
+
+    def execute(self, query, params=None):
+        self.statements.append(query)
+        self.result = None if self.row is None else (
+            (self.row[-1],) if query == 'version' else self.row)
+
+    def fetchone(self):
+        return self.result
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = _Database((1, 'Ann', 'v2'))
+    monkeypatch.setattr(cache, 'connection', database.connection)
+    return database
+
+
+def _get(read_through, id=1):
+    return read_through.get(USER, 'row', 'version', id)
+
+
+def test_fresh_entry_is_served_without_the_database(database):
+    tier = MemoryCache()
+    read_through = ReadThroughCache([tier], ttl=60, namespace='ns')
+    assert _get(read_through) == (1, 'Ann')
+    assert _get(read_through) == (1, 'Ann')
+    assert database.statements == ['row']
+
+
+def test_stale_entry_with_same_version_is_kept(database, monkeypatch):
+    tier = MemoryCache()
+    tier.put(('ns', USER.name, 1), Entry((1, 'Ann'), 'v2', 0))
+    assert _get(ReadThroughCache([tier], ttl=60, namespace='ns')) == (1, 'Ann')
+    assert database.statements == ['version']
+    assert tier.get(('ns', USER.name, 1)).stored_at > 0
+
+
+def test_stale_entry_with_new_version_is_fetched_again(database):
+    tier = MemoryCache()
+    tier.put(('ns', USER.name, 1), Entry((1, 'Old'), 'v1', 0))
+    assert _get(ReadThroughCache([tier], ttl=60, namespace='ns')) == (1, 'Ann')
+    assert database.statements == ['version', 'row']
+    assert tier.get(('ns', USER.name, 1)).version == 'v2'
+
+
+def test_deleted_row_is_dropped(database):
+    tier = MemoryCache()
+    tier.put(('ns', USER.name, 1), Entry((1, 'Ann'), 'v2', 0))
+    database.row = None
+    assert _get(ReadThroughCache([tier], ttl=60, namespace='ns')) is None
+    assert tier.get(('ns', USER.name, 1)) is None
+
+
+def test_hit_in_a_slower_tier_fills_the_faster_one(database):
+    fast, slow = MemoryCache(), MemoryCache()
+    entry = Entry((1, 'Ann'), 'v2', float('inf'))
+    slow.put(('ns', USER.name, 1), entry)
+    assert _get(ReadThroughCache([fast, slow], ttl=60, namespace='ns')) == (1, 'Ann')
+    assert fast.get(('ns', USER.name, 1)) == entry
+    assert database.statements == []
@@ -0,0 +1,107 @@
+import os
+import socket
+import stat
+import pytest
+import daemon
+
+
+@pytest.fixture
+def pair():
+    left, right = socket.socketpair()
+    with left, right:
+        yield left, right
+
+
+@pytest.mark.parametrize('payload', [b'', b'x', bytes(range(256)) * 64])
+def test_frames_round_trip(pair, payload):
+    left, right = pair
+    daemon._send(left, b'o', payload)
+    assert daemon._recv(right) == (b'o', payload)
+
+
+def test_truncated_frame_is_a_lost_connection(pair):
+    left, right = pair
+    left.sendall(daemon._HEADER.pack(b'o', 10) + b'short')
+    left.close()
+    with pytest.raises(ConnectionError):
+        daemon._recv(right)
+
+
+def test_frame_reader_asks_for_stdin_a_line_at_a_time(pair):
+    left, right = pair
+    reader = daemon._FrameReader(right)
+    daemon._send(left, b'i', b'yes\n')
+    buffer = bytearray(2)
+    assert reader.readinto(buffer) == 2 and buffer == b'ye'
+    assert daemon._recv(left) == (b'i', b'')
+    assert reader.readinto(buffer) == 2 and buffer == b's\n'
+    daemon._send(left, b'i', b'')
+    assert reader.readinto(buffer) == 0
+
+
+@pytest.fixture
+def listening(tmp_path):
+    path = str(tmp_path / 'db_tool.sock')
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o077)
+    try:
+        server.bind(path)
+    finally:
+        os.umask(old_umask)
+    with server:
+        yield path
+
+
+def test_private_socket(listening):
+    assert daemon._is_private(listening, stat.S_ISSOCK)
+    assert not daemon._is_private(listening, stat.S_ISDIR)
+
+
+def test_socket_others_can_use_is_not_private(listening):
+    os.chmod(listening, 0o777)
+    assert not daemon._is_private(listening, stat.S_ISSOCK)
+
+
+def test_forward_skips_a_socket_that_is_not_private(listening, monkeypatch):
+    monkeypatch.delenv('DB_TOOL_NO_DAEMON', raising=False)
+    os.chmod(listening, 0o766)
+    assert daemon.forward(['user', 'list'], listening) is None
+
+
+def test_forward_without_a_daemon(tmp_path, monkeypatch):
+    monkeypatch.delenv('DB_TOOL_NO_DAEMON', raising=False)
+    assert daemon.forward(['user', 'list'], str(tmp_path / 'missing.sock')) is None
+
+
+def test_private_dir_is_created_and_checked(tmp_path):
+    path = str(tmp_path / 'run')
+    daemon._make_private_dir(path)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o700
+    os.chmod(path, 0o755)
+    with pytest.raises(RuntimeError):
+        daemon._make_private_dir(path)
+
+
+def test_default_socket_avoids_the_shared_temp_dir(monkeypatch):
+    monkeypatch.delenv('DB_TOOL_SOCKET', raising=False)
+    monkeypatch.setenv('XDG_RUNTIME_DIR', '/run/user/1000')
+    assert daemon.socket_path() == '/run/user/1000/db_tool.sock'
+    monkeypatch.delenv('XDG_RUNTIME_DIR')
+    monkeypatch.setenv('TMPDIR', '/tmp')
+    assert daemon.socket_path() == f"/tmp/db_tool-{os.getuid()}/db_tool.sock"
+
+
+def test_peer_is_this_user(pair):
+    assert daemon._peer_uid(pair[0]) in (os.getuid(), None)
+
+
+def test_tool_env_is_replaced_for_a_request(monkeypatch):
+    monkeypatch.setenv('DB_TOOL_CHANGED_BY', '1')
+    monkeypatch.setenv('DB_TOOL_SOCKET', '/tmp/x.sock')
+    monkeypatch.delenv('DB_TOOL_BENCH_DSN', raising=False)
+    saved = daemon.tool_env()
+    assert 'DB_TOOL_SOCKET' not in saved
+    daemon._set_tool_env({'DB_TOOL_BENCH_DSN': 'dbname=x'})
+    assert 'DB_TOOL_CHANGED_BY' not in os.environ and os.environ['DB_TOOL_BENCH_DSN'] == 'dbname=x'
+    daemon._set_tool_env(saved)
+    assert os.environ['DB_TOOL_CHANGED_BY'] == '1' and 'DB_TOOL_BENCH_DSN' not in os.environ
@@ -0,0 +1,101 @@
+import os
+import pytest
+import db_connection
+from db_connection import ConnectionPool, _positional, execute_prepared, params_from_dsn, replica_params
+from async_engine import _connect_kwargs
+from listing import json_projection
+
+PRIMARY = {'dbname': 'lms_db', 'user': 'postgres', 'password': 'secret', 'host': 'db', 'port': '5432'}
+
+
+def test_positional_placeholders():
+    assert _positional("SELECT %s, 'a%%b' WHERE x = %s") == "SELECT $1, 'a%b' WHERE x = $2"
+
+
+def test_replica_host_and_port_keep_primary_settings():
+    assert replica_params('replica-1:5433', PRIMARY) == dict(PRIMARY, host='replica-1', port='5433')
+    assert replica_params('replica-2', PRIMARY) == dict(PRIMARY, host='replica-2')
+
+
+@pytest.mark.parametrize('endpoint', ['host=replica user=reader', 'postgresql://reader@replica'])
+def test_replica_dsn_overrides_its_keys(endpoint):
+    assert replica_params(endpoint, PRIMARY) == dict(PRIMARY, host='replica', user='reader')
+
+
+def test_configure_from_env(monkeypatch):
+    monkeypatch.setattr(db_connection, 'DB_PARAMS', dict(PRIMARY))
+    monkeypatch.setattr(db_connection, 'REPLICA_PARAMS', [])
+    db_connection.configure_from_env({'DB_TOOL_DSN': 'postgresql://app@primary/lms',
+                                      'DB_TOOL_REPLICAS': 'r1, r2:5433,'})
+    assert db_connection.DB_PARAMS == dict(PRIMARY, user='app', host='primary', dbname='lms')
+    assert [(p['host'], p['port'], p['user']) for p in db_connection.REPLICA_PARAMS] == [
+        ('r1', '5432', 'app'), ('r2', '5433', 'app')]
+
+
+def test_asyncpg_arguments_from_a_dsn():
+    params = params_from_dsn("postgresql://app:pw@h:6432/lms?sslmode=require&connect_timeout=5"
+                             "&application_name=db_tool&options=-c%20search_path%3Dlms%20-cwork_mem%3D8MB")
+    assert _connect_kwargs(params) == {
+        'host': 'h', 'port': 6432, 'user': 'app', 'password': 'pw', 'database': 'lms', 'ssl': 'require',
+        'timeout': 5.0, 'server_settings': {'application_name': 'db_tool', 'search_path': 'lms', 'work_mem': '8MB'}}
+
+
+def test_asyncpg_arguments_of_the_defaults():
+    assert _connect_kwargs(PRIMARY) == {'database': 'lms_db', 'user': 'postgres', 'password': 'secret',
+                                        'host': 'db', 'port': 5432}
+
+
+@pytest.mark.parametrize('extra', [{'sslrootcert': 'root.crt'}, {'options': '-X'}, {'options': '--geqo=off'}])
+def test_asyncpg_arguments_refuse_unsupported_settings(extra):
+    with pytest.raises(ValueError):
+        _connect_kwargs(dict(PRIMARY, **extra))
+
+
+@pytest.fixture
+def pool():
+    pool = ConnectionPool(params_from_dsn(os.environ['DB_TOOL_TEST_DSN']), min_size=2, max_size=3)
+    yield pool
+    pool.closeall()
+
+
+@pytest.mark.needs_db
+def test_pool_opens_min_size_on_first_checkout(pool):
+    conn = pool.acquire()
+    assert (pool._size, len(pool._idle)) == (2, 1)
+    conn.close()
+    assert len(pool._idle) == 2
+
+
+@pytest.mark.needs_db
+def test_pool_reuses_released_connections(pool):
+    first = pool.acquire()
+    first.close()
+    second = pool.acquire()
+    second.close()
+    assert pool._size == 2
+
+
+@pytest.mark.needs_db
+def test_prepared_statement_is_reused(pool):
+    conn = pool.acquire()
+    try:
+        with conn.cursor() as cur:
+            for value in (1, 2):
+                execute_prepared(cur, "SELECT %s::int + 1, 'a%%b'", (value,))
+                assert cur.fetchone() == (value + 1, 'a%b')
+        assert list(conn.prepared.values()) == ['db_tool_1']
+    finally:
+        conn.close()
+
+
+@pytest.mark.needs_db
+def test_json_projection_runs_with_any_path(pg_conn):
+    paths = ['model.layers.1', "discount%'s", '$.tags ? (@ like_regex "^a%")', 'missing']
+    projection = json_projection('metadata', paths)
+    query = (f"SELECT {', '.join(expr for _, expr, _ in projection)} "
+             f"FROM (VALUES (%s::jsonb)) v (metadata) WHERE %s")
+    params = [param for _, _, params in projection for param in params]
+    document = '{"model": {"layers": [8, 16]}, "discount%\'s": 5, "tags": ["b", "a%x"]}'
+    with pg_conn.cursor() as cur:
+        cur.execute(query, params + [document, True])
+        assert cur.fetchone() == (16, 5, 'a%x', None)
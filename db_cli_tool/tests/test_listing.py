@@ -0,0 +1,75 @@
+import click
+import pytest
+from listing import build_list_query, build_update, parse_where, json_projection
+from queries import USER_SELECT_ALL, USER_UPDATE
+from tables import USER
+
+BASE = "SELECT user_id FROM \"User\""
+
+
+def test_list_query_without_options_orders_by_key():
+    assert build_list_query(USER, BASE, {}) == (f"{BASE} ORDER BY user_id", [])
+
+
+def test_list_query_filters_in_declared_order():
+    query, params = build_list_query(USER, BASE, {'email': 'a@x', 'role': 'student'}, limit=10)
+    assert query == f"{BASE} WHERE role = %s AND email = %s ORDER BY user_id LIMIT %s"
+    assert params == ['student', 'a@x', 10]
+
+
+def test_list_query_keyset_on_key():
+    query, params = build_list_query(USER, BASE, {}, after_id=5, desc=True)
+    assert query == f"{BASE} WHERE user_id < %s ORDER BY user_id DESC"
+    assert params == [5]
+
+
+def test_list_query_keyset_on_other_column_breaks_ties_by_key():
+    query, params = build_list_query(USER, BASE, {}, after_id=5, order_by='name', after_value='Ann')
+    assert query == f"{BASE} WHERE (name, user_id) > (%s, %s) ORDER BY name, user_id"
+    assert params == ['Ann', 5]
+
+
+def test_list_query_extends_select_all():
+    query, _ = build_list_query(USER, USER_SELECT_ALL, {})
+    assert query.startswith(USER_SELECT_ALL + " ORDER BY")
+
+
+def test_update_single_id_uses_equality():
+    query, params = build_update(USER, USER_UPDATE, ('Ann', None, None), ids=[3])
+    assert query == f"{USER_UPDATE} WHERE user_id = %s RETURNING user_id"
+    assert params == ['Ann', None, None, 3]
+
+
+def test_update_many_ids_and_where():
+    query, params = build_update(USER, USER_UPDATE, ('Ann', None, None), ids=[3, 4], where=['role=student'])
+    assert query == f"{USER_UPDATE} WHERE user_id = ANY(%s) AND role = %s RETURNING user_id"
+    assert params == ['Ann', None, None, [3, 4], 'student']
+
+
+def test_update_needs_a_selection():
+    with pytest.raises(click.UsageError):
+        build_update(USER, USER_UPDATE, ('Ann', None, None))
+
+
+def test_parse_where_keeps_value_after_first_equals():
+    assert parse_where(USER, [' email =a=b@x']) == (["email = %s"], ['a=b@x'])
+
+
+@pytest.mark.parametrize('pair', ['email', 'password=x', '=x'])
+def test_parse_where_rejects_bad_pairs(pair):
+    with pytest.raises(click.BadParameter):
+        parse_where(USER, [pair])
+
+
+def test_json_projection_binds_keys_and_paths():
+    projection = json_projection('metadata', ['model.layers.0', "discount%'s", '$.tags[0]'])
+    assert projection == [
+        ('model.layers.0', "metadata #> %s::text[]", [['model', 'layers', '0']]),
+        ("discount%'s", "metadata #> %s::text[]", [["discount%'s"]]),
+        ('$.tags[0]', "jsonb_path_query_first(metadata, %s::jsonpath)", ['$.tags[0]']),
+    ]
+
+
+def test_json_projection_rejects_empty_path():
+    with pytest.raises(click.BadParameter):
+        json_projection('metadata', ['..'])
@@ -0,0 +1,102 @@
+import io
+import json
+from datetime import datetime
+from decimal import Decimal
+import click
+import pytest
+from output import _StdoutSink, copy_rows, echo_notice, echo_row, json_encoder, set_format, write_rows
+
+COLUMNS = ('id', 'name', 'price', 'meta')
+ROWS = [
+    (1, 'Tab\there', Decimal('9.50'), {'lang': 'en'}),
+    (2, None, None, None),
+]
+
+
+def test_tsv_has_header_and_copy_escapes(capsysbinary):
+    assert write_rows(ROWS, COLUMNS, 'tsv') == 2
+    assert capsysbinary.readouterr().out == (
+        b'id\tname\tprice\tmeta\n'
+        b'1\tTab\\there\t9.50\t{"lang": "en"}\n'
+        b'2\t\\N\t\\N\t\\N\n')
+
+
+def test_jsonl_is_a_record_per_line(capsysbinary):
+    write_rows(ROWS, COLUMNS, 'jsonl')
+    lines = capsysbinary.readouterr().out.splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {'id': 1, 'name': 'Tab\there', 'price': 9.5, 'meta': {'lang': 'en'}},
+        {'id': 2, 'name': None, 'price': None, 'meta': None},
+    ]
+
+
+def test_json_is_one_array(capsysbinary):
+    write_rows(ROWS, COLUMNS, 'json')
+    assert [r['id'] for r in json.loads(capsysbinary.readouterr().out)] == [1, 2]
+    write_rows([], COLUMNS, 'json')
+    assert capsysbinary.readouterr().out == b'[]\n'
+
+
+def test_json_encoder_dates_and_decimals():
+    assert json_encoder()({'at': datetime(2024, 1, 2, 3, 4), 'x': Decimal('1.25')}) == \
+        b'{"at":"2024-01-02T03:04:00","x":1.25}'
+
+
+def _in_format(output_format, callback):
+    @click.command()
+    def command():
+        set_format(click.get_current_context(), output_format)
+        callback()
+    command.main([], standalone_mode=False)
+
+
+def test_echo_row_in_json_is_a_bare_object(capsysbinary):
+    _in_format('json', lambda: echo_row(ROWS[0], str, COLUMNS))
+    assert json.loads(capsysbinary.readouterr().out)['name'] == 'Tab\there'
+
+
+def test_notices_go_to_stderr_in_machine_formats(capfd):
+    _in_format('jsonl', lambda: echo_notice("No users found."))
+    _in_format('table', lambda: echo_notice("No courses found."))
+    out, err = capfd.readouterr()
+    assert (out, err) == ("No courses found.\n", "No users found.\n")
+
+
+@pytest.mark.parametrize('chunks', [
+    [b'{"a":1}\n{"a":2}\n'],
+    [b'{"a":1}\n', b'{"a":2}\n'],
+    [b'{"a":1', b'}\n{"a"', b':2}\n'],
+])
+def test_stdout_sink_joins_copy_lines_into_an_array(capsysbinary, chunks):
+    sink = _StdoutSink(array=True)
+    for chunk in chunks:
+        assert sink.write(memoryview(chunk)) == len(chunk)
+    sink.finish()
+    out = capsysbinary.readouterr().out
+    assert out == b'[\n{"a":1},\n{"a":2}\n]\n'
+
+
+def test_stdout_sink_without_rows_writes_an_empty_array(capsysbinary):
+    _StdoutSink(array=True).finish()
+    assert capsysbinary.readouterr().out == b'[]\n'
+
+
+QUERY = "SELECT * FROM (VALUES (1, 'a\tb', 2.50::numeric, '{\"k\": [1]}'::jsonb), (2, NULL, %s, NULL)) v"
+
+
+@pytest.mark.needs_db
+@pytest.mark.parametrize('output_format', ['tsv', 'json', 'jsonl'])
+def test_copy_rows_matches_write_rows(pg_conn, capsysbinary, output_format):
+    columns = ('id', 'name %', 'price', 'meta')
+    assert copy_rows(pg_conn, QUERY, (Decimal('3'),), columns, output_format) == 2
+    copied = capsysbinary.readouterr().out
+    with pg_conn.cursor() as cur:
+        cur.execute(QUERY, (Decimal('3'),))
+        write_rows(cur.fetchall(), columns, output_format)
+    written = capsysbinary.readouterr().out
+    if output_format == 'tsv':
+        assert copied == written
+    elif output_format == 'json':
+        assert json.loads(copied) == json.loads(written)
+    else:
+        assert [json.loads(line) for line in io.BytesIO(copied)] == [json.loads(line) for line in io.BytesIO(written)]
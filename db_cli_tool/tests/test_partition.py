@@ -0,0 +1,19 @@
+from datetime import datetime
+import pytest
+from partition import add_months, month_start
+
+
+def test_month_start():
+    assert month_start(datetime(2024, 2, 29, 13, 45, 7, 12)) == datetime(2024, 2, 1)
+
+
+@pytest.mark.parametrize('month, months, expected', [
+    (datetime(2024, 1, 1), 1, datetime(2024, 2, 1)),
+    (datetime(2024, 11, 1), 3, datetime(2025, 2, 1)),
+    (datetime(2024, 12, 1), 1, datetime(2025, 1, 1)),
+    (datetime(2024, 1, 1), -1, datetime(2023, 12, 1)),
+    (datetime(2024, 3, 1), -26, datetime(2022, 1, 1)),
+    (datetime(2024, 5, 1), 0, datetime(2024, 5, 1)),
+])
+def test_add_months(month, months, expected):
+    assert add_months(month, months) == expected
@@ -0,0 +1,42 @@
+from contextlib import contextmanager
+import click
+import pytest
+import repository
+from tables import USER
+
+
+class _Connection:
+    """Answers the anchor lookup of list_rows() with `anchor` (None: no such row)."""
+
+    def __init__(self, anchor):
+        self.anchor = anchor
+        self.statements = []
+
+    @contextmanager
+    def cursor(self):
+        yield self
+
+    def execute(self, query, params=None):
+        self.statements.append((query, params))
+
+    def fetchone(self):
+        return self.anchor
+
+
+def test_list_rows_pages_after_the_anchor_value():
+    conn = _Connection(('Ann',))
+    rows = repository.list_rows(conn, USER, {}, after_id=5, order_by='name', limit=10)
+    assert conn.statements == [("SELECT name FROM \"User\" WHERE user_id = %s", (5,))]
+    assert rows.query.endswith("WHERE (name, user_id) > (%s, %s) ORDER BY name, user_id LIMIT %s")
+    assert rows.params == ['Ann', 5, 10]
+
+
+def test_list_rows_refuses_a_deleted_anchor():
+    with pytest.raises(click.UsageError, match="user_id 5"):
+        repository.list_rows(_Connection(None), USER, {}, after_id=5, order_by='name')
+
+
+def test_list_rows_by_key_needs_no_lookup():
+    conn = _Connection(None)
+    rows = repository.list_rows(conn, USER, {}, after_id=5)
+    assert conn.statements == [] and rows.params == [5]
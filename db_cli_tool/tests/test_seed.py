@@ -0,0 +1,31 @@
+import pytest
+from seed import Layout, enrollment_pair, row_counts
+
+
+def _layout(users, courses, seed=42):
+    return Layout({'User': users, 'Course': courses}, {'User': 101, 'Course': 7}, seed)
+
+
+@pytest.mark.parametrize('users, courses', [(1, 1), (7, 3), (1000, 50), (1_000_003, 2)])
+def test_enrollment_pairs_are_unique_and_in_range(users, courses):
+    layout = _layout(users, courses)
+    n = min(users * courses, 20000)
+    pairs = [enrollment_pair(layout, i) for i in range(n)]
+    assert len(set(pairs)) == n
+    assert all(101 <= user < 101 + users and 7 <= course < 7 + courses for user, course in pairs)
+
+
+def test_every_pair_is_drawn_once():
+    layout = _layout(12, 5)
+    assert len({enrollment_pair(layout, i) for i in range(60)}) == 60
+
+
+def test_pairs_depend_on_the_seed_only():
+    assert enrollment_pair(_layout(10, 10, seed=1), 3) == enrollment_pair(_layout(10, 10, seed=1), 3)
+    assert ([enrollment_pair(_layout(10, 10, seed=1), i) for i in range(10)]
+            != [enrollment_pair(_layout(10, 10, seed=2), i) for i in range(10)])
+
+
+def test_tiny_scales_cap_enrollments_at_the_pairs():
+    counts = row_counts(0.001)
+    assert counts['Enrollment'] <= counts['User'] * counts['Course']
@@ -1,6 +1,18 @@
 import click
-from db_connection import get_connection
-from queries import TRANSACTION_INSERT, TRANSACTION_SELECT_ALL, TRANSACTION_SELECT_BY_ID, TRANSACTION_UPDATE, TRANSACTION_DELETE
+import repository
+from db_connection import get_connection, read_params
+from bulk import add_import_command, detect_format, read_records
+from export import add_export_command
+from streaming import echo_rows
+from output import echo_notice, echo_row
+from listing import list_options, collect_ids, where_option, ID_LIST
+from batch import collect_rows, collect_target_ids, echo_created, echo_deleted, from_file_option, page_size_option, concurrency_option
+from tables import TRANSACTION
+
+
+def _format_transaction(t):
+    return f"ID: {t[0]}, User ID: {t[1]}, Course ID: {t[2]}, Amount: ${t[3]:.2f}"
+
 
 def add_commands(cli):
     """Adds Transaction-related commands to the CLI."""
@@ -10,43 +22,48 @@ def add_commands(cli):
         pass
 
     @transaction.command()
-    @click.option('--user-id', required=True, type=int, help="User ID")
-    @click.option('--course-id', required=True, type=int, help="Course ID")
-    @click.option('--amount', required=True, type=float, help="Transaction amount")
-    def create(user_id, course_id, amount):
-        """Create a new transaction."""
+    @click.option('--user-id', multiple=True, type=int, help="User ID")
+    @click.option('--course-id', multiple=True, type=int, help="Course ID")
+    @click.option('--amount', multiple=True, type=float, help="Transaction amount")
+    @from_file_option("CSV or JSONL file with one transaction per row")
+    @page_size_option
+    def create(user_id, course_id, amount, from_file, page_size):
+        """Create one or many transactions.
+
+        Repeat the options to create several rows at once; an option given
+        only once applies to every row.
+        """
+        rows = collect_rows(TRANSACTION, ('user_id', 'course_id', 'amount'), (user_id, course_id, amount), from_file)
         conn = get_connection()
         if conn is None:
             return
+        created = []
         try:
-            with conn.cursor() as cur:
-                cur.execute(TRANSACTION_INSERT, (user_id, course_id, amount))
-                transaction_id = cur.fetchone()[0]
-                conn.commit()
-                click.echo(click.style(f"Created transaction with ID: {transaction_id}", fg='green'))
+            for page_ids in repository.create(conn, TRANSACTION, rows, page_size):
+                created.extend(page_ids)
+            echo_created('transaction', created)
         except Exception as e:
             conn.rollback()
+            echo_created('transaction', created)
             click.echo(f"Error creating transaction: {e}")
         finally:
             conn.close()
 
     @transaction.command()
-    def list():
-        """List all transactions."""
-        conn = get_connection()
+    @list_options(TRANSACTION)
+    def list(itersize, limit, after_id, order_by, desc, **filters):
+        """List transactions, optionally filtered and paged."""
+        conn = get_connection(readonly=True)
         if conn is None:
             return
         try:
-            with conn.cursor() as cur:
-                cur.execute(TRANSACTION_SELECT_ALL)
-                transactions = cur.fetchall()
-                if not transactions:
-                    click.echo("No transactions found.")
-                    return
-                for t in transactions:
-                    click.echo(f"ID: {t[0]}, User ID: {t[1]}, Course ID: {t[2]}, Amount: ${t[3]:.2f}")
+            rows = repository.list_rows(conn, TRANSACTION, filters, after_id, order_by, desc, limit, itersize)
+            if not echo_rows(rows, _format_transaction, repository.statements(TRANSACTION).columns):
+                echo_notice("No transactions found.")
+        except click.UsageError:
+            raise
         except Exception as e:
-            click.echo(f"Error listing transactions: {e}")
+            echo_notice(f"Error listing transactions: {e}")
         finally:
             conn.close()
 
@@ -54,41 +71,36 @@ def add_commands(cli):
     @click.option('--id', required=True, type=int, help="Transaction ID to retrieve")
     def get(id):
         """Get a transaction by ID."""
-        conn = get_connection()
-        if conn is None:
-            return
         try:
-            with conn.cursor() as cur:
-                cur.execute(TRANSACTION_SELECT_BY_ID, (id,))
-                transaction = cur.fetchone()
-                if transaction:
-                    click.echo(f"ID: {transaction[0]}, User ID: {transaction[1]}, Course ID: {transaction[2]}, Amount: ${transaction[3]:.2f}")
-                else:
-                    click.echo(f"Transaction with ID {id} not found.")
+            transaction = repository.get(TRANSACTION, id)
+            if transaction:
+                echo_row(transaction, _format_transaction, repository.statements(TRANSACTION).columns)
+            else:
+                echo_notice(f"Transaction with ID {id} not found.")
         except Exception as e:
-            click.echo(f"Error retrieving transaction: {e}")
-        finally:
-            conn.close()
+            echo_notice(f"Error retrieving transaction: {e}")
 
     @transaction.command()
-    @click.option('--id', required=True, type=int, help="Transaction ID to update")
+    @click.option('--id', type=int, help="Transaction ID to update")
+    @click.option('--ids', type=ID_LIST, help="Comma-separated Transaction IDs to update")
+    @where_option(TRANSACTION)
     @click.option('--amount', type=float, help="New transaction amount")
-    def update(id, amount):
-        """Update a transaction's details."""
+    def update(id, ids, where, amount):
+        """Update one or many transactions in a single statement."""
+        values = (amount,)
+        if all(v is None for v in values):
+            click.echo("Nothing to update.")
+            return
+        statement = repository.update_statement(TRANSACTION, values, collect_ids(id, ids), where)
         conn = get_connection()
         if conn is None:
             return
         try:
-            with conn.cursor() as cur:
-                cur.execute(TRANSACTION_SELECT_BY_ID, (id,))
-                current = cur.fetchone()
-                if not current:
-                    click.echo(f"Transaction with ID {id} not found.")
-                    return
-                new_amount = amount if amount is not None else current[3]
-                cur.execute(TRANSACTION_UPDATE, (new_amount, id))
-                conn.commit()
-                click.echo(f"Updated transaction ID: {id}")
+            updated = repository.update(conn, TRANSACTION, statement)
+            if updated:
+                click.echo(f"Updated transaction ID(s): {', '.join(map(str, updated))}")
+            else:
+                click.echo("No matching transactions found.")
         except Exception as e:
             conn.rollback()
             click.echo(f"Error updating transaction: {e}")
@@ -96,23 +108,71 @@ def add_commands(cli):
             conn.close()
 
     @transaction.command()
-    @click.option('--id', required=True, type=int, help="Transaction ID to delete")
-    @click.confirmation_option(prompt="Are you sure you want to delete this transaction?")
-    def delete(id):
-        """Delete a transaction by ID."""
+    @click.option('--id', multiple=True, type=int, help="Transaction ID to delete (repeatable)")
+    @click.option('--ids', type=ID_LIST, help="Comma-separated Transaction IDs to delete")
+    @from_file_option("File with one Transaction ID per line")
+    @page_size_option
+    @click.confirmation_option(prompt="Are you sure you want to delete the selected transactions?")
+    def delete(id, ids, from_file, page_size):
+        """Delete one or many transactions by ID."""
+        targets = collect_target_ids(id, ids, from_file)
         conn = get_connection()
         if conn is None:
             return
+        deleted = []
         try:
-            with conn.cursor() as cur:
-                cur.execute(TRANSACTION_DELETE, (id,))
-                if cur.rowcount > 0:
-                    conn.commit()
-                    click.echo(f"Deleted transaction ID: {id}")
-                else:
-                    click.echo(f"Transaction with ID {id} not found.")
+            for page_ids in repository.delete(conn, TRANSACTION, targets, page_size):
+                deleted.extend(page_ids)
+            echo_deleted('transaction', 'Transaction', targets, deleted)
         except Exception as e:
             conn.rollback()
+            echo_deleted('transaction', 'Transaction', deleted, deleted)
             click.echo(f"Error deleting transaction: {e}")
         finally:
-            conn.close()
\ No newline at end of file
+            conn.close()
+
+    @transaction.command('check-refs')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--format', 'fmt', type=click.Choice(('csv', 'jsonl')),
+                  help="Input format (default: guessed from the file extension)")
+    @concurrency_option
+    @click.pass_context
+    def check_refs(ctx, path, fmt, concurrency):
+        """Check that every user_id and course_id in a Transaction file exists.
+
+        Run before `transaction import` to find rows that would be rejected
+        for unknown foreign keys; the User and Course lookups run
+        concurrently. Exits with status 1 if any reference is missing.
+        """
+        import async_engine
+        user_lines, course_lines = {}, {}
+        for line_number, record, error in read_records(path, detect_format(path, fmt)):
+            if error is not None:
+                continue
+            for column, lines in (('user_id', user_lines), ('course_id', course_lines)):
+                try:
+                    lines.setdefault(int(record.get(column)), []).append(line_number)
+                except (TypeError, ValueError):
+                    pass
+        try:
+            async def check():
+                async with async_engine.AsyncEngine(read_params(), concurrency) as engine:
+                    return await async_engine.missing_references(engine, user_lines, course_lines)
+            missing_users, missing_courses = async_engine.run(check())
+        except ImportError:
+            click.echo(f"Error checking references: {async_engine.ASYNCPG_MISSING}")
+            ctx.exit(1)
+        except Exception as e:
+            click.echo(f"Error checking references: {e}")
+            ctx.exit(1)
+        for label, missing, lines in (('User', missing_users, user_lines), ('Course', missing_courses, course_lines)):
+            for ref in missing:
+                click.echo(f"{label} with ID {ref} not found (line(s) {', '.join(map(str, lines[ref][:10]))}"
+                           f"{', ...' if len(lines[ref]) > 10 else ''})")
+        if missing_users or missing_courses:
+            ctx.exit(1)
+        click.echo(click.style(f"All references found: {len(user_lines)} user(s), {len(course_lines)} course(s).", fg='green'))
+
+
+    add_import_command(transaction, TRANSACTION)
+    add_export_command(transaction, TRANSACTION, parallel=True)
@@ -1,6 +1,19 @@
 import click
+import repository
 from db_connection import get_connection
-from queries import USER_INSERT, USER_SELECT_ALL, USER_SELECT_BY_ID, USER_UPDATE, USER_DELETE
+from bulk import add_import_command
+from export import add_export_command
+from streaming import echo_rows
+from output import echo_notice, echo_row
+from listing import list_options, collect_ids, where_option, ID_LIST
+from batch import collect_rows, collect_target_ids, echo_created, echo_deleted, from_file_option, page_size_option
+from tables import USER, COURSE
+from cache import invalidate_table
+
+
+def _format_user(u):
+    return f"ID: {u[0]}, Name: {u[1]}, Email: {u[2]}, Role: {u[3]}"
+
 
 def add_commands(cli):
     """Adds User-related commands to the CLI."""
@@ -10,43 +23,48 @@ def add_commands(cli):
         pass
 
     @user.command()
-    @click.option('--name', required=True, help="User's name")
-    @click.option('--email', required=True, help="User's email")
-    @click.option('--role', required=True, help="User's role (e.g., student, instructor)")
-    def create(name, email, role):
-        """Create a new user."""
+    @click.option('--name', multiple=True, help="User's name")
+    @click.option('--email', multiple=True, help="User's email")
+    @click.option('--role', multiple=True, help="User's role (e.g., student, instructor)")
+    @from_file_option("CSV or JSONL file with one user per row")
+    @page_size_option
+    def create(name, email, role, from_file, page_size):
+        """Create one or many users.
+
+        Repeat the options to create several rows at once; an option given
+        only once applies to every row.
+        """
+        rows = collect_rows(USER, ('name', 'email', 'role'), (name, email, role), from_file)
         conn = get_connection()
         if conn is None:
             return
+        created = []
         try:
-            with conn.cursor() as cur:
-                cur.execute(USER_INSERT, (name, email, role))
-                user_id = cur.fetchone()[0]
-                conn.commit()
-                click.echo(click.style(f"Created user with ID: {user_id}", fg='green'))
+            for page_ids in repository.create(conn, USER, rows, page_size):
+                created.extend(page_ids)
+            echo_created('user', created)
         except Exception as e:
             conn.rollback()
+            echo_created('user', created)
             click.echo(f"Error creating user: {e}")
         finally:
             conn.close()
 
     @user.command()
-    def list():
-        """List all users."""
-        conn = get_connection()
+    @list_options(USER)
+    def list(itersize, limit, after_id, order_by, desc, **filters):
+        """List users, optionally filtered and paged."""
+        conn = get_connection(readonly=True)
         if conn is None:
             return
         try:
-            with conn.cursor() as cur:
-                cur.execute(USER_SELECT_ALL)
-                users = cur.fetchall()
-                if not users:
-                    click.echo("No users found.")
-                    return
-                for u in users:
-                    click.echo(f"ID: {u[0]}, Name: {u[1]}, Email: {u[2]}, Role: {u[3]}")
+            rows = repository.list_rows(conn, USER, filters, after_id, order_by, desc, limit, itersize)
+            if not echo_rows(rows, _format_user, repository.statements(USER).columns):
+                echo_notice("No users found.")
+        except click.UsageError:
+            raise
         except Exception as e:
-            click.echo(f"Error listing users: {e}")
+            echo_notice(f"Error listing users: {e}")
         finally:
             conn.close()
 
@@ -54,43 +72,38 @@ def add_commands(cli):
     @click.option('--id', required=True, type=int, help="User ID to retrieve")
     def get(id):
         """Get a user by ID."""
-        conn = get_connection()
-        if conn is None:
-            return
         try:
-            with conn.cursor() as cur:
-                cur.execute(USER_SELECT_BY_ID, (id,))
-                user = cur.fetchone()
-                if user:
-                    click.echo(f"ID: {user[0]}, Name: {user[1]}, Email: {user[2]}, Role: {user[3]}")
-                else:
-                    click.echo(f"User with ID {id} not found.")
+            user = repository.get(USER, id)
+            if user:
+                echo_row(user, _format_user, repository.statements(USER).columns)
+            else:
+                echo_notice(f"User with ID {id} not found.")
         except Exception as e:
-            click.echo(f"Error retrieving user: {e}")
-        finally:
-            conn.close()
+            echo_notice(f"Error retrieving user: {e}")
 
     @user.command()
-    @click.option('--id', required=True, type=int, help="User ID to update")
+    @click.option('--id', type=int, help="User ID to update")
+    @click.option('--ids', type=ID_LIST, help="Comma-separated User IDs to update")
+    @where_option(USER)
     @click.option('--name', help="New name")
     @click.option('--email', help="New email")
     @click.option('--role', help="New role")
-    def update(id, name, email, role):
-        """Update a user's details."""
+    def update(id, ids, where, name, email, role):
+        """Update one or many users in a single statement."""
+        values = (name, email, role)
+        if all(v is None for v in values):
+            click.echo("Nothing to update.")
+            return
+        statement = repository.update_statement(USER, values, collect_ids(id, ids), where)
         conn = get_connection()
         if conn is None:
             return
         try:
-            with conn.cursor() as cur:
-                cur.execute(USER_SELECT_BY_ID, (id,))
-                current = cur.fetchone()
-                if not current:
-                    click.echo(f"User with ID {id} not found.")
-                    return
-                new_name, new_email, new_role = name or current[1], email or current[2], role or current[3]
-                cur.execute(USER_UPDATE, (new_name, new_email, new_role, id))
-                conn.commit()
-                click.echo(f"Updated user ID: {id}")
+            updated = repository.update(conn, USER, statement)
+            if updated:
+                click.echo(f"Updated user ID(s): {', '.join(map(str, updated))}")
+            else:
+                click.echo("No matching users found.")
         except Exception as e:
             conn.rollback()
             click.echo(f"Error updating user: {e}")
@@ -98,23 +111,30 @@ def add_commands(cli):
             conn.close()
 
     @user.command()
-    @click.option('--id', required=True, type=int, help="User ID to delete")
-    @click.confirmation_option(prompt="Are you sure you want to delete this user?")
-    def delete(id):
-        """Delete a user by ID."""
+    @click.option('--id', multiple=True, type=int, help="User ID to delete (repeatable)")
+    @click.option('--ids', type=ID_LIST, help="Comma-separated User IDs to delete")
+    @from_file_option("File with one User ID per line")
+    @page_size_option
+    @click.confirmation_option(prompt="Are you sure you want to delete the selected users?")
+    def delete(id, ids, from_file, page_size):
+        """Delete one or many users by ID."""
+        targets = collect_target_ids(id, ids, from_file)
         conn = get_connection()
         if conn is None:
             return
+        deleted = []
         try:
-            with conn.cursor() as cur:
-                cur.execute(USER_DELETE, (id,))
-                if cur.rowcount > 0:
-                    conn.commit()
-                    click.echo(f"Deleted user ID: {id}")
-                else:
-                    click.echo(f"User with ID {id} not found.")
+            for page_ids in repository.delete(conn, USER, targets, page_size):
+                deleted.extend(page_ids)
+            echo_deleted('user', 'User', targets, deleted)
         except Exception as e:
             conn.rollback()
+            echo_deleted('user', 'User', deleted, deleted)
             click.echo(f"Error deleting user: {e}")
         finally:
-            conn.close()
\ No newline at end of file
+            if deleted:
+                invalidate_table(COURSE)  # ON DELETE SET NULL of Course.instructor_id
+            conn.close()
+
+    add_import_command(user, USER)
+    add_export_command(user, USER)
\ No newline at end of file